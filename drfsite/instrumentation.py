@@ -0,0 +1,260 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса. Экземпляр сам служит обёрткой connection.execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.signatures = Counter()
+        self.serializing = False
+        # Разделы сводки выполняют запросы одного запроса из нескольких потоков.
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.sql_time += elapsed
+                self.queries += 1
+                # SQL с плейсхолдерами без параметров: один и тот же запрос в цикле — признак N+1.
+                self.signatures[sql] += 1
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.signatures.items() if count >= threshold}
+
+
+def _execute(execute, sql, params, many, context):
+    """Обёртка, постоянно стоящая на каждом соединении: считает запрос в метриках
+    текущего HTTP-запроса. Контекст (_current) переходит в потоки sync_to_async,
+    поэтому учитываются и запросы разделов сводки из пула потоков."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def _install_execute_wrapper(connection, **kwargs):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+def install_query_counting():
+    # Новые соединения любых потоков получают обёртку при открытии; уже открытые
+    # соединения текущего потока — в middleware.
+    connection_created.connect(_install_execute_wrapper, dispatch_uid='instrumentation_execute_wrapper')
+
+
+def install_serializer_timing():
+    """Оборачивает BaseSerializer.data: Serializer.data и ListSerializer.data вызывают его
+    через super(), так что время считается один раз на сериализатор верхнего уровня."""
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, 'instrumented', False):
+        return
+
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return original.fget(self)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+class MetricsRegistry:
+    """Агрегаты по представлениям в памяти процесса. При нескольких воркерах
+    каждый отдаёт свои значения — Prometheus суммирует их по instance."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = Counter()
+            self._totals = defaultdict(Counter)
+            self._buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+
+    def observe(self, view, method, status, duration, metrics, duplicate_queries, size):
+        with self._lock:
+            self._requests[view, method, status] += 1
+            totals = self._totals[view]
+            totals['duration_seconds'] += duration
+            totals['db_queries'] += metrics.queries
+            totals['db_seconds'] += metrics.sql_time
+            totals['duplicate_queries'] += duplicate_queries
+            totals['serializer_seconds'] += metrics.serializer_time
+            if size is not None:
+                totals['response_bytes'] += size
+            self._buckets[view][bisect.bisect_left(DURATION_BUCKETS, duration)] += 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Обработанные запросы.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+            lines += [
+                '# HELP http_request_duration_seconds Время обработки запроса.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for view, buckets in sorted(self._buckets.items()):
+                cumulative = 0
+                for bound, count in zip((*DURATION_BUCKETS, '+Inf'), buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{_labels(view=view, le=bound)} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{_labels(view=view)} {self._totals[view]["duration_seconds"]}')
+                lines.append(f'http_request_duration_seconds_count{_labels(view=view)} {cumulative}')
+
+            for name, key, help_text in (
+                ('db_queries_total', 'db_queries', 'SQL-запросы.'),
+                ('db_query_duration_seconds_total', 'db_seconds', 'Суммарное время SQL.'),
+                ('db_duplicate_queries_total', 'duplicate_queries', 'Повторы одного SQL сверх первого (N+1).'),
+                ('serializer_duration_seconds_total', 'serializer_seconds', 'Время сериализации DRF.'),
+                ('http_response_size_bytes_total', 'response_bytes', 'Размер тел ответов (кроме потоковых).'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for view, totals in sorted(self._totals.items()):
+                    lines.append(f'{name}{_labels(view=view)} {totals[key]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """Число и время SQL, повторяющиеся запросы, время сериализации и размер ответа:
+    в заголовке Server-Timing и в реестре для /metrics. При INSTRUMENTATION_ENABLED = False
+    Django исключает middleware из цепочки при старте — накладных расходов нет."""
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_query_counting()
+        install_serializer_timing()
+
+    def __call__(self, request):
+        for connection in connections.all():
+            _install_execute_wrapper(connection)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        if view == 'metrics':
+            return response
+
+        duplicates = metrics.duplicates(settings.INSTRUMENTATION_DUPLICATE_THRESHOLD)
+        duplicate_queries = sum(count - 1 for count in duplicates.values())
+        if duplicates:
+            sql, count = max(duplicates.items(), key=lambda item: item[1])
+            logger.warning("Повторяющиеся запросы в %s %s (%s): %d× %s",
+                           request.method, request.path, view, count, sql[:300])
+
+        timings = [
+            f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'ser;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ]
+        if duplicates:
+            timings.append(f'dup;desc="{duplicate_queries} repeated queries"')
+        response['Server-Timing'] = ', '.join(timings)
+
+        size = None if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, metrics, duplicate_queries, size)
+        return response
+
+
+METRICS_SCRAPER = 'metrics-scraper'
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Сборщик метрик: заголовок Authorization: Bearer <METRICS_TOKEN>.
+    Другие токены проверяет следующая аутентификация (JWT)."""
+
+    def authenticate(self, request):
+        token = settings.METRICS_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if token and constant_time_compare(header, f'Bearer {token}'):
+            return AnonymousUser(), METRICS_SCRAPER
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+class CanReadMetrics(BasePermission):
+    def has_permission(self, request, view):
+        if request.auth == METRICS_SCRAPER:
+            return True
+        user = request.user
+        return user.is_authenticated and (user.is_staff or getattr(user, 'role', None) == 'librarian')
+
+
+class MetricsView(APIView):
+    """Метрики в формате Prometheus: библиотекарю, персоналу или по METRICS_TOKEN."""
+    authentication_classes = [MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [CanReadMetrics]
+
+    def get(self, request):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise Http404
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+metrics_view = MetricsView.as_view()
@@ -15,10 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.urls import path, include
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 
+from .instrumentation import metrics_view
 from .yasg import urlpatterns as doc_url
 from librarian.views import *
 
@@ -31,6 +33,8 @@ router.register(r'books', BookViewSet)
 router.register(r'inventories', InventoryViewSet)
 router.register(r'issues', BookIssueViewSet)
 router.register(r'returns', BookReturnViewSet)
+router.register(r'fine-policies', FinePolicyViewSet)
+router.register(r'holidays', HolidayViewSet)
 
 urlpatterns = [
     path('api/admin/', admin.site.urls),
@@ -38,12 +42,21 @@ urlpatterns = [
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('api/register/', RegisterView.as_view(), name='register'),
+    path('api/invite/accept/', InviteAcceptView.as_view(), name='invite-accept'),
+    path('api/autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
     path('api/', include(router.urls)),
     path("users/me/", CurrentUserView.as_view()),
     path('reports/issued-books/', IssuedBooksReportView.as_view(), name='issued-books-report'),
     path('reports/overdue-books/', OverdueBooksReportView.as_view(), name='overdue-books-report'),
+    path('reports/outstanding-fines/', OutstandingFinesReportView.as_view(), name='outstanding-fines-report'),
     path('reports/book-availability/', BookAvailabilityReportView.as_view(), name='book-availability-report'),
     path('reports/reader-activity/', ReaderActivityReportView.as_view(), name='reader-activity-report'),
+    path('reports/dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('reports/circulation-trend/', CirculationTrendView.as_view(), name='circulation-trend-report'),
+    path('reports/top-books/', TopBooksReportView.as_view(), name='top-books-report'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-urlpatterns += doc_url
\ No newline at end of file
+urlpatterns += doc_url
+# Статика админки и Swagger при DEBUG: uvicorn, в отличие от runserver, её не раздаёт.
+urlpatterns += staticfiles_urlpatterns()
\ No newline at end of file
@@ -1,14 +1,45 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admindocs.views import BookmarkletsView
+from django.core.exceptions import ValidationError
 
-from .models import  User,Author, Publisher, Direction,  Book, Inventory, BookIssue, BookReturn
+from .models import  User,Author, Publisher, Direction,  Book, Inventory, BookIssue, BookReturn, Reminder, BackgroundJob, FinePolicy, Holiday
 
 # Register your models here.
 admin.site.register(User)
-admin.site.register(Book)
 admin.site.register(Author)
 admin.site.register(Publisher)
 admin.site.register(Direction)
-admin.site.register(Inventory)
 admin.site.register(BookIssue)
 admin.site.register(BookReturn)
+admin.site.register(Reminder)
+admin.site.register(BackgroundJob)
+admin.site.register(FinePolicy)
+admin.site.register(Holiday)
+
+
+class ModelDeleteAdmin(admin.ModelAdmin):
+    """Удаление, в том числе массовое, через Model.delete: оно ведёт счётчики книги
+    и отказывает, пока экземпляр выдан. QuerySet.delete() обходил бы и то и другое."""
+
+    def delete_model(self, request, obj):
+        try:
+            obj.delete()
+        except ValidationError as error:
+            self.message_user(request, f"{obj}: {' '.join(error.messages)}", messages.ERROR)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_model(request, obj)
+
+
+@admin.register(Book)
+class BookAdmin(ModelDeleteAdmin):
+    # Счётчики меняются только F-выражениями Book.adjust_counts.
+    readonly_fields = Book.COUNTER_FIELDS
+
+
+@admin.register(Inventory)
+class InventoryAdmin(ModelDeleteAdmin):
+    # Номер выдаёт InventorySequence; статус меняют выдача, возврат и удаление —
+    # вместе со счётчиками книги.
+    readonly_fields = ['inventory_number', 'status']
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LibrarianConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'librarian'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import User
+
+# Поля пользователя, которые кладутся в токен. Остальные у пользователя из токена отложены
+# (deferred) и догружаются из БД только при обращении.
+USER_CLAIMS = ('username', 'role', 'is_active')
+
+
+def set_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class LibraryAccessToken(AccessToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_user_claims(token, user)
+        return token
+
+
+class LibraryRefreshToken(RefreshToken):
+    access_token_class = LibraryAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_user_claims(token, user)
+        return token
+
+
+class LibraryTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = LibraryRefreshToken
+
+
+class LibraryTokenRefreshSerializer(TokenRefreshSerializer):
+    """Новый access-токен получает текущие роль и статус пользователя, а не копию из refresh-токена."""
+    token_class = LibraryRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        access = refresh.access_token
+        set_user_claims(access, user)
+        return {'access': str(access)}
+
+
+def user_state_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_user_state(user_id):
+    """(is_active, role) пользователя или None, если его нет. Кэшируется на
+    JWT_USER_STATE_CACHE_TIMEOUT секунд: столько может прожить отозванный токен
+    в воркерах с другим кэшем (LocMemCache), пока сигнал не сбросил им ключ."""
+    key = user_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(pk=user_id).values_list('is_active', 'role').first()
+        state = list(row) if row else []
+        cache.set(key, state, settings.JWT_USER_STATE_CACHE_TIMEOUT)
+    return tuple(state) or None
+
+
+def invalidate_user_state(user_id):
+    cache.delete(user_state_key(user_id))
+
+
+def user_from_claims(token):
+    claims = {claim: token[claim] for claim in USER_CLAIMS}
+    claims['id'] = token[api_settings.USER_ID_CLAIM]
+    # from_db ждёт значения в порядке полей модели, пропущенные поля становятся отложенными.
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+    return User.from_db(router.db_for_read(User), fields, [claims[name] for name in fields])
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения строки пользователя на каждый запрос.
+
+    request.user — экземпляр User, собранный из claims токена (id, username, role,
+    is_active): его можно присваивать внешним ключам и сравнивать с другими
+    пользователями, прочие поля загружаются при обращении. Отзыв проверяется по
+    кэшу состояния пользователя: деактивированный пользователь или сменившаяся роль
+    делают токен недействительным, новый выдаёт /api/token/refresh/.
+    Токены без claims роли (выданные до перехода) проверяются по БД, как раньше.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_STATELESS_USER or any(claim not in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("В токене нет идентификатора пользователя.")
+
+        state = get_user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed("Пользователь не найден.", code='user_not_found')
+        is_active, role = state
+        if not is_active:
+            raise AuthenticationFailed("Пользователь деактивирован.", code='user_inactive')
+        if not validated_token['is_active'] or role != validated_token['role']:
+            raise AuthenticationFailed("Роль пользователя изменилась, обновите токен.", code='token_outdated')
+
+        return user_from_claims(validated_token)
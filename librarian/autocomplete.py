@@ -0,0 +1,229 @@
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .models import User, Author, Book, Inventory
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е').strip()
+
+
+class PrefixIndex:
+    """Отсортированные параллельные списки ключей и id: поиск по префиксу — бинарный поиск."""
+
+    def __init__(self, entries=()):
+        pairs = []
+        self._labels = {}
+        self._keys_by_id = {}
+        for pk, label, terms in entries:
+            keys = self._normalize_terms(terms)
+            self._labels[pk] = label
+            self._keys_by_id[pk] = keys
+            pairs.extend((key, pk) for key in keys)
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._ids = [pk for _, pk in pairs]
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, pk):
+        return pk in self._labels
+
+    @staticmethod
+    def _normalize_terms(terms):
+        return tuple(sorted({normalize(term) for term in terms if term and normalize(term)}))
+
+    def add(self, pk, label, terms):
+        self.remove(pk)
+        keys = self._normalize_terms(terms)
+        self._labels[pk] = label
+        self._keys_by_id[pk] = keys
+        for key in keys:
+            position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, pk)
+
+    def remove(self, pk):
+        self._labels.pop(pk, None)
+        for key in self._keys_by_id.pop(pk, ()):
+            position = bisect.bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == pk:
+                    del self._keys[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = {}
+        position = bisect.bisect_left(self._keys, prefix)
+        while position < len(self._keys) and len(found) < limit:
+            if not self._keys[position].startswith(prefix):
+                break
+            pk = self._ids[position]
+            found.setdefault(pk, self._labels[pk])
+            position += 1
+        return [{'id': pk, 'label': label} for pk, label in found.items()]
+
+
+class AutocompleteIndex:
+    """Индекс одного вида объектов: строится при первом запросе, обновляется сигналами
+    и периодически перестраивается (изменения из других процессов сигналы не видят).
+
+    Плановая перестройка идёт в фоновом потоке и не держит блокировку: запросы тем временем
+    ищут по прежнему индексу, готовый индекс подменяет его целиком. Правки сигналов, пришедшие
+    во время перестройки, повторяются на новом индексе.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.RLock()
+        # Одна перестройка за раз; отпускает поток, который её выполнил.
+        self._build_lock = threading.Lock()
+        self._pending = None
+
+    def _current(self):
+        if self._index is None:
+            # Первому запросу искать не по чему — он строит индекс сам.
+            with self._build_lock:
+                if self._index is None:
+                    self._build()
+        elif time.monotonic() - self._built_at > settings.AUTOCOMPLETE_REBUILD_SECONDS:
+            self.rebuild_in_background()
+        return self._index
+
+    def _build(self):
+        with self._lock:
+            self._pending = []
+        try:
+            index = PrefixIndex(self.loader())
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for method, args in self._pending:
+                getattr(index, method)(*args)
+            self._pending = None
+            self._index = index
+            self._built_at = time.monotonic()
+
+    def rebuild_in_background(self):
+        """Запускает перестройку в фоновом потоке. Возвращает поток, None — если перестройка уже идёт."""
+        if not self._build_lock.acquire(blocking=False):
+            return None
+        thread = threading.Thread(target=self._rebuild, name='autocomplete-rebuild', daemon=True)
+        thread.start()
+        return thread
+
+    def _rebuild(self):
+        try:
+            self._build()
+        except Exception:
+            logger.exception("Не удалось перестроить индекс автодополнения")
+            # Прежний индекс продолжает работать; следующая попытка — через обычный интервал.
+            self._built_at = time.monotonic()
+        finally:
+            self._build_lock.release()
+            # Соединение с БД принадлежит потоку и иначе осталось бы открытым.
+            connections.close_all()
+
+    def search(self, prefix, limit=10):
+        index = self._current()
+        with self._lock:
+            return index.search(prefix, limit)
+
+    @property
+    def built(self):
+        return self._index is not None
+
+    def contains(self, pk):
+        with self._lock:
+            return self._index is not None and pk in self._index
+
+    def update(self, pk, label, terms):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(('add', (pk, label, terms)))
+            if self._index is not None:
+                self._index.add(pk, label, terms)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(('remove', (pk,)))
+            if self._index is not None:
+                self._index.remove(pk)
+
+    def reset(self):
+        with self._lock:
+            self._index = None
+
+
+def book_entry(pk, title, isbn):
+    return pk, title, [title, *title.split(), isbn]
+
+
+def author_entry(pk, last_name, first_name, middle_name):
+    return pk, ' '.join(filter(None, [last_name, first_name, middle_name])), [last_name, first_name]
+
+
+def reader_entry(pk, last_name, first_name, middle_name, passport, phone):
+    label = ' '.join(filter(None, [last_name, first_name, middle_name])) or str(pk)
+    return pk, label, [last_name, passport, phone, (phone or '').lstrip('+')]
+
+
+def inventory_entry(pk, number, title):
+    return pk, f"{number} — {title}", [number, number.removeprefix('INV-')]
+
+
+def load_books():
+    for row in Book.objects.values_list('pk', 'title', 'isbn').iterator(chunk_size=5000):
+        yield book_entry(*row)
+
+
+def load_authors():
+    for row in Author.objects.values_list('pk', 'last_name', 'first_name', 'middle_name').iterator(chunk_size=5000):
+        yield author_entry(*row)
+
+
+def load_readers():
+    readers = User.objects.filter(role='reader', is_active=True).values_list(
+        'pk', 'last_name', 'first_name', 'middle_name', 'passport', 'phone'
+    )
+    for row in readers.iterator(chunk_size=5000):
+        yield reader_entry(*row)
+
+
+def load_inventory():
+    copies = Inventory.objects.exclude(status='deleted').filter(book__is_deleted=False).values_list(
+        'pk', 'inventory_number', 'book__title'
+    )
+    for row in copies.iterator(chunk_size=5000):
+        yield inventory_entry(*row)
+
+
+indexes = {
+    'books': AutocompleteIndex(load_books),
+    'authors': AutocompleteIndex(load_authors),
+    'readers': AutocompleteIndex(load_readers),
+    'inventory': AutocompleteIndex(load_inventory),
+}
+
+
+def reset_all():
+    for index in indexes.values():
+        index.reset()
@@ -0,0 +1,362 @@
+import datetime
+import math
+import random
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from drfsite.instrumentation import RequestMetrics
+from . import overdue, stats
+from .authentication import LibraryAccessToken
+from .bulkload import insert_rows
+from .models import User, Author, Direction, Publisher, Book, Inventory, InventorySequence, BookIssue, BookReturn
+from .search import build_search_document
+
+SUBJECTS = [
+    'Алгебра', 'Геометрия', 'Физика', 'Химия', 'Биология', 'История', 'География', 'Литература',
+    'Информатика', 'Экономика', 'Обществознание', 'Астрономия', 'Экология', 'Философия', 'Право',
+    'Психология', 'Педагогика', 'Музыка', 'Черчение', 'Статистика',
+]
+KINDS = ['учебник', 'задачник', 'практикум', 'хрестоматия', 'справочник', 'пособие', 'сборник задач']
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Усенов', 'Асанов', 'Кузнецов', 'Смирнов', 'Попов', 'Волков', 'Морозов']
+FIRST_NAMES = ['Азамат', 'Айбек', 'Алексей', 'Бакыт', 'Дмитрий', 'Иван', 'Нурлан', 'Сергей', 'Тимур', 'Эмиль']
+CATEGORIES = [code for code, _ in Book.CATEGORY_CHOICES]
+
+LOAN_DAYS = 14
+OPEN_LOAN_DAYS = 40
+
+
+class LibrarySeeder:
+    """Синтетическая библиотека для нагрузочных замеров: справочники, читатели, книги,
+    экземпляры, история выдач с возвратами и текущие выдачи (часть из них просрочена).
+
+    Данные детерминированы (random.Random(seed)), id задаются явно, поэтому возвраты
+    и счётчики книг считаются без чтения вставленного обратно. Рассчитан на пустую базу.
+    """
+
+    def __init__(self, books, copies, issues, readers, days=730, seed=1, log=print):
+        if copies < books:
+            raise ValueError("Экземпляров должно быть не меньше, чем книг.")
+        self.books, self.copies, self.issues, self.readers = books, copies, issues, readers
+        self.days = days
+        self.seed = seed
+        self.log = log
+        self.today = timezone.localdate()
+        # Текущие выдачи: у первой половины читателей, не больше двух на читателя (лимит — три),
+        # и не больше 5% фонда. Остальные читатели свободны для сценария выдачи.
+        self.borrowers = max(readers // 2, 1)
+        self.open_count = min(copies // 20, self.borrowers * 2, issues)
+        self.closed_count = issues - self.open_count
+
+    def run(self):
+        if Book.all_objects.exists() or BookIssue.all_objects.exists():
+            raise ValueError("База не пуста: заполнение рассчитано на новую базу после migrate.")
+
+        self.librarian = User.objects.create_user(
+            username='bench_librarian', password='bench', role='librarian',
+            first_name='Библиотекарь', last_name='Тестовый',
+        )
+        self._step('Справочники', self._seed_references)
+        self._step('Читатели', self._seed_readers)
+        self._step('Книги', self._seed_books)
+        self._step('Экземпляры', self._seed_copies)
+        self._step('Выдачи', self._seed_issues)
+        self._step('Возвраты', self._seed_returns)
+
+        models = [Book, Book.authors.through, Inventory, BookIssue, BookReturn]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        # Выдачи и возвраты вставлены мимо сигналов: статистика обращения строится целиком.
+        self._step('Статистика обращения', stats.rebuild)
+        self._step('Начисление штрафов', lambda: overdue.sweep()['accrued'])
+
+    def _step(self, name, method):
+        started = time.perf_counter()
+        count = method()
+        elapsed = time.perf_counter() - started
+        self.log(f"{name}: {count} за {elapsed:.1f} с ({count / max(elapsed, 1e-6):.0f} строк/с)")
+
+    def _seed_references(self):
+        self.directions = [d.pk for d in Direction.objects.bulk_create(Direction(name=s) for s in SUBJECTS)]
+        self.publishers = [p.pk for p in Publisher.objects.bulk_create(
+            Publisher(name=f'Издательство {i + 1}') for i in range(50)
+        )]
+        self.authors = Author.objects.bulk_create(
+            Author(last_name=f'{LAST_NAMES[i % 10]}{i // 10 or ""}', first_name=FIRST_NAMES[i // 10 % 10])
+            for i in range(max(self.books // 20, 10))
+        )
+        return len(self.directions) + len(self.publishers) + len(self.authors)
+
+    def _seed_readers(self):
+        password = make_password('bench')
+        readers = User.objects.bulk_create((
+            User(
+                username=f'reader{i:07d}', password=password, role='reader',
+                last_name=LAST_NAMES[i % 10], first_name=FIRST_NAMES[i // 10 % 10],
+            ) for i in range(self.readers)
+        ), batch_size=5000)
+        self.reader_ids = [reader.pk for reader in readers]
+        return len(readers)
+
+    def book_of_copy(self, index):
+        # Экземпляры идут подряд по книгам: первые copies % books книг получают на один больше.
+        per_book, extra = divmod(self.copies, self.books)
+        boundary = extra * (per_book + 1)
+        if index < boundary:
+            return index // (per_book + 1)
+        return extra + (index - boundary) // per_book
+
+    def open_copies(self):
+        stride = self.copies // self.open_count if self.open_count else 1
+        return range(0, stride * self.open_count, stride)
+
+    def _seed_books(self):
+        rng = random.Random(self.seed)
+        per_book, extra = divmod(self.copies, self.books)
+        borrowed = [0] * self.books
+        for copy in self.open_copies():
+            borrowed[self.book_of_copy(copy)] += 1
+        book_authors = [rng.sample(self.authors, rng.randint(1, 2)) for _ in range(self.books)]
+
+        def rows():
+            for index, authors in enumerate(book_authors):
+                quantity = per_book + (index < extra)
+                book = Book(
+                    title=f'{SUBJECTS[index % len(SUBJECTS)]}. {KINDS[index // 20 % len(KINDS)]} {index + 1}',
+                    description=f'{rng.choice(KINDS).capitalize()} для {rng.randint(1, 11)} класса',
+                    udc=f'{rng.randint(1, 999)}.{rng.randint(1, 99)}', bbk=f'{rng.randint(10, 99)}.{rng.randint(1, 9)}',
+                    isbn=f'978{index:010d}',
+                )
+                yield (
+                    index + 1, False, book.title, self.directions[index % len(self.directions)],
+                    rng.choice(self.publishers), book.udc, book.bbk, book.isbn, quantity,
+                    rng.choice(CATEGORIES), book.description, build_search_document(book, authors),
+                    quantity - borrowed[index], borrowed[index], 0,
+                )
+
+        insert_rows(Book, [
+            'id', 'is_deleted', 'title', 'direction', 'publisher', 'udc', 'bbk', 'isbn', 'quantity',
+            'category', 'description', 'search_document', 'available_count', 'borrowed_count', 'deleted_count',
+        ], rows())
+        insert_rows(Book.authors.through, ['book', 'author'], (
+            (index + 1, author.pk)
+            for index, authors in enumerate(book_authors)
+            for author in authors
+        ))
+        return self.books
+
+    def _seed_copies(self):
+        numbers = InventorySequence.allocate(self.copies)
+        borrowed = set(self.open_copies())
+        insert_rows(Inventory, ['id', 'book', 'inventory_number', 'status'], (
+            (
+                index + 1, self.book_of_copy(index) + 1, Inventory.format_number(number),
+                'borrowed' if index in borrowed else 'available',
+            )
+            for index, number in enumerate(numbers)
+        ))
+        return self.copies
+
+    def closed_issues(self):
+        """(id, читатель, экземпляр, дата выдачи, срок, дата возврата) — та же последовательность при каждом вызове."""
+        # Миллионы строк: даты берутся из заранее посчитанного списка, случайные числа — через random().
+        rng = random.Random(self.seed + 1)
+        start = self.today - datetime.timedelta(days=self.days)
+        dates = [start + datetime.timedelta(days=day) for day in range(self.days + LOAN_DAYS + 1)]
+        readers, copies = self.reader_ids, self.copies
+        for index in range(self.closed_count):
+            day = index * (self.days - 1) // max(self.closed_count, 1)
+            returned = min(day + 1 + int(rng.random() * 30), self.days)
+            yield (
+                index + 1, readers[int(rng.random() * len(readers))], int(rng.random() * copies) + 1,
+                dates[day], dates[day + LOAN_DAYS], dates[returned],
+            )
+
+    def _seed_issues(self):
+        insert_rows(BookIssue, [
+            'id', 'is_deleted', 'reader', 'inventory', 'issue_date', 'due_date', 'issued_by', 'is_open', 'accrued_fine',
+        ], self._issue_rows())
+        return self.issues
+
+    def _issue_rows(self):
+        librarian = self.librarian.pk
+        for pk, reader, copy, issued, due, _ in self.closed_issues():
+            yield pk, False, reader, copy, issued, due, librarian, False, 0
+
+        # Текущие выдачи — последние по id, выданы за последние OPEN_LOAN_DAYS дней.
+        rng = random.Random(self.seed + 2)
+        for number, copy in enumerate(self.open_copies()):
+            issued = self.today - datetime.timedelta(days=rng.randint(0, OPEN_LOAN_DAYS))
+            yield (
+                self.closed_count + number + 1, False, self.reader_ids[number % self.borrowers], copy + 1,
+                issued, issued + datetime.timedelta(days=LOAN_DAYS), librarian, True, 0,
+            )
+
+    def _seed_returns(self):
+        librarian = self.librarian.pk
+        insert_rows(BookReturn, ['id', 'is_deleted', 'issue', 'return_date', 'condition', 'fine', 'received_by'], (
+            (pk, False, pk, returned, '', max((returned - due).days, 0) * BookReturn.FINE_PER_DAY, librarian)
+            for pk, _, _, _, due, returned in self.closed_issues()
+        ))
+        return self.closed_count
+
+
+# --- Замеры API ---
+
+class Scenario:
+    """Сценарий замера: prepare() готовит запросы (method, path, data) до начала отсчёта."""
+    method = 'get'
+
+    def __init__(self, name, path=None):
+        self.name = name
+        self.path = path
+
+    def prepare(self, count, rng):
+        return [(self.method, self.path, None)] * count
+
+
+class CatalogueScenario(Scenario):
+    def prepare(self, count, rng):
+        total = Book.objects.count()
+        return [
+            ('get', f'/api/books/?view=slim&ordering=title&limit=50&offset={rng.randrange(max(total - 50, 1))}', None)
+            for _ in range(count)
+        ]
+
+
+class SearchScenario(Scenario):
+    def prepare(self, count, rng):
+        return [
+            ('get', f'/api/books/search/?q={rng.choice(SUBJECTS)} {rng.choice(KINDS)}&limit=20', None)
+            for _ in range(count)
+        ]
+
+
+class IssueScenario(Scenario):
+    # Каждому читателю — одна книга: лимит выдач не мешает повторным прогонам.
+    def prepare(self, count, rng):
+        open_loans = BookIssue.objects.filter(is_open=True).values('reader')
+        readers = list(User.objects.filter(role='reader', is_active=True).exclude(
+            pk__in=open_loans
+        ).values_list('pk', flat=True)[:count])
+        books = list(Book.objects.filter(available_count__gt=0).values_list('pk', flat=True)[:count * 10])
+        if len(readers) < count or not books:
+            raise ValueError("Не хватает свободных читателей или книг для сценария выдачи.")
+        due_date = (timezone.localdate() + datetime.timedelta(days=LOAN_DAYS)).isoformat()
+        return [
+            ('post', '/api/issues/', {'reader_id': reader, 'book_id': rng.choice(books), 'due_date': due_date})
+            for reader in readers
+        ]
+
+
+class ReturnScenario(Scenario):
+    # Возвращаются последние открытые выдачи — после сценария выдачи это именно они.
+    def prepare(self, count, rng):
+        issues = list(BookIssue.objects.filter(is_open=True).order_by('-id').values_list('pk', flat=True)[:count])
+        return [('post', '/api/returns/', {'issue_id': issue}) for issue in issues]
+
+
+SCENARIOS = [
+    CatalogueScenario('catalogue'),
+    SearchScenario('search'),
+    IssueScenario('issue'),
+    ReturnScenario('return'),
+    Scenario('issued_books_report', '/reports/issued-books/?page_size=100'),
+    Scenario('overdue_report', '/reports/overdue-books/?limit=100'),
+    Scenario('outstanding_fines_report', '/reports/outstanding-fines/?limit=100'),
+    Scenario('availability_report', '/reports/book-availability/?limit=100'),
+    Scenario('reader_activity_report', '/reports/reader-activity/?ordering=activity&limit=100'),
+    Scenario('dashboard', '/reports/dashboard/'),
+    Scenario('circulation_trend', '/reports/circulation-trend/?period=month'),
+    Scenario('top_books_report', '/reports/top-books/'),
+]
+
+
+def _percentile(values, percent):
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+def run_scenario(scenario, user, requests, concurrency=1, warmup=3, seed=1):
+    """Запросы идут через APIClient в этом же процессе (полный стек Django и DRF, без сети).
+    При concurrency > 1 — в потоках, у каждого своё соединение с базой."""
+    rng = random.Random(seed)
+    plan = scenario.prepare(warmup + requests, rng)
+    warmup_plan, plan = plan[:warmup], plan[warmup:]
+    # Токен живёт весь прогон: ACCESS_TOKEN_LIFETIME короче долгих сценариев.
+    token = LibraryAccessToken.for_user(user)
+    token.set_exp(lifetime=datetime.timedelta(days=1))
+    token = str(token)
+    results = []
+
+    def worker(items):
+        # Ошибка сервера (например, блокировка SQLite при параллельной записи) считается ответом 500.
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        try:
+            for method, path, data in items:
+                metrics = RequestMetrics()
+                started = time.perf_counter()
+                with connection.execute_wrapper(metrics):
+                    if method == 'get':
+                        response = client.get(path)
+                    else:
+                        response = client.post(path, data, format='json')
+                elapsed = time.perf_counter() - started
+                size = 0 if response.streaming else len(response.content)
+                results.append((elapsed, metrics.queries, metrics.sql_time, response.status_code, size))
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+    worker(warmup_plan)
+    results.clear()
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        threads = [threading.Thread(target=worker, args=(plan[i::concurrency],)) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        worker(plan)
+    wall = time.perf_counter() - started
+
+    if not results:
+        return {'requests': 0}
+    latencies = sorted(elapsed * 1000 for elapsed, *_ in results)
+    queries = [count for _, count, *_ in results]
+    return {
+        'requests': len(results),
+        'errors': sum(status >= 400 for *_, status, _ in results),
+        'statuses': sorted({status for *_, status, _ in results}),
+        'concurrency': concurrency,
+        'seconds': round(wall, 3),
+        'throughput_rps': round(len(results) / wall, 1),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 2),
+            'p50': round(_percentile(latencies, 50), 2),
+            'p90': round(_percentile(latencies, 90), 2),
+            'p99': round(_percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2),
+        },
+        'queries': {'mean': round(sum(queries) / len(queries), 1), 'max': max(queries)},
+        'sql_ms_mean': round(sum(sql for _, _, sql, *_ in results) * 1000 / len(results), 2),
+        'response_bytes_mean': round(sum(size for *_, size in results) / len(results)),
+    }
+
+
+def dataset_summary():
+    return {
+        'books': Book.objects.count(),
+        'copies': Inventory.objects.count(),
+        'issues': BookIssue.objects.count(),
+        'open_issues': BookIssue.objects.filter(is_open=True).count(),
+        'readers': User.objects.filter(role='reader').count(),
+    }
@@ -0,0 +1,61 @@
+from itertools import islice
+
+from django.db import connection, transaction
+
+
+class _CopyStream:
+    """Файл для COPY FROM STDIN (psycopg2): строки генератора отдаются в текстовом формате COPY."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._buffer = ''
+
+    def read(self, size=-1):
+        # Строки копятся списком: += к атрибуту-строке копировал бы весь буфер на каждой строке.
+        lines, length = [self._buffer], len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = '\t'.join(map(_copy_value, row)) + '\n'
+            lines.append(line)
+            length += len(line)
+        data = ''.join(lines)
+        if size < 0:
+            size = len(data)
+        data, self._buffer = data[:size], data[size:]
+        return data
+
+    readline = read
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return str(value)
+
+
+def insert_rows(model, fields, rows, batch_size=10000):
+    """Вставка строк в обход ORM: COPY в PostgreSQL, executemany пачками в остальных СУБД.
+    Модели при этом не создаются, auto_now_add не подставляет текущую дату."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+    rows = iter(rows)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql = f"COPY {table} ({columns}) FROM STDIN"
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                raw.copy_expert(sql, _CopyStream(rows), size=256 * 1024)
+            else:
+                with raw.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            return
+        sql = f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+        while chunk := list(islice(rows, batch_size)):
+            cursor.executemany(sql, chunk)
@@ -0,0 +1,64 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import quote_etag
+
+
+def get_cache():
+    return caches[settings.REFERENCE_CACHE_ALIAS]
+
+
+def object_key(model, pk):
+    return f"ref:{model._meta.label_lower}:{pk}"
+
+
+def stamp_key(model):
+    return f"ref:{model._meta.label_lower}:stamp"
+
+
+def get_reference_data(model, serializer_class, ids):
+    """Сериализованные справочные объекты по id: сначала из кэша, промахи — одним запросом."""
+    cache = get_cache()
+    keys = {pk: object_key(model, pk) for pk in ids}
+    cached = cache.get_many(keys.values())
+
+    result = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in result]
+    if missing:
+        loaded = {
+            pk: dict(serializer_class(obj).data)
+            for pk, obj in model.all_objects.in_bulk(missing).items()
+        }
+        cache.set_many({keys[pk]: data for pk, data in loaded.items()}, settings.REFERENCE_CACHE_TIMEOUT)
+        result.update(loaded)
+    return result
+
+
+def touch(model):
+    get_cache().set(stamp_key(model), time.time(), settings.REFERENCE_STAMP_TIMEOUT)
+
+
+def invalidate(model, pk):
+    get_cache().delete(object_key(model, pk))
+    touch(model)
+
+
+def get_stamp(model):
+    """Отметка последней правки модели (touch). Общая для воркеров, если общий кэш; с кэшем
+    в памяти процесса правку в другом воркере видно не позже чем через REFERENCE_STAMP_TIMEOUT."""
+    cache = get_cache()
+    stamp = cache.get(stamp_key(model))
+    if stamp is None:
+        stamp = time.time()
+        cache.add(stamp_key(model), stamp, settings.REFERENCE_STAMP_TIMEOUT)
+        stamp = cache.get(stamp_key(model), stamp)
+    return stamp
+
+
+def list_validators(model, request):
+    """ETag и Last-Modified для списка справочника: меняются при любой правке модели."""
+    stamp = get_stamp(model)
+    digest = hashlib.md5(f"{stamp}:{request.get_full_path()}".encode()).hexdigest()
+    return quote_etag(digest), int(stamp)
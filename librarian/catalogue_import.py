@@ -0,0 +1,317 @@
+import csv
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from . import cache
+from .models import Author, Direction, Publisher, Book, Inventory, InventorySequence
+from .search import refresh_search_documents
+
+BOOK_FIELDS = ('title', 'isbn', 'udc', 'bbk', 'category', 'description', 'publisher_id', 'direction_id')
+
+CATEGORIES = {}
+for code, label in Book.CATEGORY_CHOICES:
+    CATEGORIES[code] = code
+    CATEGORIES[label.strip().casefold()] = code
+
+
+def normalize_isbn(isbn):
+    return re.sub(r'[^0-9X]', '', (isbn or '').upper())
+
+
+def split_author(name):
+    """«Иванов, Иван Иванович» или «Иванов Иван Иванович» → (фамилия, имя, отчество)."""
+    if ',' in name:
+        last_name, _, rest = name.partition(',')
+        parts = rest.split()
+    else:
+        last_name, *parts = name.split()
+    return last_name.strip(), (parts[0] if parts else ''), ' '.join(parts[1:])
+
+
+def _text(raw, key, model=None, field=None):
+    value = (raw.get(key) or '').strip()
+    if model is not None:
+        max_length = model._meta.get_field(field or key).max_length
+        if max_length and len(value) > max_length:
+            raise ValueError(f"Поле {key} длиннее {max_length} символов.")
+    return value
+
+
+def clean_record(raw, default_quantity=1):
+    """Проверяет и нормализует одну запись каталога (из CSV или MARC)."""
+    title = _text(raw, 'title', Book)
+    if not title:
+        raise ValueError("Не указано название.")
+
+    authors = raw.get('authors') or []
+    if isinstance(authors, str):
+        authors = authors.split(';')
+    names = []
+    for name in authors:
+        if not name.strip():
+            continue
+        author = split_author(name)
+        if any(len(part) > 50 for part in author):
+            raise ValueError(f"Слишком длинное имя автора: {name.strip()}")
+        names.append(author)
+
+    quantity = raw.get('quantity')
+    if quantity in (None, ''):
+        quantity = default_quantity
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректное количество: {quantity}")
+    if quantity < 0:
+        raise ValueError("Количество не может быть отрицательным.")
+
+    return {
+        'title': title,
+        'authors': names,
+        'publisher': _text(raw, 'publisher', Publisher, 'name'),
+        'direction': _text(raw, 'direction', Direction, 'name'),
+        'isbn': _text(raw, 'isbn', Book),
+        'udc': _text(raw, 'udc', Book),
+        'bbk': _text(raw, 'bbk', Book),
+        'category': CATEGORIES.get(_text(raw, 'category').casefold(), 'other' if raw.get('category') else ''),
+        'description': _text(raw, 'description'),
+        'quantity': quantity,
+    }
+
+
+def read_csv(stream, delimiter=','):
+    reader = csv.DictReader(stream, delimiter=delimiter)
+    missing = {'title'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"В CSV нет обязательных колонок: {', '.join(sorted(missing))}")
+    yield from reader
+
+
+# --- MARC21 в формате ISO 2709 ---
+
+FIELD_TERMINATOR = b'\x1e'
+RECORD_TERMINATOR = b'\x1d'
+SUBFIELD_DELIMITER = b'\x1f'
+
+
+def read_marc(stream, encoding=None):
+    """Читает записи ISO 2709 по одной: длина записи берётся из маркера, файл целиком
+    в память не загружается. Кодировка — из позиции 9 маркера (a — UTF-8), иначе
+    encoding или cp1251 (MARC-8 не поддерживается)."""
+    while True:
+        leader = stream.read(24)
+        while leader[:1] in (b'\r', b'\n'):
+            leader = leader[1:] + stream.read(1)
+        if not leader.strip():
+            return
+        if len(leader) < 24 or not leader[:5].isdigit() or not leader[12:17].isdigit():
+            raise ValueError("Повреждённый маркер MARC-записи.")
+
+        length, base = int(leader[:5]), int(leader[12:17])
+        body = stream.read(length - 24)
+        if len(body) != length - 24 or not body.endswith(RECORD_TERMINATOR):
+            raise ValueError("MARC-запись обрезана.")
+
+        record_encoding = 'utf-8' if leader[9:10] == b'a' else (encoding or 'cp1251')
+        directory = body[:base - 25]
+        data = body[base - 24:]
+
+        fields = {}
+        for position in range(0, len(directory) - 11, 12):
+            entry = directory[position:position + 12]
+            tag = entry[:3].decode('ascii')
+            field_length, start = int(entry[3:7]), int(entry[7:12])
+            value = data[start:start + field_length].rstrip(FIELD_TERMINATOR)
+            fields.setdefault(tag, []).append(_marc_subfields(tag, value, record_encoding))
+        yield marc_to_raw(fields)
+
+
+def _marc_subfields(tag, value, encoding):
+    if tag < '010':
+        return value.decode(encoding, errors='replace')
+    subfields = {}
+    for chunk in value.split(SUBFIELD_DELIMITER)[1:]:
+        if chunk:
+            subfields.setdefault(chunk[:1].decode('ascii', errors='replace'), []).append(
+                chunk[1:].decode(encoding, errors='replace')
+            )
+    return subfields
+
+
+def _first(fields, tag, code):
+    for subfields in fields.get(tag, ()):
+        if subfields.get(code):
+            return subfields[code][0]
+    return ''
+
+
+def _strip_isbd(value):
+    # Знаки предписанной пунктуации ISBD в конце подполей: «Название /», «Москва :».
+    return value.strip().rstrip(' /:;,=.').strip()
+
+
+def marc_to_raw(fields):
+    title = _strip_isbd(_first(fields, '245', 'a'))
+    subtitle = _strip_isbd(_first(fields, '245', 'b'))
+    authors = [
+        _strip_isbd(name)
+        for tag in ('100', '700')
+        for subfields in fields.get(tag, ())
+        for name in subfields.get('a', [])[:1]
+    ]
+    isbn = _first(fields, '020', 'a').split(' ')[0]
+    items = len(fields.get('876', ()))
+    return {
+        'title': f"{title}: {subtitle}" if subtitle else title,
+        'authors': authors,
+        'publisher': _strip_isbd(_first(fields, '264', 'b') or _first(fields, '260', 'b')),
+        'direction': _strip_isbd(_first(fields, '650', 'a')),
+        'isbn': isbn,
+        'udc': _first(fields, '080', 'a').strip(),
+        'bbk': _first(fields, '084', 'a').strip(),
+        'description': _first(fields, '520', 'a').strip(),
+        # 876 — сведения об экземпляре; без них берётся количество по умолчанию.
+        'quantity': items or None,
+    }
+
+
+class CatalogueImporter:
+    """Пакетная загрузка каталога. Справочники и ISBN книг держатся в словарях в памяти,
+    поэтому на пакет уходит постоянное число запросов, а не по нескольку на книгу."""
+
+    def __init__(self):
+        self.stats = Counter()
+        self._authors = {
+            self._author_key(a.last_name, a.first_name, a.middle_name): a.pk
+            for a in Author.objects.only('pk', 'last_name', 'first_name', 'middle_name').iterator(chunk_size=5000)
+        }
+        self._publishers = {name.casefold(): pk for pk, name in Publisher.objects.values_list('pk', 'name')}
+        self._directions = {name.casefold(): pk for pk, name in Direction.objects.values_list('pk', 'name')}
+        self._books = {}
+        for pk, isbn in Book.objects.exclude(isbn='').values_list('pk', 'isbn').iterator(chunk_size=5000):
+            self._books.setdefault(normalize_isbn(isbn), pk)
+
+    @staticmethod
+    def _author_key(last_name, first_name, middle_name):
+        return last_name.casefold(), first_name.casefold(), middle_name.casefold()
+
+    def _resolve_names(self, model, lookup, names):
+        missing = {}
+        for name in names:
+            if name and name.casefold() not in lookup:
+                missing.setdefault(name.casefold(), name)
+        if missing:
+            for obj in model.objects.bulk_create([model(name=name) for name in missing.values()]):
+                lookup[obj.name.casefold()] = obj.pk
+            self.stats[f'{model._meta.model_name}s_created'] += len(missing)
+
+    def _resolve_authors(self, records):
+        missing = {}
+        for record in records:
+            for names in record['authors']:
+                key = self._author_key(*names)
+                if key not in self._authors:
+                    missing.setdefault(key, names)
+        if missing:
+            created = Author.objects.bulk_create([
+                Author(last_name=last_name, first_name=first_name, middle_name=middle_name)
+                for last_name, first_name, middle_name in missing.values()
+            ])
+            for key, author in zip(missing, created):
+                self._authors[key] = author.pk
+            self.stats['authors_created'] += len(created)
+
+    @transaction.atomic
+    def import_batch(self, records):
+        # Повтор ISBN внутри пакета: метаданные берутся из последней записи, количество — наибольшее.
+        unique, without_isbn = {}, []
+        for record in records:
+            isbn = normalize_isbn(record['isbn'])
+            if not isbn:
+                without_isbn.append(record)
+            elif isbn in unique:
+                record['quantity'] = max(record['quantity'], unique[isbn]['quantity'])
+                unique[isbn] = record
+            else:
+                unique[isbn] = record
+        records = [*unique.values(), *without_isbn]
+
+        self._resolve_names(Publisher, self._publishers, (r['publisher'] for r in records))
+        self._resolve_names(Direction, self._directions, (r['direction'] for r in records))
+        self._resolve_authors(records)
+
+        existing = Book.objects.in_bulk({self._books[isbn] for isbn in unique if isbn in self._books})
+        new_books, updated_books, copies = [], [], []
+        for record in records:
+            values = {
+                'title': record['title'],
+                'isbn': record['isbn'],
+                'udc': record['udc'],
+                'bbk': record['bbk'],
+                'category': record['category'],
+                'description': record['description'],
+                'publisher_id': self._publishers.get(record['publisher'].casefold()),
+                'direction_id': self._directions.get(record['direction'].casefold()),
+            }
+            book = existing.get(self._books.get(normalize_isbn(record['isbn'])))
+            if book is None:
+                values['category'] = values['category'] or 'other'
+                # bulk_create обходит Book.save(), поэтому счётчик выставляем сами.
+                book = Book(quantity=record['quantity'], available_count=record['quantity'], **values)
+                new_books.append(book)
+                copies.append((book, record['quantity']))
+            else:
+                # Пустые поля файла не затирают уже заполненные в каталоге.
+                for field, value in values.items():
+                    if value not in (None, ''):
+                        setattr(book, field, value)
+                diff = record['quantity'] - book.quantity
+                if diff > 0:
+                    book.quantity = record['quantity']
+                    book.available_count = F('available_count') + diff
+                    copies.append((book, diff))
+                elif diff < 0:
+                    # Списание экземпляров — решение библиотекаря, импорт его не делает.
+                    self.stats['decreases_skipped'] += 1
+                updated_books.append(book)
+            record['book'] = book
+
+        Book.objects.bulk_create(new_books, batch_size=1000)
+        for book in new_books:
+            if book.isbn:
+                self._books[normalize_isbn(book.isbn)] = book.pk
+        if updated_books:
+            Book.objects.bulk_update(
+                updated_books, [*BOOK_FIELDS, 'quantity', 'available_count'], batch_size=1000
+            )
+
+        Book.authors.through.objects.bulk_create([
+            Book.authors.through(book_id=record['book'].pk, author_id=self._authors[self._author_key(*names)])
+            for record in records
+            for names in dict.fromkeys(record['authors'])
+        ], batch_size=5000, ignore_conflicts=True)
+
+        total = sum(count for _, count in copies)
+        if total:
+            numbers = iter(InventorySequence.allocate(total))
+            Inventory.objects.bulk_create([
+                Inventory(book_id=book.pk, inventory_number=Inventory.format_number(next(numbers)))
+                for book, count in copies
+                for _ in range(count)
+            ], batch_size=5000)
+
+        refresh_search_documents([record['book'].pk for record in records])
+
+        self.stats['books_created'] += len(new_books)
+        self.stats['books_updated'] += len(updated_books)
+        self.stats['copies_created'] += total
+
+    def finish(self):
+        # Новые справочные записи должны поменять ETag списков (кэш общий при Redis).
+        # Автодополнение работающего сервера подхватит изменения при плановой перестройке.
+        for model in (Author, Publisher, Direction):
+            if self.stats[f'{model._meta.model_name}s_created']:
+                cache.touch(model)
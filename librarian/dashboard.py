@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Count, DateField, F, Max, Q, Sum, Value
+
+from . import fines, stats
+from .expressions import DaysBetween
+from .models import User, Book, BookIssue
+
+
+def availability_totals(params):
+    return Book.objects.aggregate(
+        books=Count('pk'),
+        available=Sum('available_count', default=0),
+        borrowed=Sum('borrowed_count', default=0),
+        deleted=Sum('deleted_count', default=0),
+    )
+
+
+def availability_by_category(params):
+    return list(Book.objects.values('category').annotate(
+        books=Count('pk'),
+        available=Sum('available_count'),
+        borrowed=Sum('borrowed_count'),
+    ).order_by('category'))
+
+
+def overdue_summary(params):
+    # Открытые выдачи со сроком раньше сегодняшнего — частичный индекс bookissue_open_due_idx.
+    today = params['today']
+    days_overdue = DaysBetween(Value(today, output_field=DateField()), F('due_date'))
+    return BookIssue.objects.filter(due_date__lt=today, is_open=True).aggregate(
+        loans=Count('pk'),
+        readers=Count('reader', distinct=True),
+        max_days_overdue=Max(days_overdue),
+        accrued_fines=Sum(fines.get_rules().expression(today), default=0),
+    )
+
+
+# Активность за период — из дневной статистики (CirculationStats), а не из всех выдач и возвратов.
+def _period_stats(params, scope):
+    return stats.period_rows(scope, params['date_from'], params['date_to'])
+
+
+def activity_totals(params):
+    # Сначала итог по читателю: строк-приращений за день у читателя может быть несколько,
+    # и выдача с последующим удалением в сумме даёт ноль.
+    totals = _period_stats(params, 'reader').values('key').annotate(issues_sum=Sum('issues')).aggregate(
+        total_issues=Sum('issues_sum', default=0),
+        active_readers=Count('key', filter=Q(issues_sum__gt=0)),
+    )
+    return {'issues': totals['total_issues'], 'active_readers': totals['active_readers']}
+
+
+def returns_totals(params):
+    return _period_stats(params, 'total').aggregate(returns=Sum('returns', default=0), fines=Sum('fines', default=0))
+
+
+def top_readers(params):
+    rows = _period_stats(params, 'reader').values('key').annotate(
+        books_borrowed=Sum('issues'),
+    ).filter(books_borrowed__gt=0).order_by('-books_borrowed', 'key')[:params['top']]
+    return [
+        {'reader_id': row['key'], 'last_name': row['last_name'], 'first_name': row['first_name'],
+         'books_borrowed': row['books_borrowed']}
+        for row in stats.with_names(rows, User, 'key', ['last_name', 'first_name'])
+    ]
+
+
+def top_books(params):
+    rows = stats.top_books(params['date_from'], params['date_to'], params['top'])
+    return [
+        {'book_id': row['book_id'], 'title': row['title'], 'issues': row['total_issues']}
+        for row in stats.with_names(rows, Book, 'book_id', ['title'])
+    ]
+
+
+SECTIONS = {
+    'availability': availability_totals,
+    'availability_by_category': availability_by_category,
+    'overdue': overdue_summary,
+    'activity': activity_totals,
+    'returns': returns_totals,
+    'top_readers': top_readers,
+    'top_books': top_books,
+}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _section_executor():
+    """Общий для процесса пул из DASHBOARD_SECTION_THREADS потоков: разделы одновременных
+    сводок ждут в его очереди, а не открывают по соединению на каждый."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.DASHBOARD_SECTION_THREADS,
+                                           thread_name_prefix='dashboard')
+        return _executor
+
+
+def _run_section(section, params):
+    # Поток из пула: соединение закрывается сразу после раздела, независимо от CONN_MAX_AGE,
+    # чтобы простаивающие потоки пула не держали соединения с БД.
+    close_old_connections()
+    try:
+        return section(params)
+    finally:
+        connection.close()
+
+
+async def _gather(params):
+    executor = _section_executor()
+    results = await asyncio.gather(*(
+        sync_to_async(_run_section, thread_sensitive=False, executor=executor)(section, params)
+        for section in SECTIONS.values()
+    ))
+    return dict(zip(SECTIONS, results))
+
+
+def compute_sections(params):
+    """Считает разделы сводки одновременно, каждый в своём потоке и соединении,
+    так что сводка стоит как самый медленный раздел, а не как их сумма.
+
+    Async ORM Django (aaggregate и т. п.) выполняет запросы в одном общем потоке
+    по очереди, поэтому параллельность даёт sync_to_async(thread_sensitive=False).
+    Внутри транзакции разделы считаются последовательно в текущем соединении:
+    другие соединения не видят её незафиксированных изменений.
+    """
+    if _sequential():
+        return _compute_sequentially(params)
+    return async_to_sync(_gather)(params)
+
+
+async def acompute_sections(params):
+    """То же для асинхронного представления: разделы ожидаются прямо в цикле событий."""
+    if await sync_to_async(_sequential)():
+        return await sync_to_async(_compute_sequentially)(params)
+    return await _gather(params)
+
+
+def _sequential():
+    # Соединение текущего потока: из корутины проверяется через sync_to_async.
+    return connection.in_atomic_block or not settings.DASHBOARD_PARALLEL_SECTIONS
+
+
+def _compute_sequentially(params):
+    return {name: section(params) for name, section in SECTIONS.items()}
@@ -0,0 +1,100 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.db import transaction
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import autocomplete
+from .models import User
+from .passwords import hash_passwords
+
+UNIQUE_FIELDS = {
+    'username': "Логин уже занят.",
+    'passport': "Читатель с таким паспортом уже зарегистрирован.",
+    'phone': "Этот номер телефона уже зарегистрирован.",
+}
+LOOKUP_CHUNK = 1000
+
+
+class InviteTokenGenerator(PasswordResetTokenGenerator):
+    # Своя соль: приглашение не годится для сброса пароля и наоборот. Токен перестаёт
+    # действовать, как только пароль задан, и через PASSWORD_RESET_TIMEOUT.
+    key_salt = 'librarian.enrollment.InviteTokenGenerator'
+
+
+invite_token_generator = InviteTokenGenerator()
+
+
+def make_invite(user):
+    return {'uid': urlsafe_base64_encode(force_bytes(user.pk)), 'token': invite_token_generator.make_token(user)}
+
+
+def find_conflicts(rows):
+    """{индекс строки: {поле: ошибка}} для логина, паспорта и телефона: один запрос на поле
+    для всего списка плюс повторы внутри него (первое вхождение остаётся)."""
+    errors = {}
+    for field, message in UNIQUE_FIELDS.items():
+        values = [row.get(field) for row in rows]
+        wanted = list({value for value in values if value})
+        taken = set()
+        for start in range(0, len(wanted), LOOKUP_CHUNK):
+            taken.update(User.objects.filter(
+                **{f'{field}__in': wanted[start:start + LOOKUP_CHUNK]}
+            ).values_list(field, flat=True))
+
+        seen = set()
+        for index, value in enumerate(values):
+            if not value:
+                continue
+            if value in taken:
+                errors.setdefault(index, {})[field] = message
+            elif value in seen:
+                errors.setdefault(index, {})[field] = "Повторяется в загружаемом списке."
+            seen.add(value)
+    return errors
+
+
+def enroll_readers(rows, invite=False, workers=None, batch_size=1000):
+    """Создаёт читателей из проверенных строк (ReaderEnrollmentItemSerializer) через bulk_create.
+
+    Результат по каждой строке, как у массовой выдачи. С invite=True пароль не задаётся,
+    а в результат добавляются uid и token приглашения (/api/invite/accept/).
+    """
+    errors = find_conflicts(rows)
+    accepted = [index for index in range(len(rows)) if index not in errors]
+    if invite:
+        passwords = [make_password(None) for _ in accepted]
+    else:
+        # До транзакции: хэширование долгое, а блокировать нечего.
+        passwords = hash_passwords([rows[index]['password'] for index in accepted], workers)
+
+    users = []
+    for index, password in zip(accepted, passwords):
+        data = {field: value for field, value in rows[index].items() if field != 'password'}
+        users.append(User(**data, role='reader', password=password))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        # bulk_create не отправляет post_save: индекс автодополнения обновляется здесь.
+        transaction.on_commit(lambda: index_readers(users))
+
+    created = dict(zip(accepted, users))
+    results = []
+    for index in range(len(rows)):
+        if index in errors:
+            results.append({'index': index, 'status': 'error', 'error': ' '.join(errors[index].values())})
+            continue
+        user = created[index]
+        result = {'index': index, 'status': 'created', 'id': user.pk, 'username': user.username}
+        if invite:
+            result.update(make_invite(user))
+        results.append(result)
+    return results
+
+
+def index_readers(users):
+    index = autocomplete.indexes['readers']
+    for user in users:
+        index.update(*autocomplete.reader_entry(
+            user.pk, user.last_name, user.first_name, user.middle_name, user.passport, user.phone
+        ))
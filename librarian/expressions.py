@@ -0,0 +1,17 @@
+from django.db.models import Func, IntegerField
+
+
+class DaysBetween(Func):
+    """Количество дней между двумя датами (end - start) в виде целого числа."""
+    arity = 2
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        end, end_params = compiler.compile(self.source_expressions[0])
+        start, start_params = compiler.compile(self.source_expressions[1])
+        return f'CAST(julianday({end}) - julianday({start}) AS INTEGER)', (*end_params, *start_params)
@@ -0,0 +1,33 @@
+import django_filters
+from rest_framework.filters import SearchFilter
+
+from .models import BookIssue
+from .search import search_books
+
+
+class IssueReportFilter(django_filters.FilterSet):
+    STATUS_CHOICES = [
+        ('open', 'На руках'),
+        ('returned', 'Возвращена'),
+    ]
+
+    date_from = django_filters.DateFilter(field_name='issue_date', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='issue_date', lookup_expr='lte')
+    status = django_filters.ChoiceFilter(choices=STATUS_CHOICES, method='filter_status')
+
+    class Meta:
+        model = BookIssue
+        fields = ['reader', 'issued_by']
+
+    def filter_status(self, queryset, name, value):
+        return queryset.filter(is_open=(value == 'open'))
+
+
+class BookSearchFilter(SearchFilter):
+    """?search= для каталога через полнотекстовый поиск вместо ILIKE по join'у с авторами."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_books(queryset, query)
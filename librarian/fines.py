@@ -0,0 +1,151 @@
+import bisect
+import threading
+from decimal import Decimal
+
+from django.db.models import Case, DateField, DecimalField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
+
+from . import cache
+from .expressions import DaysBetween
+from .models import BookReturn, FinePolicy, Holiday
+
+FINE_FIELD = DecimalField(max_digits=8, decimal_places=2)
+
+
+class FineRules:
+    """Действующие правила FinePolicy и выходные дни — таблица в памяти процесса.
+
+    fine() считает штраф одной выдачи в Python (возврат), expression() — тот же расчёт
+    одним выражением SQL для любого числа выдач (отчёты, ночной обход просрочек).
+    """
+
+    def __init__(self, policies, holidays):
+        # От частного к общему, при равной точности — более новое правило.
+        self.policies = sorted(policies, key=lambda policy: (policy.direction_id is None, not policy.category, -policy.pk))
+        if not self.policies:
+            self.policies = [FinePolicy(name='По умолчанию', rate_per_day=BookReturn.FINE_PER_DAY)]
+        self.holidays = sorted(holidays)
+        # Нужны ли книга выдачи (категория, направление), или все выдачи считаются одинаково.
+        self.by_book = any(policy.direction_id or policy.category for policy in self.policies)
+
+    def policy_for(self, category=None, direction_id=None):
+        for policy in self.policies:
+            if policy.category in ('', category) and policy.direction_id in (None, direction_id):
+                return policy
+        return None
+
+    def late_days(self, due_date, on_date):
+        if on_date <= due_date:
+            return 0
+        closed = bisect.bisect_right(self.holidays, on_date) - bisect.bisect_right(self.holidays, due_date)
+        return (on_date - due_date).days - closed
+
+    def fine(self, due_date, on_date, category=None, direction_id=None):
+        policy = self.policy_for(category, direction_id)
+        if policy is None:
+            return Decimal(0)
+        fine = max(self.late_days(due_date, on_date) - policy.grace_days, 0) * Decimal(policy.rate_per_day)
+        if policy.max_fine is not None:
+            fine = min(fine, policy.max_fine)
+        return fine
+
+    def expression(self, on_date, prefix=''):
+        """Штраф на on_date для строк BookIssue; prefix — путь к выдаче от другой модели ('issue__')."""
+        whens, default = [], Value(Decimal(0))
+        for condition, fine in self._branches(on_date, prefix):
+            if condition is None:
+                default = fine
+            else:
+                whens.append(When(condition, then=fine))
+        fine = Case(*whens, default=default, output_field=FINE_FIELD) if whens else default
+        return Case(
+            When(**{f'{prefix}due_date__lt': on_date}, then=fine), default=Value(Decimal(0)), output_field=FINE_FIELD,
+        )
+
+    def partitions(self, on_date):
+        """Те же правила для UPDATE: (фильтр выдач, штраф без соединений) — в UPDATE нельзя
+        ссылаться на поля книги, поэтому каждое правило обновляет свою часть выдач."""
+        matched = Q()
+        for condition, fine in self._branches(on_date):
+            if condition is None:
+                yield ~matched, fine
+                return
+            yield condition & ~matched, fine
+            matched |= condition
+        yield ~matched, Value(Decimal(0), output_field=FINE_FIELD)
+
+    def _branches(self, on_date, prefix=''):
+        # (условие на книгу, штраф) от частного к общему; условие None у общего правила,
+        # более общих после него нет.
+        late_days = self._late_days_expression(on_date, f'{prefix}due_date')
+        for policy in self.policies:
+            condition = Q()
+            if policy.direction_id:
+                condition &= Q(**{f'{prefix}inventory__book__direction_id': policy.direction_id})
+            if policy.category:
+                condition &= Q(**{f'{prefix}inventory__book__category': policy.category})
+            fine = ExpressionWrapper(
+                Greatest(late_days - policy.grace_days, Value(0)) * Value(Decimal(policy.rate_per_day)),
+                output_field=FINE_FIELD,
+            )
+            if policy.max_fine is not None:
+                fine = Least(fine, Value(Decimal(policy.max_fine)), output_field=FINE_FIELD)
+            if not condition:
+                yield None, fine
+                return
+            yield condition, fine
+
+    def _late_days_expression(self, on_date, due_date):
+        late_days = DaysBetween(Value(on_date, output_field=DateField()), F(due_date))
+        # Выходные берутся из таблицы в памяти: их число после due_date — ступенчатая функция
+        # от due_date, CASE по датам вместо подзапроса к Holiday на каждую строку.
+        holidays = self.holidays[:bisect.bisect_right(self.holidays, on_date)]
+        if not holidays:
+            return late_days
+        return late_days - Case(
+            *[When(**{f'{due_date}__lt': day}, then=Value(len(holidays) - index))
+              for index, day in enumerate(holidays)],
+            default=Value(0),
+        )
+
+
+_lock = threading.Lock()
+_loaded = (None, None)
+
+
+def _stamp():
+    return cache.get_stamp(FinePolicy), cache.get_stamp(Holiday)
+
+
+def _load(stamp):
+    global _loaded
+    with _lock:
+        rules = FineRules(
+            FinePolicy.objects.filter(is_active=True), Holiday.objects.values_list('date', flat=True),
+        )
+        _loaded = stamp, rules
+    return rules
+
+
+def get_rules():
+    """Таблица правил процесса. Перечитывается, когда правила или выходные изменились
+    (отметка cache.touch из сигналов): один запрос к кэшу вместо двух к БД на каждый возврат."""
+    stamp = _stamp()
+    loaded_stamp, rules = _loaded
+    if rules is None or loaded_stamp != stamp:
+        rules = _load(stamp)
+    return rules
+
+
+def load_rules():
+    """Правила прямо из БД, без сверки с отметкой: для долгих процессов (ночной обход),
+    которым правка из другого процесса без общего кэша иначе видна не сразу."""
+    return _load(_stamp())
+
+
+def fine_for_issue(issue, on_date):
+    rules = get_rules()
+    if not rules.by_book:
+        return rules.fine(issue.due_date, on_date)
+    book = issue.inventory.book
+    return rules.fine(issue.due_date, on_date, book.category, book.direction_id)
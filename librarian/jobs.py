@@ -0,0 +1,87 @@
+import logging
+import traceback
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+def next_daily_run(daily_at, now):
+    """Ближайший момент после now, когда местное время равно daily_at ('HH:MM')."""
+    at = time.fromisoformat(daily_at)
+    day = timezone.localtime(now).date()
+    run_at = timezone.make_aware(datetime.combine(day, at))
+    if run_at <= now:
+        run_at = timezone.make_aware(datetime.combine(day + timedelta(days=1), at))
+    return run_at
+
+
+def enqueue(name, run_at=None):
+    """Ставит задачу в очередь. Если она уже ожидает, только переносит запуск на более ранний."""
+    if name not in settings.BACKGROUND_JOBS:
+        raise ValueError(f"Неизвестная задача: {name}")
+    run_at = run_at or timezone.now()
+    BackgroundJob.objects.bulk_create([BackgroundJob(name=name, run_at=run_at)], ignore_conflicts=True)
+    BackgroundJob.objects.filter(name=name, status='pending', run_at__gt=run_at).update(run_at=run_at)
+
+
+def schedule_daily(now):
+    for name, config in settings.BACKGROUND_JOBS.items():
+        if config.get('daily_at'):
+            enqueue(name, next_daily_run(config['daily_at'], now))
+
+
+def requeue_stale(now):
+    # Исполнитель, взявший задачу, упал: через BACKGROUND_JOB_TIMEOUT она выполняется заново.
+    return BackgroundJob.objects.filter(
+        status='running', started_at__lt=now - timedelta(seconds=settings.BACKGROUND_JOB_TIMEOUT),
+    ).update(status='pending', run_at=now)
+
+
+def claim(now):
+    """Берёт самую раннюю подошедшую задачу. Несколько исполнителей не возьмут одну и ту же:
+    строка блокируется, занятые пропускаются (SKIP LOCKED; в SQLite запись и так одна)."""
+    with transaction.atomic():
+        job = BackgroundJob.objects.select_for_update(skip_locked=True).filter(
+            status='pending', run_at__lte=now,
+        ).order_by('run_at', 'id').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run(job):
+    task = import_string(settings.BACKGROUND_JOBS[job.name]['task'])
+    try:
+        job.result = task()
+        job.status = 'done'
+    except Exception:
+        logger.exception("Задача %s завершилась с ошибкой", job.name)
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def run_due(now=None):
+    """Выполняет все подошедшие задачи и ставит следующие ежедневные запуски. Возвращает выполненные."""
+    now = now or timezone.now()
+    requeue_stale(now)
+    schedule_daily(now)
+    finished = []
+    while (job := claim(now)) is not None:
+        finished.append(run(job))
+    # Выполненная ежедневная задача освободила место для следующего запуска.
+    schedule_daily(now)
+    return finished
@@ -0,0 +1,110 @@
+import datetime
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from librarian.benchmark import SCENARIOS, dataset_summary, run_scenario
+from librarian.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет задержку, пропускную способность и число SQL-запросов каталога, поиска, "
+        "выдачи, возврата и четырёх отчётов на текущей базе (заполняется seed_library). "
+        "Результат пишется в JSON для сравнения между коммитами (--compare). "
+        "Сценарии выдачи и возврата меняют данные: выданное затем возвращается."
+    )
+
+    def add_arguments(self, parser):
+        names = [scenario.name for scenario in SCENARIOS]
+        parser.add_argument('--requests', type=int, default=50, help="Замеряемых запросов на сценарий.")
+        parser.add_argument('--warmup', type=int, default=3, help="Незамеряемых запросов перед сценарием.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Параллельных клиентов (потоков).")
+        parser.add_argument('--only', nargs='+', choices=names, metavar='SCENARIO',
+                            help=f"Запустить только указанные сценарии: {', '.join(names)}.")
+        parser.add_argument('--output', help="Файл результатов (по умолчанию benchmark-<коммит>.json).")
+        parser.add_argument('--compare', help="Предыдущий файл результатов для сравнения.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--auth', choices=['stateless', 'database'], default='stateless',
+                            help="Пользователь запроса из claims токена или из БД (JWT_STATELESS_USER).")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests и --concurrency должны быть положительными.")
+        if options['warmup'] < 0:
+            raise CommandError("--warmup не может быть отрицательным.")
+        librarian = User.objects.filter(role='librarian', is_active=True).order_by('pk').first()
+        if librarian is None:
+            raise CommandError("Нет библиотекаря: заполните базу командой seed_library.")
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['scenarios']
+
+        commit = self.git_commit()
+        report = {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'database': {'vendor': connection.vendor, 'version': self.db_version()},
+            'dataset': dataset_summary(),
+            'options': {key: options[key] for key in ('requests', 'warmup', 'concurrency', 'seed', 'auth')},
+            'scenarios': {},
+        }
+
+        # DEBUG копит все SQL в connection.queries и искажает замеры.
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'],
+                               JWT_STATELESS_USER=options['auth'] == 'stateless'):
+            for scenario in SCENARIOS:
+                if options['only'] and scenario.name not in options['only']:
+                    continue
+                try:
+                    result = run_scenario(
+                        scenario, librarian, options['requests'],
+                        concurrency=options['concurrency'], warmup=options['warmup'], seed=options['seed'],
+                    )
+                except ValueError as error:
+                    self.stderr.write(f"{scenario.name}: пропущен — {error}")
+                    continue
+                report['scenarios'][scenario.name] = result
+                self.stdout.write(self.format_result(scenario.name, result, (baseline or {}).get(scenario.name)))
+
+        output = options['output'] or f"benchmark-{commit or datetime.date.today().isoformat()}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {output}"))
+
+    def format_result(self, name, result, baseline):
+        if not result['requests']:
+            return f"{name:<24} нет запросов"
+        latency = result['latency_ms']
+        line = (
+            f"{name:<24} p50 {latency['p50']:8.1f} мс  p99 {latency['p99']:8.1f} мс  "
+            f"{result['throughput_rps']:7.1f} зап/с  SQL {result['queries']['mean']:5.1f}"
+        )
+        if result['errors']:
+            line += f"  ошибок {result['errors']} (коды {result['statuses']})"
+        if baseline and baseline.get('requests'):
+            change = (latency['p50'] - baseline['latency_ms']['p50']) / max(baseline['latency_ms']['p50'], 1e-6)
+            line += f"  | p50 {change:+.0%}, SQL было {baseline['queries']['mean']}"
+        return line
+
+    @staticmethod
+    def git_commit():
+        try:
+            result = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+        except OSError:
+            return None
+        return result.stdout.strip() or None
+
+    @staticmethod
+    def db_version():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT sqlite_version()' if connection.vendor == 'sqlite' else 'SELECT version()')
+            return cursor.fetchone()[0]
@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from librarian import autocomplete
+from librarian.autocomplete import AutocompleteIndex, normalize
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Задержка автодополнения на данных текущей БД: p50/p99 поиска по индексу в покое "
+        "и пока индекс перестраивается в фоне (плановая перестройка AUTOCOMPLETE_REBUILD_SECONDS). "
+        "Завершается с ошибкой, если p99 какого-либо индекса выше --p99-ms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=['all', *autocomplete.indexes], default='all',
+                            help="Вид индекса (по умолчанию все).")
+        parser.add_argument('--queries', type=int, default=2000, help="Запросов на каждый замер.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--p99-ms', type=float, default=5.0, help="Цель по p99 поиска, мс.")
+
+    def handle(self, *args, **options):
+        types = list(autocomplete.indexes) if options['type'] == 'all' else [options['type']]
+        over = []
+        for type_ in types:
+            for label, p99 in self.measure(type_, options):
+                if p99 * 1000 > options['p99_ms']:
+                    over.append(f"{type_} {label}: {p99 * 1000:.3f} мс")
+        if over:
+            raise CommandError(f"p99 выше цели {options['p99_ms']} мс: " + "; ".join(over))
+
+    def measure(self, type_, options):
+        """Замеряет один индекс; возвращает [(замер, p99 в секундах), ...]."""
+        started = time.perf_counter()
+        entries = list(autocomplete.indexes[type_].loader())
+        loaded = time.perf_counter() - started
+        if not entries:
+            self.stdout.write(f"{type_}: индекс пуст, сначала заполните БД (seed_library).")
+            return []
+
+        # Перестройка читает уже загруженные строки: замеряется поиск, а не чтение из БД.
+        index = AutocompleteIndex(lambda: entries)
+        started = time.perf_counter()
+        index.search('а')
+        built = time.perf_counter() - started
+
+        rng = random.Random(options['seed'])
+        prefixes = []
+        while len(prefixes) < options['queries']:
+            terms = [normalize(term) for term in rng.choice(entries)[2] if term and normalize(term)]
+            if terms:
+                term = rng.choice(terms)
+                prefixes.append(term[:rng.randint(1, min(len(term), 4))])
+
+        self.stdout.write(
+            f"{type_}: {len(entries)} записей, чтение из БД {loaded:.1f} с, "
+            f"построение индекса {built:.1f} с"
+        )
+        results = [self.report("в покое", [self.timed(index, prefix) for prefix in prefixes])]
+
+        timings, rebuilds = [], 0
+        while len(timings) < len(prefixes):
+            thread = index.rebuild_in_background()
+            rebuilds += 1
+            # Хотя бы один поиск на перестройку: на маленьком индексе она успевает
+            # закончиться до первого замера.
+            timings.append(self.timed(index, prefixes[len(timings)]))
+            while thread.is_alive() and len(timings) < len(prefixes):
+                timings.append(self.timed(index, prefixes[len(timings)]))
+            thread.join()
+        results.append(self.report(f"во время перестройки ({rebuilds})", timings))
+        return results
+
+    @staticmethod
+    def timed(index, prefix):
+        started = time.perf_counter()
+        index.search(prefix)
+        return time.perf_counter() - started
+
+    def report(self, label, timings):
+        p99 = _percentile(timings, 99)
+        self.stdout.write(
+            f"  поиск {label}: p50 {_percentile(timings, 50) * 1000:.3f} мс, "
+            f"p99 {p99 * 1000:.3f} мс, макс {max(timings) * 1000:.1f} мс"
+        )
+        return label, p99
@@ -0,0 +1,75 @@
+import datetime
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from librarian.export import stream_csv, stream_xlsx
+from librarian.serializers import IssuedBooksReportRowSerializer
+
+MODES = {
+    # Прежнее поведение отчётов: весь список в памяти, затем Response/JSONRenderer.
+    'json': lambda columns, rows: [JSONRenderer().render(list(rows))],
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
+
+
+def synthetic_rows(count):
+    # Строки той же формы, что отдаёт IssuedBooksReportView.get_rows().
+    start = datetime.date(2025, 1, 1)
+    for i in range(count):
+        issue_date = start + datetime.timedelta(days=i % 365)
+        yield {
+            'issue_id': i + 1,
+            'issue_date': issue_date,
+            'title': f'Учебник по предмету {i % 5000}',
+            'reader': f'Фамилия{i % 20000} Имя Отчество',
+            'issued_by': 'Библиотекарь Школьный',
+            'due_date': issue_date + datetime.timedelta(days=14),
+            'status': 'Возвращена' if i % 3 else 'На руках',
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пиковую память (RSS) выгрузки отчёта о выдачах: JSON-список целиком "
+        "против потоковых CSV и XLSX. Каждый режим запускается в отдельном процессе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Количество строк отчёта.")
+        parser.add_argument('--mode', choices=list(MODES), help="Запустить только один режим (в текущем процессе).")
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self.measure(options['mode'], options['rows'])))
+            return
+
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, sys.argv[0], 'benchmark_export', '--mode', mode, '--rows', str(options['rows'])],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{mode:>5}: пик RSS {result['peak_rss_mb']:8.1f} МБ, "
+                f"{result['seconds']:6.1f} с, {result['bytes'] / 2**20:8.1f} МБ ответа"
+            )
+
+    def measure(self, mode, count):
+        columns = list(IssuedBooksReportRowSerializer().fields)
+        started = time.perf_counter()
+        size = 0
+        for chunk in MODES[mode](columns, synthetic_rows(count)):
+            size += len(chunk)
+        # ru_maxrss в Linux — в килобайтах.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {
+            'mode': mode, 'rows': count, 'bytes': size,
+            'seconds': round(time.perf_counter() - started, 2), 'peak_rss_mb': round(peak, 1),
+        }
@@ -0,0 +1,99 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from librarian.catalogue_import import CatalogueImporter, clean_record, read_csv, read_marc
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает каталог из CSV или MARC21 (ISO 2709). Книги с известным ISBN обновляются, "
+        "недостающие экземпляры создаются пакетно. Колонки CSV: title, authors (через «;»), "
+        "publisher, direction, isbn, udc, bbk, category, description, quantity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл каталога.")
+        parser.add_argument('--format', choices=['csv', 'marc'], help="По умолчанию — по расширению файла.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Записей в одной транзакции.")
+        parser.add_argument('--copies', type=int, default=1, help="Экземпляров, если количество не указано.")
+        parser.add_argument('--encoding', help="Кодировка CSV (по умолчанию UTF-8) или MARC-записей не в UTF-8.")
+        parser.add_argument('--delimiter', default=',', help="Разделитель CSV.")
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="Продолжить с последнего сохранённого пакета (см. файл <path>.progress).",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size должен быть положительным.")
+        progress_path = f"{path}.progress"
+
+        start = 0
+        if options['resume'] and os.path.exists(progress_path):
+            with open(progress_path) as progress:
+                start = json.load(progress)['position']
+            self.stdout.write(f"Продолжение с записи {start + 1}")
+
+        fmt = options['format'] or ('marc' if path.lower().endswith(('.mrc', '.marc', '.iso')) else 'csv')
+        if fmt == 'marc':
+            source = open(path, 'rb')
+            records = read_marc(source, options['encoding'])
+        else:
+            source = open(path, newline='', encoding=options['encoding'] or 'utf-8-sig')
+            records = read_csv(source, options['delimiter'])
+
+        importer = CatalogueImporter()
+        started = time.monotonic()
+        position, batch, invalid = 0, [], 0
+        try:
+            with source:
+                for position, raw in enumerate(records, start=1):
+                    if position <= start:
+                        continue
+                    try:
+                        batch.append(clean_record(raw, options['copies']))
+                    except ValueError as error:
+                        invalid += 1
+                        self.stderr.write(f"Запись {position}: {error}")
+                    if len(batch) >= batch_size:
+                        self._commit(importer, batch, position, progress_path, started, start)
+                        batch = []
+                if batch:
+                    self._commit(importer, batch, position, progress_path, started, start)
+        except (ValueError, csv.Error, DatabaseError) as error:
+            raise CommandError(f"Запись {position}: {error}. Для продолжения запустите с --resume.")
+
+        importer.finish()
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+
+        elapsed = time.monotonic() - started
+        processed = max(position - start, 0)
+        stats = importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {processed} записей за {elapsed:.1f} с ({processed / max(elapsed, 1e-6):.0f} зап/с). "
+            f"Книг создано: {stats['books_created']}, обновлено: {stats['books_updated']}, "
+            f"экземпляров: {stats['copies_created']}, авторов: {stats['authors_created']}, "
+            f"издательств: {stats['publishers_created']}, направлений: {stats['directions_created']}, "
+            f"ошибок: {invalid}."
+        ))
+        if stats['decreases_skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"У {stats['decreases_skipped']} книг в файле меньше экземпляров, чем в каталоге: "
+                f"количество не уменьшалось."
+            ))
+
+    def _commit(self, importer, batch, position, progress_path, started, start):
+        importer.import_batch(batch)
+        # Позиция пишется только после коммита пакета: при --resume он не повторится.
+        with open(progress_path, 'w') as progress:
+            json.dump({'position': position}, progress)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"Обработано записей: {position} ({(position - start) / max(elapsed, 1e-6):.0f} зап/с)")
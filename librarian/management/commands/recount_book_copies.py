@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+
+from librarian.models import Book, Inventory
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики экземпляров книг (available/borrowed/deleted) по таблице Inventory."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Только проверить счётчики, ничего не изменяя (код выхода 1 при расхождении).",
+        )
+
+    def handle(self, *args, **options):
+        actual = {
+            row['book']: row
+            for row in Inventory.objects.values('book').annotate(
+                available_count=Count('pk', filter=Q(status='available')),
+                borrowed_count=Count('pk', filter=Q(status='borrowed')),
+                deleted_count=Count('pk', filter=Q(status='deleted')),
+            ).order_by()
+        }
+        empty = dict.fromkeys(Book.COUNTER_FIELDS, 0)
+
+        mismatched = []
+        for book in Book.all_objects.only('pk', *Book.COUNTER_FIELDS).iterator(chunk_size=2000):
+            counts = actual.get(book.pk, empty)
+            if any(getattr(book, field) != counts[field] for field in Book.COUNTER_FIELDS):
+                for field in Book.COUNTER_FIELDS:
+                    setattr(book, field, counts[field])
+                mismatched.append(book)
+
+        if options['check']:
+            for book in mismatched:
+                self.stdout.write(f"Книга {book.pk}: счётчики не совпадают с Inventory")
+            if mismatched:
+                raise CommandError(f"Расхождений: {len(mismatched)}")
+            self.stdout.write(self.style.SUCCESS("Счётчики совпадают."))
+            return
+
+        with transaction.atomic():
+            Book.all_objects.bulk_update(mismatched, Book.COUNTER_FIELDS, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Исправлено книг: {len(mismatched)}"))
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from librarian import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Исполнитель фоновых задач (BACKGROUND_JOBS): берёт подошедшие задачи из таблицы "
+        "BackgroundJob и ставит следующие ежедневные запуски. Брокер не нужен; исполнителей "
+        "может быть несколько — одну задачу возьмёт только один."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Выполнить подошедшие задачи и выйти (для cron).")
+        parser.add_argument('--now', nargs='+', metavar='TASK', default=[],
+                            help=f"Запустить задачи сейчас: {', '.join(settings.BACKGROUND_JOBS)}.")
+        parser.add_argument('--interval', type=float, default=60, help="Пауза между проверками очереди, с.")
+
+    def handle(self, *args, **options):
+        for name in options['now']:
+            try:
+                jobs.enqueue(name)
+            except ValueError as error:
+                raise CommandError(error)
+
+        while True:
+            for job in jobs.run_due():
+                duration = (job.finished_at - job.started_at).total_seconds()
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(f"{job.name}: {job.result} за {duration:.1f} с"))
+                else:
+                    self.stderr.write(f"{job.name}: ошибка за {duration:.1f} с\n{job.error}")
+            if options['once']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
+            # Процесс живёт долго: соединение переоткрывается по CONN_MAX_AGE, как между запросами.
+            close_old_connections()
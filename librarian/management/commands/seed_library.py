@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from librarian.benchmark import LibrarySeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет новую базу синтетической библиотекой для нагрузочных замеров (см. benchmark_api): "
+        "книги, экземпляры, читатели, история выдач с возвратами и текущие выдачи. "
+        "В PostgreSQL строки пишутся через COPY, в SQLite — executemany пачками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100_000)
+        parser.add_argument('--copies', type=int, default=1_000_000, help="Всего экземпляров.")
+        parser.add_argument('--issues', type=int, default=5_000_000, help="Всего выдач, включая текущие.")
+        parser.add_argument('--readers', type=int, default=20_000)
+        parser.add_argument('--days', type=int, default=730, help="Глубина истории выдач в днях.")
+        parser.add_argument('--seed', type=int, default=1, help="Зерно генератора: одинаковое — одинаковые данные.")
+
+    def handle(self, *args, **options):
+        if min(options['books'], options['readers'], options['days']) < 1 or options['issues'] < 0:
+            raise CommandError("Количества должны быть положительными.")
+        try:
+            seeder = LibrarySeeder(
+                options['books'], options['copies'], options['issues'], options['readers'],
+                days=options['days'], seed=options['seed'], log=self.stdout.write,
+            )
+            seeder.run()
+        except ValueError as error:
+            raise CommandError(error)
+
+        if connection.vendor == 'postgresql':
+            # Свежая статистика, иначе первые замеры получат планы для пустых таблиц.
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: книг {seeder.books}, экземпляров {seeder.copies}, выдач {seeder.issues} "
+            f"(на руках {seeder.open_count}), читателей {seeder.readers}."
+        ))
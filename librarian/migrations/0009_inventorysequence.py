@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+def init_sequence(apps, schema_editor):
+    Inventory = apps.get_model('librarian', 'Inventory')
+    InventorySequence = apps.get_model('librarian', 'InventorySequence')
+    last = Inventory.objects.aggregate(last=models.Max('id'))['last'] or 0
+    InventorySequence.objects.update_or_create(pk=1, defaults={'last_value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0008_alter_book_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(init_sequence, migrations.RunPython.noop),
+    ]
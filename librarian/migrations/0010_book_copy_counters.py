@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:30
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Book = apps.get_model('librarian', 'Book')
+    Inventory = apps.get_model('librarian', 'Inventory')
+    for status in ('available', 'borrowed', 'deleted'):
+        counts = Inventory.objects.filter(
+            book=models.OuterRef('pk'), status=status
+        ).order_by().values('book').annotate(c=models.Count('pk')).values('c')
+        Book.objects.update(**{
+            f'{status}_count': Coalesce(models.Subquery(counts), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0009_inventorysequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='available_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='borrowed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='deleted_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0010_book_copy_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(fields=['due_date', 'is_deleted'], name='bookissue_due_date_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:02
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def fill_search_document(apps, schema_editor):
+    Book = apps.get_model('librarian', 'Book')
+    books = list(Book.objects.prefetch_related('authors'))
+    for book in books:
+        parts = [book.title, book.description, book.udc, book.bbk, book.isbn]
+        parts += [
+            f"{a.last_name} {a.first_name} {a.middle_name}".strip()
+            for a in book.authors.all() if not a.is_deleted
+        ]
+        book.search_document = ' '.join(part for part in parts if part)
+    Book.objects.bulk_update(books, ['search_document'], batch_size=1000)
+
+
+# Индексы только для PostgreSQL: на SQLite поиск идёт через icontains.
+SEARCH_INDEXES = [
+    GinIndex(SearchVector('search_document', config='russian'), name='book_search_fts_idx'),
+    GinIndex(fields=['search_document'], opclasses=['gin_trgm_ops'], name='book_search_trgm_idx'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Book = apps.get_model('librarian', 'Book')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(Book, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Book = apps.get_model('librarian', 'Book')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(Book, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0011_bookissue_due_date_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='book',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0012_book_search_document'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookissue',
+            name='bookissue_due_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['title', 'id'], name='book_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['due_date', 'id'], name='bookissue_due_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['issue_date', 'id'], name='bookissue_issue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['book', 'id'], name='inventory_available_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+def close_returned_issues(apps, schema_editor):
+    BookIssue = apps.get_model('librarian', 'BookIssue')
+    BookReturn = apps.get_model('librarian', 'BookReturn')
+    BookIssue.objects.filter(
+        models.Exists(BookReturn.objects.filter(issue=models.OuterRef('pk')))
+    ).update(is_open=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0013_circulation_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookissue',
+            name='bookissue_due_date_idx',
+        ),
+        migrations.AddField(
+            model_name='bookissue',
+            name='is_open',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(close_returned_issues, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_open', True)), fields=['reader'], name='bookissue_open_reader_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_open', True)), fields=['due_date', 'id'], name='bookissue_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0014_bookissue_is_open'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookreturn',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['return_date'], name='bookreturn_return_date_idx'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:47
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+WINDOW_DAYS = 7
+
+
+def build_stats(apps, schema_editor):
+    """Заполняет статистику из выдач и возвратов окнами по неделе.
+
+    Копия пересчёта librarian.stats на момент этой миграции: модуль приложения меняется,
+    а то, что делает миграция, — нет. Дальше статистику пересчитывает manage.py refresh_stats.
+    """
+    db = schema_editor.connection.alias
+    Book = apps.get_model('librarian', 'Book')
+    BookIssue = apps.get_model('librarian', 'BookIssue')
+    BookReturn = apps.get_model('librarian', 'BookReturn')
+    CirculationStats = apps.get_model('librarian', 'CirculationStats')
+
+    issues = BookIssue._base_manager.using(db).filter(is_deleted=False)
+    returns = BookReturn._base_manager.using(db).filter(is_deleted=False)
+    first = min(filter(None, [
+        issues.order_by('issue_date').values_list('issue_date', flat=True).first(),
+        returns.order_by('return_date').values_list('return_date', flat=True).first(),
+    ]), default=None)
+    last = max(filter(None, [
+        issues.order_by('-issue_date').values_list('issue_date', flat=True).first(),
+        returns.order_by('-return_date').values_list('return_date', flat=True).first(),
+    ]), default=None)
+    if first is None:
+        return
+
+    directions = dict(Book._base_manager.using(db).values_list('pk', 'direction_id'))
+
+    def scopes(book_id, reader_id):
+        return [('total', 0), ('book', book_id), ('direction', directions.get(book_id) or 0), ('reader', reader_id)]
+
+    start = first
+    while start <= last:
+        end = min(start + timedelta(days=WINDOW_DAYS - 1), last)
+        rows = defaultdict(Counter)
+        for day, book_id, reader_id, count in issues.filter(issue_date__range=(start, end)).values_list(
+            'issue_date', 'inventory__book_id', 'reader_id'
+        ).annotate(n=Count('pk')).order_by().iterator(chunk_size=5000):
+            for scope, key in scopes(book_id, reader_id):
+                rows[scope, key, day]['issues'] += count
+        for day, book_id, reader_id, count, late, fines in returns.filter(return_date__range=(start, end)).values_list(
+            'return_date', 'issue__inventory__book_id', 'issue__reader_id'
+        ).annotate(
+            n=Count('pk'),
+            late=Count('pk', filter=Q(return_date__gt=F('issue__due_date'))),
+            total_fines=Sum('fine'),
+        ).order_by().iterator(chunk_size=5000):
+            for scope, key in scopes(book_id, reader_id):
+                row = rows[scope, key, day]
+                row['returns'] += count
+                row['overdue'] += late
+                row['fines'] += fines
+        CirculationStats.objects.using(db).bulk_create(
+            (CirculationStats(scope=scope, key=key, date=day, **values) for (scope, key, day), values in rows.items()),
+            batch_size=5000,
+        )
+        start = end + timedelta(days=1)
+
+
+# Только для PostgreSQL: суммы читаются из индекса без обращения к таблице (index-only scan).
+# Строки одного читателя или книги разбросаны по таблице по датам вставки, и без INCLUDE
+# итоги за всю историю читали бы страницу таблицы на каждую строку. Строятся после
+# заполнения таблицы.
+COVERING_INDEXES = [
+    models.Index(fields=['scope', 'key', 'date'], include=['issues', 'returns', 'overdue', 'fines'],
+                 name='circstats_key_cover_idx'),
+    models.Index(fields=['scope', 'date'], include=['key', 'issues', 'returns', 'overdue', 'fines'],
+                 name='circstats_date_cover_idx'),
+]
+
+
+def create_covering_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    CirculationStats = apps.get_model('librarian', 'CirculationStats')
+    for index in COVERING_INDEXES:
+        schema_editor.add_index(CirculationStats, index)
+
+
+def drop_covering_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    CirculationStats = apps.get_model('librarian', 'CirculationStats')
+    for index in COVERING_INDEXES:
+        schema_editor.remove_index(CirculationStats, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0015_bookreturn_return_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CirculationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('scope', models.CharField(choices=[('total', 'Вся библиотека'), ('book', 'Книга'), ('direction', 'Направление'), ('reader', 'Читатель')], max_length=10)),
+                ('key', models.IntegerField(default=0)),
+                ('issues', models.IntegerField(default=0)),
+                ('returns', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+                ('fines', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'date'], name='circstats_scope_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key', 'date'), name='circstats_scope_key_date_uniq')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+        migrations.RunPython(create_covering_indexes, drop_covering_indexes),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_default_policy(apps, schema_editor):
+    # Прежнее правило: 5 сомов за каждый день просрочки, без льготы и потолка.
+    FinePolicy = apps.get_model('librarian', 'FinePolicy')
+    FinePolicy.objects.create(name='Общее правило', rate_per_day=5)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0017_overdue_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('name', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FinePolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('category', models.CharField(blank=True, choices=[('textbook', 'Учебник'), ('manual', 'Методичка'), ('tutorial', 'Пособие'), ('fiction', 'Художественная'), ('science', 'Научная'), ('publicism', ' Публицистика'), ('other', 'Другое')], max_length=20)),
+                ('rate_per_day', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('grace_days', models.PositiveIntegerField(default=0)),
+                ('max_fine', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('direction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='librarian.direction')),
+            ],
+        ),
+        migrations.RunPython(create_default_policy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0018_fine_policy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookreturn',
+            name='issue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='librarian.bookissue'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookreturn',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('issue',), name='bookreturn_issue_uniq'),
+        ),
+    ]
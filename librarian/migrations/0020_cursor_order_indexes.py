@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:36
+
+from django.db import migrations, models
+
+# Курсор списка выдач по ?ordering=due_date. Только на PostgreSQL: SQLite без статистики
+# выбирал бы его и для отчёта о просрочках вместо частичного bookissue_open_due_idx.
+DUE_DATE_INDEX = models.Index(fields=['due_date', 'id'], name='bookissue_due_date_idx',
+                              condition=models.Q(is_deleted=False))
+
+
+def create_due_date_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('librarian', 'BookIssue'), DUE_DATE_INDEX)
+
+
+def drop_due_date_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('librarian', 'BookIssue'), DUE_DATE_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0019_bookreturn_cancel'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookreturn',
+            name='bookreturn_return_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bookreturn',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['return_date', 'id'], name='bookreturn_return_date_idx'),
+        ),
+        migrations.RunPython(create_due_date_index, drop_due_date_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0020_cursor_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='bookissue',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False), ('is_open', True)), fields=('inventory',), name='bookissue_open_inventory_uniq'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+# На PostgreSQL итоги одного ключа читает покрывающий circstats_key_cover_idx (миграция 0016);
+# в остальных СУБД его место занимал индекс снятого ограничения уникальности.
+KEY_INDEX = models.Index(fields=['scope', 'key', 'date'], name='circstats_scope_key_date_idx')
+
+
+def create_key_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('librarian', 'CirculationStats'), KEY_INDEX)
+
+
+def drop_key_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('librarian', 'CirculationStats'), KEY_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('librarian', '0021_bookissue_open_inventory_uniq'),
+    ]
+
+    operations = [
+        # Строки статистики — приращения: на один (разрез, ключ, день) их может быть несколько.
+        migrations.RemoveConstraint(
+            model_name='circulationstats',
+            name='circstats_scope_key_date_uniq',
+        ),
+        migrations.RunPython(create_key_index, drop_key_index),
+    ]
@@ -1,7 +1,7 @@
 
 # Create your models here.
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
@@ -86,64 +86,146 @@ class Book(SoftDeleteModel):
     quantity = models.PositiveIntegerField()
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='other')
     description = models.TextField(blank=True)
+    # Название, описание, авторы и шифры одной строкой — источник полнотекстового поиска.
+    search_document = models.TextField(blank=True, editable=False)
 
+    available_count = models.PositiveIntegerField(default=0)
+    borrowed_count = models.PositiveIntegerField(default=0)
+    deleted_count = models.PositiveIntegerField(default=0)
+
+    COUNTER_FIELDS = ('available_count', 'borrowed_count', 'deleted_count')
+
+    class Meta:
+        indexes = [
+            # Каталог и отчёт о наличии сортируются по названию среди неудалённых книг.
+            models.Index(fields=['title', 'id'], name='book_title_idx', condition=models.Q(is_deleted=False)),
+        ]
+
+    @classmethod
+    def adjust_counts(cls, book_id, **deltas):
+        cls.all_objects.filter(pk=book_id).update(
+            **{field: models.F(field) + delta for field, delta in deltas.items()}
+        )
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
         creating = not self.pk
         old_quantity = None
-        if not creating:
-            old_quantity = Book.objects.get(pk=self.pk).quantity
+        if creating:
+            self.available_count = self.quantity
+        else:
+            old_quantity = Book.all_objects.get(pk=self.pk).quantity
+            # счётчики меняются только F-выражениями, устаревшие значения экземпляра не пишем
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                ]
 
         super().save(*args, **kwargs)
 
         if creating:
-            for _ in range(self.quantity):
-                inventory_item = Inventory(book=self, status='available')
-                inventory_item.save()
+            Inventory.provision(self, self.quantity)
 
         elif old_quantity is not None:
             diff = self.quantity - old_quantity
             if diff > 0:
-                for _ in range(diff):
-                    inventory_item = Inventory(book=self, status='available')
-                    inventory_item.save()
+                Inventory.provision(self, diff)
+                Book.adjust_counts(self.pk, available_count=diff)
 
             elif diff < 0:
-                available = Inventory.objects.filter(
+                available = list(Inventory.objects.filter(
                     book=self,
                     status='available'
-                )[:abs(diff)]
-                if available.count() < abs(diff):
+                ).values_list('pk', flat=True)[:abs(diff)])
+                if len(available) < abs(diff):
                     raise ValidationError(
                         "Нельзя уменьшить количество: недостаточно свободных экземпляров."
                     )
-                for inv in available:
-                    inv.status = 'deleted'
-                    inv.save()
+                Inventory.objects.filter(pk__in=available).update(status='deleted')
+                Book.adjust_counts(self.pk, available_count=diff, deleted_count=-diff)
 
+            if diff:
+                self.refresh_from_db(fields=self.COUNTER_FIELDS)
+
+    @transaction.atomic
     def delete(self, *args, **kwargs):
-        if BookIssue.objects.filter(book=self).exists():
-            raise ValidationError("Нельзя удалить книгу, которая уже была выдана.")
+        # Возвращённые выдачи не мешают: книга удаляется мягко, история остаётся.
+        if BookIssue.objects.filter(inventory__book=self, is_open=True).exists():
+            raise ValidationError("Нельзя удалить книгу, которая выдана.")
 
         Inventory.objects.filter(book=self).update(status='deleted')
+        Book.all_objects.filter(pk=self.pk).update(
+            available_count=0,
+            borrowed_count=0,
+            deleted_count=models.F('available_count') + models.F('borrowed_count') + models.F('deleted_count'),
+        )
+        self.refresh_from_db(fields=self.COUNTER_FIELDS)
         self.is_deleted = True
         self.save()
 
+class InventorySequence(models.Model):
+    # Однострочный счётчик инвентарных номеров: номера резервируются
+    # диапазоном до вставки, чтобы экземпляры можно было писать bulk_create.
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, count):
+        # Без своей точки сохранения: ошибка и так откатит внешнюю транзакцию, а начальное
+        # значение считается только при создании строки счётчика.
+        with transaction.atomic(savepoint=False):
+            sequence, _ = cls.objects.select_for_update().get_or_create(
+                pk=1,
+                defaults={'last_value': lambda: Inventory.objects.aggregate(last=models.Max('id'))['last'] or 0},
+            )
+            start = sequence.last_value + 1
+            sequence.last_value += count
+            sequence.save(update_fields=['last_value'])
+        return range(start, start + count)
+
+
 class Inventory(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     inventory_number = models.CharField(max_length=50, unique=True)
     status = models.CharField(max_length=20, choices=[('available', 'Available'), ('borrowed', 'Borrowed'), ('deleted', 'Deleted')], default='available')
 
+    class Meta:
+        indexes = [
+            # Выдача берёт первый свободный экземпляр книги: индекс только по свободным.
+            models.Index(fields=['book', 'id'], name='inventory_available_idx',
+                         condition=models.Q(status='available')),
+        ]
+
+    @staticmethod
+    def format_number(value):
+        return f"INV-{value:05d}"
+
+    @classmethod
+    def provision(cls, book, count, status='available'):
+        if count <= 0:
+            return []
+        numbers = InventorySequence.allocate(count)
+        return cls.objects.bulk_create([
+            cls(book=book, status=status, inventory_number=cls.format_number(number))
+            for number in numbers
+        ])
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        adding = self._state.adding
         if not self.inventory_number:
-            super().save(*args, **kwargs)
-            self.inventory_number = f"INV-{self.id:05d}"
-            return super().save(update_fields=["inventory_number"])
+            self.inventory_number = self.format_number(InventorySequence.allocate(1)[0])
         super().save(*args, **kwargs)
+        # Экземпляры пачкой (provision) пишутся bulk_create, счётчики ведёт вызывающий.
+        if adding:
+            Book.adjust_counts(self.book_id, **{f'{self.status}_count': 1})
 
     def delete(self, *args, **kwargs):
-        if BookIssue.objects.filter(invantory=self).exists():
-            raise ValidationError("Нельзя удалить книгу, которая уже была выдана.")
+        if BookIssue.objects.filter(inventory=self, is_open=True).exists():
+            raise ValidationError("Нельзя удалить экземпляр, который выдан.")
 
+        if self.status != 'deleted':
+            Book.adjust_counts(self.book_id, **{f'{self.status}_count': -1, 'deleted_count': 1})
         self.status = "deleted"
         self.save()
 
@@ -157,6 +239,32 @@ class BookIssue(SoftDeleteModel):
     due_date = models.DateField()
     issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='issued_books',
                                   limit_choices_to={'role': 'librarian'})
+    # Выдача открыта, пока нет возврата. Флаг сбрасывается в транзакции возврата,
+    # чтобы «что у читателя на руках» не требовало join'а с BookReturn.
+    is_open = models.BooleanField(default=True, editable=False)
+    # Начисленный на fine_accrued_on штраф по открытой просроченной выдаче. Пересчитывается
+    # ночным обходом просрочек (librarian.overdue); при возврате штраф считается заново.
+    accrued_fine = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
+    fine_accrued_on = models.DateField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Открытые выдачи читателя: лимит книг на руках и повторная выдача.
+            models.Index(fields=['reader'], name='bookissue_open_reader_idx',
+                         condition=models.Q(is_open=True, is_deleted=False)),
+            # Отчёт о просрочках: открытые выдачи по due_date; отчёт о выдачах — все неудалённые по issue_date.
+            models.Index(fields=['due_date', 'id'], name='bookissue_open_due_idx',
+                         condition=models.Q(is_open=True, is_deleted=False)),
+            models.Index(fields=['issue_date', 'id'], name='bookissue_issue_date_idx',
+                         condition=models.Q(is_deleted=False)),
+        ]
+        # На PostgreSQL есть ещё индекс (due_date, id) для курсора списка по ?ordering=due_date
+        # (миграция 0020).
+        constraints = [
+            # Экземпляр на руках не более чем по одной выдаче.
+            models.UniqueConstraint(fields=['inventory'], name='bookissue_open_inventory_uniq',
+                                    condition=models.Q(is_open=True, is_deleted=False)),
+        ]
 
     def __str__(self):
         return f"{self.reader} - {self.inventory}"
@@ -164,23 +272,185 @@ class BookIssue(SoftDeleteModel):
 
 
 class BookReturn(SoftDeleteModel):
-    issue = models.OneToOneField(BookIssue, on_delete=models.CASCADE)
+    FINE_PER_DAY = 5  # сомов в день, если не задано ни одного правила FinePolicy
+
+    # Один действующий возврат на выдачу; отменённый (мягко удалённый) не мешает оформить новый.
+    issue = models.ForeignKey(BookIssue, on_delete=models.CASCADE)
     return_date = models.DateField(auto_now_add=True)
     condition = models.TextField(blank=True)
     fine = models.DecimalField(max_digits=6, decimal_places=2, default=0)
     received_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='returned_books',
                                     limit_choices_to={'role': 'librarian'})
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['issue'], name='bookreturn_issue_uniq',
+                                    condition=models.Q(is_deleted=False)),
+        ]
+        indexes = [
+            # Возвраты и штрафы за период (сводка, отчёты) и курсор списка по (return_date, id).
+            models.Index(fields=['return_date', 'id'], name='bookreturn_return_date_idx',
+                         condition=models.Q(is_deleted=False)),
+        ]
+
+    def assign_fine(self):
+        from .fines import fine_for_issue
+
+        today = timezone.localdate()
+        if today > self.issue.due_date:
+            self.fine = fine_for_issue(self.issue, today)
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
-        if self.issue:
-            due_date = self.issue.due_date
-            now = timezone.now().date()
-            if now > due_date:
-                days_late = (now - due_date).days
-                self.fine = days_late * 5  # 5 сомов в день
+        # Штраф и закрытие выдачи — только при создании: повторное сохранение (в том числе
+        # мягкое удаление) не должно менять штраф, уже учтённый в статистике.
+        adding = self._state.adding
+        if adding:
+            self.assign_fine()
         super().save(*args, **kwargs)
 
+        if adding and self.issue.is_open:
+            BookIssue.all_objects.filter(pk=self.issue_id).update(is_open=False)
+            self.issue.is_open = False
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        # Отмена возврата: выдача снова открыта, экземпляр снова на руках у читателя.
+        if self.is_deleted:
+            return
+        issue = self.issue
+        if not issue.is_deleted:
+            if not Inventory.objects.filter(pk=issue.inventory_id, status='available').update(status='borrowed'):
+                raise ValidationError("Нельзя отменить возврат: экземпляр уже выдан снова или списан.")
+            Book.adjust_counts(issue.inventory.book_id, available_count=-1, borrowed_count=1)
+        super().delete(*args, **kwargs)
+        BookIssue.all_objects.filter(pk=issue.pk).update(is_open=True)
+        issue.is_open = True
+
     def __str__(self):
         return f"Return for {self.issue}"
 
 
+
+
+class CirculationStats(models.Model):
+    """Итоги выдач и возвратов за день в разрезе всей библиотеки, книги, направления и читателя.
+
+    Сигналы в транзакции выдачи/возврата дописывают строки-приращения (librarian.stats), так что
+    на один (разрез, ключ, день) строк может быть несколько — отчёты их суммируют. Ночная
+    задача и refresh_stats --fold сворачивают их, refresh_stats перестраивает. Выдачи
+    учитываются по issue_date, возвраты, просроченные возвраты и штрафы — по return_date.
+    """
+    SCOPE_CHOICES = [
+        ('total', 'Вся библиотека'),
+        ('book', 'Книга'),
+        ('direction', 'Направление'),
+        ('reader', 'Читатель'),
+    ]
+
+    date = models.DateField()
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # id книги, направления или читателя; 0 — для всей библиотеки и книг без направления.
+    key = models.IntegerField(default=0)
+    issues = models.IntegerField(default=0)
+    returns = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    fines = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # Лидеры за период: все книги (читатели) за диапазон дат.
+            models.Index(fields=['scope', 'date'], name='circstats_scope_date_idx'),
+        ]
+        # На PostgreSQL к нему добавлены покрывающие индексы (миграция 0016), в остальных
+        # СУБД — индекс (scope, key, date) для итогов одного ключа (миграция 0022).
+
+    def __str__(self):
+        return f"{self.date} {self.scope}:{self.key}"
+
+
+class Reminder(models.Model):
+    """Очередь напоминаний читателям: скоро срок возврата или выдача просрочена.
+
+    Заполняется ночным обходом просрочек, по одному напоминанию каждого вида на выдачу;
+    отправитель отмечает sent_at. Неотправленные напоминания по возвращённым книгам удаляются.
+    """
+    KIND_CHOICES = [
+        ('due_soon', 'Скоро срок возврата'),
+        ('overdue', 'Просрочено'),
+    ]
+
+    issue = models.ForeignKey(BookIssue, on_delete=models.CASCADE)
+    reader = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['issue', 'kind'], name='reminder_issue_kind_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='reminder_unsent_idx',
+                         condition=models.Q(sent_at__isnull=True)),
+        ]
+
+
+class BackgroundJob(models.Model):
+    """Задача фонового исполнителя (manage.py run_jobs), см. librarian.jobs."""
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    run_at = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            # Одна ожидающая или выполняющаяся задача на имя: повторная постановка ничего не добавит.
+            models.UniqueConstraint(fields=['name'], name='job_active_name_uniq',
+                                    condition=models.Q(status__in=['pending', 'running'])),
+        ]
+        indexes = [
+            models.Index(fields=['run_at'], name='job_pending_run_at_idx', condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.run_at:%Y-%m-%d %H:%M})"
+
+
+class FinePolicy(models.Model):
+    """Правило штрафа за просрочку: ставка в день, льготные дни и потолок.
+
+    Правило с направлением и категорией важнее правила только с направлением, оно — правила
+    только с категорией, а то — общего (без обоих). Считает librarian.fines.
+    """
+    name = models.CharField(max_length=100)
+    category = models.CharField(max_length=20, choices=Book.CATEGORY_CHOICES, blank=True)
+    direction = models.ForeignKey(Direction, on_delete=models.CASCADE, null=True, blank=True)
+    rate_per_day = models.DecimalField(max_digits=6, decimal_places=2)
+    # Первые grace_days дней просрочки не штрафуются.
+    grace_days = models.PositiveIntegerField(default=0)
+    max_fine = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Holiday(models.Model):
+    """День, когда библиотека закрыта: в дни просрочки не входит."""
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.date} {self.name}".strip()
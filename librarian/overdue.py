@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import fines
+from .models import BookIssue, Reminder
+
+
+def _batches(issues, batch_size):
+    # Обход по (due_date, id) — порядок частичного индекса открытых выдач bookissue_open_due_idx.
+    last = None
+    while True:
+        page = issues
+        if last:
+            page = page.filter(Q(due_date__gt=last[0]) | Q(due_date=last[0], pk__gt=last[1]))
+        batch = list(page.order_by('due_date', 'pk').values_list('pk', 'reader_id', 'due_date')[:batch_size])
+        if not batch:
+            return
+        last = batch[-1][2], batch[-1][0]
+        yield batch
+
+
+def _enqueue_reminders(batch, kind):
+    Reminder.objects.bulk_create(
+        [Reminder(issue_id=pk, reader_id=reader_id, kind=kind) for pk, reader_id, _ in batch],
+        ignore_conflicts=True,
+    )
+
+
+def sweep(today=None, batch_size=None):
+    """Ночной обход открытых выдач.
+
+    Просроченным выдачам начисляет штраф на сегодня по правилам FinePolicy — один UPDATE
+    на пачку и правило — и ставит в очередь напоминание о просрочке; выдачам со сроком
+    в ближайшие REMINDER_DAYS_BEFORE_DUE дней — напоминание о возврате. Снимает начисление с продлённых выдач и удаляет
+    неотправленные напоминания по возвращённым книгам. Возвращает счётчики для журнала задач.
+    """
+    today = today or timezone.localdate()
+    batch_size = batch_size or settings.OVERDUE_SWEEP_BATCH_SIZE
+    started = timezone.now()
+    open_issues = BookIssue.objects.filter(is_open=True)
+    overdue = open_issues.filter(due_date__lt=today)
+
+    partitions = list(fines.load_rules().partitions(today))
+    accrued = 0
+    for batch in _batches(overdue, batch_size):
+        with transaction.atomic():
+            # Условия повторяются в UPDATE: выдачу могли вернуть, пока читалась пачка.
+            issues = overdue.filter(pk__in=[pk for pk, _, _ in batch])
+            for condition, fine in partitions:
+                accrued += issues.filter(condition).update(accrued_fine=fine, fine_accrued_on=today)
+            _enqueue_reminders(batch, 'overdue')
+
+    due_soon = open_issues.filter(
+        due_date__range=(today, today + timedelta(days=settings.REMINDER_DAYS_BEFORE_DUE)),
+    )
+    for batch in _batches(due_soon, batch_size):
+        _enqueue_reminders(batch, 'due_soon')
+
+    cleared = open_issues.filter(due_date__gte=today, accrued_fine__gt=0).update(
+        accrued_fine=0, fine_accrued_on=today,
+    )
+    dropped, _ = Reminder.objects.filter(sent_at__isnull=True, issue__is_open=False).delete()
+
+    return {
+        'date': today.isoformat(),
+        'accrued': accrued,
+        'cleared': cleared,
+        'reminders': Reminder.objects.filter(created_at__gte=started).count(),
+        'dropped_reminders': dropped,
+    }
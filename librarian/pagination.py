@@ -0,0 +1,142 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination, _reverse_ordering
+
+
+class DefaultPagination(LimitOffsetPagination):
+    # Небольшие справочники и каталог: limit/offset с общим числом записей.
+    max_limit = 500
+
+
+class KeysetPagination(CursorPagination):
+    # Большие таблицы (экземпляры, выдачи, возвраты): курсор по индексированному id
+    # не сканирует пропущенные строки, в отличие от OFFSET.
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    # DRF хранит в курсоре значение только первого поля сортировки, а строки с равным
+    # значением (даты из ?ordering=) отсчитывает смещением — при смене направления оно
+    # пропускает или повторяет строки. Здесь позиция — значения всех полей сортировки,
+    # которую всегда замыкает id, так что она уникальна и смещение не нужно.
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            direction = '-' if ordering[0].startswith('-') else ''
+            ordering = (*ordering, f'{direction}id')
+        return ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            values.append(str(instance[name] if isinstance(instance, dict) else getattr(instance, name)))
+        return json.dumps(values)
+
+    def seek_condition(self, position, reverse):
+        """Строки после позиции в порядке запроса: a >= x AND ((a > x) OR (a = x AND b > y) ...)."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition, equal = Q(pk__in=[]), {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        # Избыточная граница по первому полю — условие индекса: без неё OR проверяется
+        # фильтром, и сканирование начинается с начала индекса.
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') != reverse else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset с отбором по seek_condition вместо одного поля.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.seek_condition(current_position, reverse))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class ReportPagination(LimitOffsetPagination):
+    # Отчёты отдаются целиком, пока не передан limit.
+    default_limit = None
+    max_limit = 5000
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # paginate_queryset через async ORM — для асинхронных отчётов.
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [item async for item in queryset[self.offset:self.offset + self.limit]]
+
+
+class IssueReportPagination(KeysetPagination):
+    # Без page_size отчёт отдаётся целиком, как раньше.
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-issue_date', '-id')
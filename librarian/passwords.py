@@ -0,0 +1,27 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+# Модуль не импортирует модели: дочерний процесс загружает его до django.setup().
+def _setup_worker():
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password для списка паролей. PBKDF2 целиком занимает ядро, поэтому большой
+    список хэшируется в пуле процессов. Процессы запускаются через spawn: fork унаследовал
+    бы соединения с БД и потоки сервера."""
+    passwords = list(passwords)
+    workers = min(workers or settings.ENROLLMENT_HASH_WORKERS or os.cpu_count() or 1, len(passwords))
+    if workers < 2 or len(passwords) < settings.ENROLLMENT_POOL_MIN_PASSWORDS:
+        return [make_password(password) for password in passwords]
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_setup_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=math.ceil(len(passwords) / (workers * 4))))
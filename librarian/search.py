@@ -0,0 +1,55 @@
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import Case, IntegerField, Prefetch, Q, Value, When
+
+from .models import Author, Book
+
+SEARCH_CONFIG = 'russian'
+
+# Выражение совпадает с GIN-индексом book_search_fts_idx (см. миграцию 0012).
+search_vector = SearchVector('search_document', config=SEARCH_CONFIG)
+
+
+def build_search_document(book, authors):
+    parts = [book.title, book.description, book.udc, book.bbk, book.isbn]
+    parts += [f"{a.last_name} {a.first_name} {a.middle_name}".strip() for a in authors]
+    return ' '.join(part for part in parts if part)
+
+
+def refresh_search_documents(book_ids):
+    books = list(Book.all_objects.filter(pk__in=book_ids).prefetch_related(
+        Prefetch('authors', queryset=Author.objects.all())
+    ))
+    for book in books:
+        book.search_document = build_search_document(book, book.authors.all())
+    Book.all_objects.bulk_update(books, ['search_document'], batch_size=1000)
+
+
+def search_books(queryset, query):
+    """Полнотекстовый поиск по каталогу с ранжированием.
+
+    PostgreSQL: tsvector со стеммингом, при пустом результате — триграммы (опечатки).
+    Остальные СУБД: icontains по каждому слову в search_document.
+    """
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        results = queryset.annotate(document=search_vector).filter(document=search_query).annotate(
+            rank=SearchRank(search_vector, search_query)
+        ).order_by('-rank', 'id')
+        if results.exists():
+            return results
+        return queryset.filter(search_document__trigram_word_similar=query).annotate(
+            rank=TrigramWordSimilarity(query, 'search_document')
+        ).order_by('-rank', 'id')
+
+    terms = query.split()
+    if not terms:
+        return queryset.none()
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_document__icontains=term)
+    return queryset.filter(condition).annotate(
+        rank=Case(When(title__icontains=terms[0], then=Value(1)), default=Value(0), output_field=IntegerField())
+    ).order_by('-rank', 'title', 'id')
@@ -1,8 +1,18 @@
 
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth import get_user_model
-from .models import Author, Direction, Publisher, Book, Inventory, BookIssue, BookReturn
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
+from . import stats
+from .cache import get_reference_data
+from .enrollment import UNIQUE_FIELDS, enroll_readers, invite_token_generator
+from .models import Author, Direction, Publisher, Book, Inventory, BookIssue, BookReturn, FinePolicy, Holiday
 import re
 
 
@@ -68,6 +78,57 @@ class RegisterSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
+# --- массовая запись читателей ---
+class ReaderEnrollmentItemSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        fields = ['username', 'password', 'first_name', 'last_name', 'middle_name', 'email',
+                  'birth_date', 'passport', 'phone', 'address']
+
+    def get_fields(self):
+        # Уникальность проверяется для всего списка сразу (find_conflicts), а не запросом на строку.
+        fields = super().get_fields()
+        for name in UNIQUE_FIELDS:
+            fields[name].validators = [v for v in fields[name].validators if not isinstance(v, UniqueValidator)]
+        return fields
+
+
+class ReaderEnrollmentSerializer(serializers.Serializer):
+    MAX_ITEMS = 5000
+
+    invite = serializers.BooleanField(default=False)
+    readers = ReaderEnrollmentItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+
+    def validate(self, attrs):
+        if not attrs['invite'] and any(not reader.get('password') for reader in attrs['readers']):
+            raise serializers.ValidationError("Укажите password для каждого читателя или invite: true.")
+        return attrs
+
+    def create(self, validated_data):
+        return enroll_readers(validated_data['readers'], invite=validated_data['invite'])
+
+
+class InviteAcceptSerializer(serializers.Serializer):
+    uid = serializers.CharField()
+    token = serializers.CharField()
+    password = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        try:
+            user = User.objects.get(pk=force_str(urlsafe_base64_decode(attrs['uid'])), is_active=True)
+        except (ValueError, OverflowError, User.DoesNotExist):
+            user = None
+        if user is None or not invite_token_generator.check_token(user, attrs['token']):
+            raise serializers.ValidationError("Приглашение недействительно или устарело.")
+        attrs['user'] = user
+        return attrs
+
+    def create(self, validated_data):
+        user = validated_data['user']
+        user.set_password(validated_data['password'])
+        user.save(update_fields=['password'])
+        return user
+
+
 class AuthorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
@@ -83,10 +144,55 @@ class PublisherSerializer(serializers.ModelSerializer):
         model = Publisher
         fields = '__all__'
 
+class FinePolicySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FinePolicy
+        fields = '__all__'
+
+class HolidaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Holiday
+        fields = '__all__'
+
+class CachedReferenceField(serializers.Field):
+    """Вложенный справочный объект по внешнему ключу, читаемый через кэш справочников."""
+
+    def __init__(self, serializer_class, **kwargs):
+        self.serializer_class = serializer_class
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return getattr(instance, f'{self.field_name}_id')
+
+    def to_representation(self, value):
+        model = self.serializer_class.Meta.model
+        return get_reference_data(model, self.serializer_class, [value]).get(value)
+
+
+class CachedReferenceListField(CachedReferenceField):
+    """То же для many-to-many: из базы берутся только id связей."""
+
+    def get_attribute(self, instance):
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if self.field_name in prefetched:
+            return [obj.pk for obj in prefetched[self.field_name]]
+        manager = getattr(instance, self.field_name)
+        return list(manager.through.objects.filter(**{
+            manager.source_field_name: instance.pk,
+            f'{manager.target_field_name}__is_deleted': False,
+        }).values_list(f'{manager.target_field_name}_id', flat=True))
+
+    def to_representation(self, value):
+        model = self.serializer_class.Meta.model
+        data = get_reference_data(model, self.serializer_class, value)
+        return [data[pk] for pk in value if pk in data]
+
+
 class BookSerializer(serializers.ModelSerializer):
-    authors = AuthorSerializer(many=True, read_only=True)
-    direction = DirectionSerializer(read_only=True)
-    publisher = PublisherSerializer(read_only=True)
+    authors = CachedReferenceListField(AuthorSerializer)
+    direction = CachedReferenceField(DirectionSerializer)
+    publisher = CachedReferenceField(PublisherSerializer)
 
     author_ids = serializers.PrimaryKeyRelatedField(
         queryset=Author.objects.filter(is_deleted=False), many=True, write_only=True
@@ -99,7 +205,9 @@ class BookSerializer(serializers.ModelSerializer):
     )
     class Meta:
         model = Book
-        fields = '__all__'
+        # search_document — служебная колонка поиска, в ответы не попадает.
+        exclude = ['search_document']
+        read_only_fields = Book.COUNTER_FIELDS
 
     def create(self, validated_data):
         author_ids = validated_data.pop('author_ids')
@@ -134,12 +242,51 @@ class BookSerializer(serializers.ModelSerializer):
 
 
 
+class BookListSerializer(serializers.ModelSerializer):
+    """Облегчённая строка каталога (?view=slim): связи отдаются id.
+
+    ?expand=authors,direction,publisher подставляет вложенные объекты из кэша справочников,
+    ?fields=id,title,... оставляет только перечисленные поля.
+    """
+    authors = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    EXPANDABLE_FIELDS = {
+        'authors': lambda: CachedReferenceListField(AuthorSerializer),
+        'direction': lambda: CachedReferenceField(DirectionSerializer),
+        'publisher': lambda: CachedReferenceField(PublisherSerializer),
+    }
+
+    class Meta:
+        model = Book
+        fields = ['id', 'title', 'authors', 'direction', 'publisher', 'category', 'quantity', 'available_count']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None:
+            return fields
+
+        for name in self.parse_param(request, 'expand') & self.EXPANDABLE_FIELDS.keys():
+            fields[name] = self.EXPANDABLE_FIELDS[name]()
+
+        selected = self.parse_param(request, 'fields')
+        if selected:
+            fields = {name: field for name, field in fields.items() if name in selected}
+        return fields
+
+    @staticmethod
+    def parse_param(request, name):
+        return {value.strip() for value in request.query_params.get(name, '').split(',') if value.strip()}
+
+
 class InventorySerializer(serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
 
     class Meta:
         model = Inventory
         fields = '__all__'
+        # Статус меняют выдача, возврат и удаление: они же ведут счётчики Book.
+        read_only_fields = ['status']
 
 
 
@@ -160,43 +307,62 @@ class BookIssueSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BookIssue
-        fields = ['id', 'reader', 'reader_id', 'book_id', 'inventory', 'issued_by', 'issue_date', 'due_date']
-        read_only_fields = ['issue_date', 'issued_by', 'reader', 'inventory']
+        fields = ['id', 'reader', 'reader_id', 'book_id', 'inventory', 'issued_by', 'issue_date', 'due_date', 'is_open',
+                  'accrued_fine', 'fine_accrued_on']
+        read_only_fields = ['issue_date', 'issued_by', 'reader', 'inventory', 'is_open', 'accrued_fine', 'fine_accrued_on']
+
+    MAX_ACTIVE_ISSUES = 3
+
+    def check_reader_limits(self, reader, book):
+        active_issues = BookIssue.objects.filter(reader=reader, is_open=True)
+        if active_issues.count() >= self.MAX_ACTIVE_ISSUES:
+            raise serializers.ValidationError("Нельзя иметь больше 3 книг одновременно.")
+
+        if active_issues.filter(inventory__book=book).exists():
+            raise serializers.ValidationError("У пользователя уже есть эта книга на руках.")
 
     def validate(self, attrs):
         reader = attrs['reader_id']
         book = attrs['book_id']
 
-        if not Inventory.objects.filter(book=book, status='available').exists():
+        if book.available_count <= 0:
             raise serializers.ValidationError("Нет доступных экземпляров этой книги.")
 
-        active_issues = BookIssue.objects.filter(
-            reader=reader,
-            bookreturn__isnull=True
-        )
-        if active_issues.count() >= 3:
-            raise serializers.ValidationError("Нельзя иметь больше 3 книг одновременно.")
-
-        if active_issues.filter(inventory__book=book).exists():
-            raise serializers.ValidationError("У пользователя уже есть эта книга на руках.")
+        self.check_reader_limits(reader, book)
 
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         reader = validated_data.pop('reader_id')
         book = validated_data.pop('book_id')
         due_date = validated_data.pop('due_date')
 
-        inventory = Inventory.objects.filter(book=book, status='available').first()
+        # Блокировка читателя сериализует выдачи одному читателю, поэтому
+        # лимит перепроверяется уже под блокировкой.
+        reader = User.objects.select_for_update().get(pk=reader.pk)
+        self.check_reader_limits(reader, book)
+
+        # skip_locked: параллельные выдачи одной книги берут разные экземпляры,
+        # а не ждут друг друга на одной строке.
+        inventory = Inventory.objects.select_for_update(skip_locked=True).filter(
+            book=book, status='available'
+        ).first()
+        if inventory is None:
+            raise serializers.ValidationError("Нет доступных экземпляров этой книги.")
+
         validated_data['reader'] = reader
         validated_data['inventory'] = inventory
         validated_data['due_date'] = due_date
         validated_data['issued_by'] = self.context['request'].user
 
         inventory.status = 'borrowed'
-        inventory.save()
+        inventory.save(update_fields=['status'])
+        issue = super().create(validated_data)
 
-        return super().create(validated_data)
+        # Строка книги блокируется счётчиком до коммита, поэтому обновляем её последней.
+        Book.adjust_counts(book.pk, available_count=-1, borrowed_count=1)
+        return issue
 
 class BookReturnSerializer(serializers.ModelSerializer):
     issue = BookIssueSerializer(read_only=True)
@@ -211,18 +377,346 @@ class BookReturnSerializer(serializers.ModelSerializer):
         read_only_fields = ['return_date', 'received_by', 'issue', 'fine']
 
     def validate_issue_id(self, value):
-        if BookReturn.objects.filter(issue=value).exists():
+        if not value.is_open:
             raise serializers.ValidationError("Эта книга уже была возвращена.")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         issue = validated_data.pop('issue_id')
+        # Условный UPDATE закрывает выдачу ровно один раз: параллельный возврат той же
+        # выдачи не найдёт открытой строки и откатится до изменения счётчиков.
+        if not BookIssue.objects.filter(pk=issue.pk, is_open=True).update(is_open=False):
+            raise serializers.ValidationError({'issue_id': "Эта книга уже была возвращена."})
+        issue.is_open = False
         inventory = issue.inventory
 
         inventory.status = 'available'
         inventory.save()
+        Book.adjust_counts(inventory.book_id, available_count=1, borrowed_count=-1)
 
         validated_data['issue'] = issue
         validated_data['received_by'] = self.context['request'].user
 
         return super().create(validated_data)
+
+
+class ReaderActivityParamsSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    ordering = serializers.ChoiceField(choices=['name', 'activity', 'fines'], default='name')
+    top = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from не может быть позже date_to.")
+        return attrs
+
+
+class DashboardParamsSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    top = serializers.IntegerField(min_value=1, max_value=50, default=5)
+
+    PERIOD_DAYS = 30
+
+    def validate(self, attrs):
+        attrs.setdefault('date_to', timezone.localdate())
+        attrs.setdefault('date_from', attrs['date_to'] - timedelta(days=self.PERIOD_DAYS - 1))
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from не может быть позже date_to.")
+        return attrs
+
+
+class CirculationTrendParamsSerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='week')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    direction = serializers.IntegerField(required=False, min_value=1)
+    book = serializers.IntegerField(required=False, min_value=1)
+
+    PERIOD_DAYS = {'day': 30, 'week': 7 * 12, 'month': 365}
+
+    def validate(self, attrs):
+        if 'direction' in attrs and 'book' in attrs:
+            raise serializers.ValidationError("Укажите либо direction, либо book.")
+        attrs.setdefault('date_to', timezone.localdate())
+        attrs.setdefault('date_from', attrs['date_to'] - timedelta(days=self.PERIOD_DAYS[attrs['period']] - 1))
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from не может быть позже date_to.")
+        return attrs
+
+
+class TopBooksParamsSerializer(DashboardParamsSerializer):
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    direction = serializers.IntegerField(required=False, min_value=1)
+
+
+class OutstandingFinesParamsSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        attrs.setdefault('date', timezone.localdate())
+        return attrs
+
+
+class AutocompleteParamsSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, trim_whitespace=True)
+    type = serializers.ChoiceField(choices=['books', 'authors', 'readers', 'inventory'], default='books')
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+# --- строки отчётов (описание ответа для документации API) ---
+class IssuedBooksReportRowSerializer(serializers.Serializer):
+    issue_id = serializers.IntegerField()
+    issue_date = serializers.DateField()
+    title = serializers.CharField()
+    reader = serializers.CharField()
+    issued_by = serializers.CharField()
+    due_date = serializers.DateField()
+    status = serializers.CharField()
+
+
+class OverdueBooksReportRowSerializer(serializers.Serializer):
+    reader = serializers.CharField()
+    inventory_number = serializers.CharField()
+    book_title = serializers.CharField()
+    issue_date = serializers.DateField()
+    due_date = serializers.DateField()
+    days_overdue = serializers.IntegerField()
+    fine = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class BookAvailabilityReportRowSerializer(serializers.Serializer):
+    book_id = serializers.IntegerField()
+    book_title = serializers.CharField()
+    total_copies = serializers.IntegerField()
+    available_copies = serializers.IntegerField()
+    issued_copies = serializers.IntegerField()
+    deleted_copies = serializers.IntegerField()
+
+
+class ReaderActivityReportRowSerializer(serializers.Serializer):
+    reader_id = serializers.IntegerField()
+    reader_name = serializers.CharField()
+    books_borrowed = serializers.IntegerField()
+    total_fines = serializers.FloatField()
+
+
+class CirculationTrendRowSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    issues = serializers.IntegerField()
+    returns = serializers.IntegerField()
+    overdue = serializers.IntegerField()
+    fines = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class OutstandingFinesReportRowSerializer(serializers.Serializer):
+    reader_id = serializers.IntegerField()
+    reader_name = serializers.CharField()
+    overdue_loans = serializers.IntegerField()
+    outstanding_fine = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class TopBooksReportRowSerializer(serializers.Serializer):
+    book_id = serializers.IntegerField()
+    title = serializers.CharField()
+    issues = serializers.IntegerField()
+    returns = serializers.IntegerField()
+
+
+# --- массовая выдача и возврат ---
+class BulkIssueItemSerializer(serializers.Serializer):
+    reader_id = serializers.IntegerField()
+    book_id = serializers.IntegerField(required=False)
+    inventory_number = serializers.CharField(required=False)
+    due_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if ('book_id' in attrs) == ('inventory_number' in attrs):
+            raise serializers.ValidationError("Укажите либо book_id, либо inventory_number.")
+        return attrs
+
+
+class BulkIssueSerializer(serializers.Serializer):
+    MAX_ITEMS = 1000
+
+    due_date = serializers.DateField(required=False)
+    items = BulkIssueItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+
+    def validate(self, attrs):
+        if 'due_date' not in attrs and any('due_date' not in item for item in attrs['items']):
+            raise serializers.ValidationError("Укажите due_date для всего запроса или для каждой позиции.")
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        items = validated_data['items']
+        issued_by = self.context['request'].user
+
+        readers = {
+            reader.pk: reader for reader in User.objects.select_for_update().filter(
+                pk__in={item['reader_id'] for item in items}, role='reader', is_active=True
+            ).order_by('pk')
+        }
+        active = list(BookIssue.objects.filter(
+            reader__in=readers, is_open=True
+        ).values_list('reader_id', 'inventory__book_id'))
+        held = set(active)
+        active_counts = Counter(reader_id for reader_id, _ in active)
+
+        numbers = {item['inventory_number'] for item in items if 'inventory_number' in item}
+        # skip_locked, как и у одиночной выдачи: экземпляр, который сейчас выдаёт другая
+        # транзакция, считается недоступным, а не ожидается.
+        requested_copies = {
+            copy.inventory_number: copy for copy in Inventory.objects.select_for_update(
+                skip_locked=True, of=('self',)
+            ).filter(
+                inventory_number__in=numbers, status='available', book__is_deleted=False
+            )
+        }
+
+        # Экземпляры для позиций с book_id: по одному запросу с блокировкой на каждое название.
+        needed = Counter(item['book_id'] for item in items if 'book_id' in item)
+        books = Book.objects.in_bulk(needed)
+        pools = {
+            book_id: list(Inventory.objects.select_for_update(skip_locked=True).filter(
+                book_id=book_id, status='available'
+            ).exclude(inventory_number__in=numbers).order_by('pk')[:count])
+            for book_id, count in needed.items() if book_id in books
+        }
+
+        results, pending = [], []
+        for index, item in enumerate(items):
+            reader = readers.get(item['reader_id'])
+            if reader is None:
+                results.append({'index': index, 'status': 'error', 'error': "Читатель не найден или неактивен."})
+                continue
+
+            if 'inventory_number' in item:
+                copy = requested_copies.get(item['inventory_number'])
+                if copy is None:
+                    results.append({'index': index, 'status': 'error', 'error': "Экземпляр недоступен для выдачи."})
+                    continue
+                book_id = copy.book_id
+            else:
+                book_id = item['book_id']
+                if book_id not in books:
+                    results.append({'index': index, 'status': 'error', 'error': "Книга не найдена."})
+                    continue
+
+            if active_counts[reader.pk] >= BookIssueSerializer.MAX_ACTIVE_ISSUES:
+                results.append({'index': index, 'status': 'error', 'error': "Нельзя иметь больше 3 книг одновременно."})
+                continue
+            if (reader.pk, book_id) in held:
+                results.append({'index': index, 'status': 'error', 'error': "У пользователя уже есть эта книга на руках."})
+                continue
+
+            if 'inventory_number' in item:
+                copy = requested_copies.pop(item['inventory_number'])
+            elif pools[book_id]:
+                copy = pools[book_id].pop(0)
+            else:
+                results.append({'index': index, 'status': 'error', 'error': "Нет доступных экземпляров этой книги."})
+                continue
+
+            active_counts[reader.pk] += 1
+            held.add((reader.pk, book_id))
+            result = {'index': index, 'status': 'issued', 'inventory_number': copy.inventory_number}
+            results.append(result)
+            pending.append((result, copy, BookIssue(
+                reader=reader, inventory=copy, issued_by=issued_by,
+                due_date=item.get('due_date') or validated_data['due_date'],
+            )))
+
+        try:
+            with transaction.atomic():
+                BookIssue.objects.bulk_create([issue for _, _, issue in pending])
+        except IntegrityError:
+            pending = self._create_separately(pending)
+        stats.record_issues([issue for _, _, issue in pending])
+        for result, _, issue in pending:
+            result['issue_id'] = issue.pk
+
+        taken = [copy for _, copy, _ in pending]
+        Inventory.objects.filter(pk__in=[copy.pk for copy in taken]).update(status='borrowed')
+        for book_id, count in Counter(copy.book_id for copy in taken).items():
+            Book.adjust_counts(book_id, available_count=-count, borrowed_count=count)
+        return results
+
+    @staticmethod
+    def _create_separately(pending):
+        """Пакет нарушил ограничение БД — экземпляр успела выдать другая транзакция.
+        Выдачи вставляются по одной, конфликтные позиции становятся ошибками."""
+        created = []
+        for result, copy, issue in pending:
+            try:
+                with transaction.atomic():
+                    BookIssue.objects.bulk_create([issue])
+            except IntegrityError:
+                del result['inventory_number']
+                result.update(status='error', error="Экземпляр уже выдан.")
+            else:
+                created.append((result, copy, issue))
+        return created
+
+
+class BulkReturnItemSerializer(serializers.Serializer):
+    issue_id = serializers.IntegerField(required=False)
+    inventory_number = serializers.CharField(required=False)
+    condition = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        if ('issue_id' in attrs) == ('inventory_number' in attrs):
+            raise serializers.ValidationError("Укажите либо issue_id, либо inventory_number.")
+        return attrs
+
+
+class BulkReturnSerializer(serializers.Serializer):
+    MAX_ITEMS = 1000
+
+    items = BulkReturnItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        items = validated_data['items']
+        received_by = self.context['request'].user
+
+        open_issues = BookIssue.objects.select_for_update(of=('self',)).select_related('inventory__book').filter(
+            is_open=True
+        )
+        by_id = open_issues.in_bulk({item['issue_id'] for item in items if 'issue_id' in item})
+        by_number = {
+            issue.inventory.inventory_number: issue for issue in open_issues.filter(
+                inventory__inventory_number__in={item['inventory_number'] for item in items if 'inventory_number' in item}
+            )
+        }
+
+        results, new_returns, returned = [], [], set()
+        for index, item in enumerate(items):
+            if 'issue_id' in item:
+                issue = by_id.get(item['issue_id'])
+            else:
+                issue = by_number.get(item['inventory_number'])
+            if issue is None or issue.pk in returned:
+                results.append({'index': index, 'status': 'error', 'error': "Открытая выдача не найдена или книга уже возвращена."})
+                continue
+
+            returned.add(issue.pk)
+            book_return = BookReturn(issue=issue, condition=item['condition'], received_by=received_by)
+            book_return.assign_fine()
+            new_returns.append(book_return)
+            results.append({'index': index, 'status': 'returned', 'issue_id': issue.pk, 'fine': book_return.fine})
+
+        created = iter(BookReturn.objects.bulk_create(new_returns))
+        stats.record_returns(new_returns)
+        for result in results:
+            if result['status'] == 'returned':
+                result['return_id'] = next(created).pk
+        BookIssue.objects.filter(pk__in=returned).update(is_open=False)
+
+        copies = [book_return.issue.inventory for book_return in new_returns]
+        Inventory.objects.filter(pk__in=[copy.pk for copy in copies]).update(status='available')
+        for book_id, count in Counter(copy.book_id for copy in copies).items():
+            Book.adjust_counts(book_id, available_count=count, borrowed_count=-count)
+        return results
@@ -0,0 +1,172 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import autocomplete, cache, stats
+from .authentication import invalidate_user_state
+from .models import User, Author, Direction, Publisher, Book, Inventory, BookIssue, BookReturn, FinePolicy, Holiday
+from .search import build_search_document, refresh_search_documents
+
+
+# Мягкое удаление проходит через save(), поэтому post_save покрывает и его.
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Direction)
+@receiver([post_save, post_delete], sender=Publisher)
+def invalidate_reference_cache(sender, instance, **kwargs):
+    pk = instance.pk
+    cache.invalidate(sender, pk)
+    # Повторно после коммита: параллельный запрос мог закэшировать ещё старую строку.
+    transaction.on_commit(lambda: cache.invalidate(sender, pk))
+
+
+# Правила штрафов кэшируются в процессе (fines.get_rules) до следующей отметки.
+@receiver([post_save, post_delete], sender=FinePolicy)
+@receiver([post_save, post_delete], sender=Holiday)
+def invalidate_fine_rules(sender, instance, **kwargs):
+    cache.touch(sender)
+    transaction.on_commit(lambda: cache.touch(sender))
+
+
+# Деактивация (User.delete) и смена роли отзывают выданные access-токены.
+@receiver([post_save, post_delete], sender=User)
+def invalidate_auth_state(sender, instance, **kwargs):
+    user_id = instance.pk
+    invalidate_user_state(user_id)
+    transaction.on_commit(lambda: invalidate_user_state(user_id))
+
+
+# Статистика обращения: приращения дописываются новыми строками, без блокировки общих строк
+# итогов. Массовые выдача и возврат создают строки bulk_create и вызывают stats сами.
+# Мягкое удаление выдачи или возврата вычитает его из статистики — один раз, при переходе
+# в удалённые, а не при каждом сохранении уже удалённой строки.
+@receiver(pre_save, sender=BookIssue)
+@receiver(pre_save, sender=BookReturn)
+def detect_soft_delete(sender, instance, raw=False, **kwargs):
+    instance._stats_removed = (
+        not raw and instance.is_deleted and instance.pk is not None
+        and sender.all_objects.filter(pk=instance.pk, is_deleted=False).exists()
+    )
+
+
+@receiver(post_save, sender=BookIssue)
+def record_issue_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created and not instance.is_deleted:
+        stats.record_issues([instance])
+    elif instance._stats_removed:
+        stats.record_issues([instance], sign=-1)
+
+
+@receiver(post_save, sender=BookReturn)
+def record_return_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created and not instance.is_deleted:
+        stats.record_returns([instance])
+    elif instance._stats_removed:
+        stats.record_returns([instance], sign=-1)
+
+
+# У новой книги авторов ещё нет: документ собирается из полей до вставки, без лишних запросов.
+@receiver(pre_save, sender=Book)
+def build_new_book_search_document(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is None:
+        instance.search_document = build_search_document(instance, [])
+
+
+@receiver(post_save, sender=Book)
+def refresh_book_search_document(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        refresh_search_documents([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def refresh_search_on_authors_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_search_documents([instance.pk])
+    elif pk_set:
+        refresh_search_documents(pk_set)
+    else:
+        refresh_search_documents(Book.all_objects.filter(authors=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Author)
+def refresh_search_on_author_change(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_search_documents(Book.all_objects.filter(authors=instance).values_list('pk', flat=True))
+
+
+# --- индексы автодополнения ---
+
+def refresh_book_copies(book_id):
+    index = autocomplete.indexes['inventory']
+    copies = Inventory.objects.filter(book_id=book_id).values_list(
+        'pk', 'inventory_number', 'status', 'book__title', 'book__is_deleted'
+    )
+    for pk, number, status, title, book_deleted in copies:
+        if status == 'deleted' or book_deleted:
+            index.remove(pk)
+        else:
+            index.update(*autocomplete.inventory_entry(pk, number, title))
+
+
+@receiver(post_save, sender=Book)
+def update_book_autocomplete(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.is_deleted:
+        autocomplete.indexes['books'].remove(instance.pk)
+    else:
+        autocomplete.indexes['books'].update(*autocomplete.book_entry(instance.pk, instance.title, instance.isbn))
+    # Экземпляры создаются bulk_create без сигналов уже после post_save книги.
+    if autocomplete.indexes['inventory'].built:
+        book_id = instance.pk
+        transaction.on_commit(lambda: refresh_book_copies(book_id))
+
+
+@receiver(post_save, sender=Author)
+def update_author_autocomplete(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.is_deleted:
+        autocomplete.indexes['authors'].remove(instance.pk)
+    else:
+        autocomplete.indexes['authors'].update(*autocomplete.author_entry(
+            instance.pk, instance.last_name, instance.first_name, instance.middle_name
+        ))
+
+
+@receiver(post_save, sender=User)
+def update_reader_autocomplete(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.role != 'reader' or not instance.is_active:
+        autocomplete.indexes['readers'].remove(instance.pk)
+    else:
+        autocomplete.indexes['readers'].update(*autocomplete.reader_entry(
+            instance.pk, instance.last_name, instance.first_name, instance.middle_name,
+            instance.passport, instance.phone
+        ))
+
+
+@receiver(post_save, sender=Inventory)
+def update_inventory_autocomplete(sender, instance, raw=False, **kwargs):
+    index = autocomplete.indexes['inventory']
+    if raw:
+        return
+    if instance.status == 'deleted':
+        index.remove(instance.pk)
+    elif index.built and not index.contains(instance.pk):
+        index.update(*autocomplete.inventory_entry(instance.pk, instance.inventory_number, instance.book.title))
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Inventory)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    kind = {Book: 'books', Author: 'authors', User: 'readers', Inventory: 'inventory'}[sender]
+    autocomplete.indexes[kind].remove(instance.pk)
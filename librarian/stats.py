@@ -0,0 +1,219 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .bulkload import insert_rows
+
+COLUMNS = ('issues', 'returns', 'overdue', 'fines')
+REBUILD_WINDOW_DAYS = 7
+
+
+def _scope_keys(book_id, direction_id, reader_id):
+    return [('total', 0), ('book', book_id), ('direction', direction_id or 0), ('reader', reader_id)]
+
+
+def _books_of(inventory_ids):
+    from .models import Inventory
+
+    return {
+        pk: (book_id, direction_id)
+        for pk, book_id, direction_id in Inventory.objects.filter(pk__in=inventory_ids).values_list(
+            'pk', 'book_id', 'book__direction_id'
+        )
+    }
+
+
+def apply(deltas):
+    """Дописывает приращения {(scope, key, date): Counter(столбец=приращение)} новыми строками.
+
+    Существующие строки не обновляются: иначе каждая выдача и возврат держали бы до коммита
+    блокировку общей строки (итог библиотеки за день), и все они шли бы друг за другом.
+    Отчёты суммируют строки за период; fold сворачивает приращения одного дня в одну строку.
+    """
+    from .models import CirculationStats
+
+    CirculationStats.objects.bulk_create([
+        CirculationStats(scope=scope, key=key, date=date, **{column: delta[column] for column in COLUMNS})
+        for (scope, key, date), delta in deltas.items() if any(delta.values())
+    ])
+
+
+def record_issues(issues, sign=1):
+    books = _books_of({issue.inventory_id for issue in issues})
+    deltas = defaultdict(Counter)
+    for issue in issues:
+        book_id, direction_id = books[issue.inventory_id]
+        for scope, key in _scope_keys(book_id, direction_id, issue.reader_id):
+            deltas[scope, key, issue.issue_date]['issues'] += sign
+    apply(deltas)
+
+
+def record_returns(returns, sign=1):
+    books = _books_of({book_return.issue.inventory_id for book_return in returns})
+    deltas = defaultdict(Counter)
+    for book_return in returns:
+        issue = book_return.issue
+        book_id, direction_id = books[issue.inventory_id]
+        for scope, key in _scope_keys(book_id, direction_id, issue.reader_id):
+            delta = deltas[scope, key, book_return.return_date]
+            delta['returns'] += sign
+            delta['overdue'] += sign * (book_return.return_date > issue.due_date)
+            delta['fines'] += sign * book_return.fine
+    apply(deltas)
+
+
+def period_rows(scope, date_from, date_to):
+    from .models import CirculationStats
+
+    return CirculationStats.objects.filter(scope=scope, date__range=(date_from, date_to))
+
+
+def top_books(date_from, date_to, limit, direction=None):
+    from .models import Book
+
+    rows = period_rows('book', date_from, date_to)
+    if direction:
+        rows = rows.filter(key__in=Book.all_objects.filter(direction=direction).values('pk'))
+    return rows.values(book_id=F('key')).annotate(
+        total_issues=Sum('issues'),
+        total_returns=Sum('returns'),
+    ).filter(total_issues__gt=0).order_by('-total_issues', 'book_id')[:limit]
+
+
+def with_names(rows, model, field, names):
+    """Дополняет строки топа полями names объекта model с pk = row[field].
+
+    Отдельным запросом по уже отобранным строкам: подзапрос в самом GROUP BY
+    выполнялся бы для каждой строки статистики за период, а не для каждой строки топа.
+    """
+    rows = list(rows)
+    found = {
+        row['pk']: row
+        for row in model._base_manager.filter(pk__in=[row[field] for row in rows]).values('pk', *names)
+    }
+    for row in rows:
+        row.update({name: found.get(row[field], {}).get(name) for name in names})
+    return rows
+
+
+def rebuild(date_from=None, date_to=None):
+    """Пересчитывает статистику за период (по умолчанию за всю историю) из выдач и возвратов.
+
+    Считается окнами по REBUILD_WINDOW_DAYS дней, чтобы не держать в памяти всю историю.
+    На PostgreSQL таблица блокируется от записи до конца пересчёта: выдачи, пришедшиеся
+    на это время, дождутся его и прибавятся к уже пересчитанным строкам. Возвращает число строк.
+    """
+    from .models import Book, BookIssue, BookReturn, CirculationStats
+
+    issues = BookIssue._base_manager.filter(is_deleted=False)
+    returns = BookReturn._base_manager.filter(is_deleted=False)
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {CirculationStats._meta.db_table} IN EXCLUSIVE MODE')
+
+        existing = CirculationStats.objects.all()
+        if date_from:
+            existing = existing.filter(date__gte=date_from)
+        if date_to:
+            existing = existing.filter(date__lte=date_to)
+        existing.delete()
+
+        first = date_from or min(filter(None, [
+            issues.order_by('issue_date').values_list('issue_date', flat=True).first(),
+            returns.order_by('return_date').values_list('return_date', flat=True).first(),
+        ]), default=None)
+        last = date_to or max(filter(None, [
+            issues.order_by('-issue_date').values_list('issue_date', flat=True).first(),
+            returns.order_by('-return_date').values_list('return_date', flat=True).first(),
+        ]), default=None)
+        if first is None or last is None or first > last:
+            return 0
+
+        directions = dict(Book._base_manager.values_list('pk', 'direction_id'))
+        created = 0
+        start = first
+        while start <= last:
+            end = min(start + timedelta(days=REBUILD_WINDOW_DAYS - 1), last)
+            rows = _window_rows(issues.filter(issue_date__range=(start, end)),
+                                returns.filter(return_date__range=(start, end)), directions)
+            # История целиком — миллионы строк: COPY в PostgreSQL вместо bulk_create.
+            insert_rows(CirculationStats, ['scope', 'key', 'date', *COLUMNS], (
+                (scope, key, date, *(values[column] for column in COLUMNS))
+                for (scope, key, date), values in rows.items()
+            ))
+            created += len(rows)
+            start = end + timedelta(days=1)
+    return created
+
+
+def fold(date_from=None, date_to=None):
+    """Сворачивает строки-приращения за период в одну строку на (разрез, ключ, день),
+    нулевые итоги удаляет. Удаляются ровно прочитанные строки, поэтому приращения,
+    записанные во время свёртки, не теряются. Возвращает число удалённых строк.
+    """
+    from .models import CirculationStats
+
+    rows = CirculationStats.objects.all()
+    if date_from:
+        rows = rows.filter(date__gte=date_from)
+    if date_to:
+        rows = rows.filter(date__lte=date_to)
+    first = rows.order_by('date').values_list('date', flat=True).first()
+    last = rows.order_by('-date').values_list('date', flat=True).first()
+
+    removed = 0
+    start = first
+    while first is not None and start <= last:
+        end = min(start + timedelta(days=REBUILD_WINDOW_DAYS - 1), last)
+        with transaction.atomic():
+            groups = defaultdict(list)
+            for row in rows.filter(date__range=(start, end)).values_list('pk', 'scope', 'key', 'date', *COLUMNS):
+                groups[row[1:4]].append(row)
+            stale, folded = [], []
+            for (scope, key, date), group in groups.items():
+                totals = [sum(row[4 + i] for row in group) for i in range(len(COLUMNS))]
+                if len(group) == 1 and any(totals):
+                    continue
+                stale += [row[0] for row in group]
+                if any(totals):
+                    folded.append(CirculationStats(scope=scope, key=key, date=date, **dict(zip(COLUMNS, totals))))
+            for i in range(0, len(stale), 5000):
+                CirculationStats.objects.filter(pk__in=stale[i:i + 5000]).delete()
+            CirculationStats.objects.bulk_create(folded, batch_size=5000)
+        removed += len(stale) - len(folded)
+        start = end + timedelta(days=1)
+    return removed
+
+
+def fold_recent(days=REBUILD_WINDOW_DAYS):
+    """Ночная задача: свёртка последних дней — туда приходится почти весь поток приращений."""
+    return fold(date_from=timezone.localdate() - timedelta(days=days))
+
+
+def _window_rows(issues, returns, directions):
+    # Один сгруппированный запрос на таблицу (день, книга, читатель); разрезы библиотеки, книги,
+    # направления и читателя складываются здесь, а не отдельными GROUP BY с join'ами.
+    rows = defaultdict(Counter)
+    for day, book_id, reader_id, count in issues.values_list(
+        'issue_date', 'inventory__book_id', 'reader_id'
+    ).annotate(n=Count('pk')).order_by().iterator(chunk_size=5000):
+        for scope, key in _scope_keys(book_id, directions.get(book_id), reader_id):
+            rows[scope, key, day]['issues'] += count
+    for day, book_id, reader_id, count, late, fines in returns.values_list(
+        'return_date', 'issue__inventory__book_id', 'issue__reader_id'
+    ).annotate(
+        n=Count('pk'),
+        late=Count('pk', filter=Q(return_date__gt=F('issue__due_date'))),
+        total_fines=Sum('fine'),
+    ).order_by().iterator(chunk_size=5000):
+        for scope, key in _scope_keys(book_id, directions.get(book_id), reader_id):
+            row = rows[scope, key, day]
+            row['returns'] += count
+            row['overdue'] += late
+            row['fines'] += fines
+    return rows
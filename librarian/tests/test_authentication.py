@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from librarian.models import User, Book, Inventory, BookIssue
+
+
+class StatelessJWTTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123', last_name='Иванов')
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123')
+        cls.book = Book.objects.create(title='Учебник', quantity=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def obtain(self, username):
+        response = self.client.post('/api/token/', {'username': username, 'password': '123'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_carries_role(self):
+        tokens = self.obtain('lib1')
+        access = AccessToken(tokens['access'])
+
+        self.assertEqual((access['username'], access['role'], access['is_active']), ('lib1', 'librarian', True))
+
+    def test_user_lookup_is_skipped(self):
+        self.authorize(self.obtain('lib1')['access'])
+        self.client.get('/api/books/')  # заполняет кэш состояния пользователя
+
+        with CaptureQueriesContext(connection) as stateless:
+            self.assertEqual(self.client.get('/api/books/').status_code, 200)
+        with override_settings(JWT_STATELESS_USER=False), CaptureQueriesContext(connection) as database:
+            self.assertEqual(self.client.get('/api/books/').status_code, 200)
+
+        self.assertEqual(len(database) - len(stateless), 1)
+        self.assertFalse([query for query in stateless if 'librarian_user' in query['sql']])
+
+    def test_claims_user_in_writes_and_profile(self):
+        self.authorize(self.obtain('lib1')['access'])
+
+        response = self.client.post('/api/issues/', {
+            'reader_id': self.reader.pk, 'book_id': self.book.pk, 'due_date': timezone.localdate() + timedelta(days=14),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(BookIssue.objects.get().issued_by, self.librarian)
+
+        response = self.client.get('/users/me/')
+        self.assertEqual(response.data['last_name'], 'Иванов')
+
+    def test_reader_sees_own_issue(self):
+        issue = BookIssue.objects.create(
+            reader=self.reader, inventory=Inventory.objects.filter(book=self.book).first(), issued_by=self.librarian,
+            due_date=timezone.localdate() + timedelta(days=14),
+        )
+        self.authorize(self.obtain('reader1')['access'])
+
+        self.assertEqual(self.client.get(f'/api/issues/{issue.pk}/').status_code, 200)
+        self.assertEqual(self.client.post('/api/books/', {'title': 'Нельзя'}).status_code, 403)
+
+    def test_deactivation_revokes_token(self):
+        self.authorize(self.obtain('reader1')['access'])
+        self.assertEqual(self.client.get('/api/books/').status_code, 200)
+
+        self.reader.delete()
+
+        self.assertEqual(self.client.get('/api/books/').status_code, 401)
+
+    def test_role_change_requires_refresh(self):
+        tokens = self.obtain('reader1')
+        self.authorize(tokens['access'])
+        self.assertEqual(self.client.get('/api/books/').status_code, 200)
+
+        User.objects.filter(pk=self.reader.pk).update(role='librarian')
+        self.assertEqual(self.client.get('/api/books/').status_code, 200)  # до истечения кэша
+        cache.clear()
+        response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'].code, 'token_outdated')
+
+        self.client.credentials()
+        refreshed = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(AccessToken(refreshed.data['access'])['role'], 'librarian')
+        self.authorize(refreshed.data['access'])
+        self.assertEqual(self.client.get('/api/users/').status_code, 200)
+
+    def test_refresh_rejected_for_inactive_user(self):
+        tokens = self.obtain('reader1')
+        self.reader.delete()
+
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']})
+
+        self.assertEqual(response.status_code, 401)
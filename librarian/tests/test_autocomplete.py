@@ -0,0 +1,125 @@
+import threading
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from librarian import autocomplete
+from librarian.autocomplete import AutocompleteIndex, PrefixIndex
+from librarian.models import User, Author, Book, Inventory
+
+
+class PrefixIndexTest(APITestCase):
+    def test_add_remove_and_search(self):
+        index = PrefixIndex([(1, 'Механика', ['Механика']), (2, 'Мехатроника', ['Мехатроника'])])
+        self.assertEqual([r['id'] for r in index.search('мех', 10)], [1, 2])
+
+        index.add(3, 'Ёлки', ['Ёлки'])
+        self.assertEqual(index.search('ел', 10), [{'id': 3, 'label': 'Ёлки'}])
+
+        index.remove(1)
+        self.assertEqual([r['id'] for r in index.search('мех', 10)], [2])
+        self.assertEqual(index.search('', 10), [])
+
+
+class AutocompleteRebuildTest(SimpleTestCase):
+    def test_rebuild_runs_off_the_request_path(self):
+        snapshots = iter([[(1, 'Механика', ['Механика'])], [(2, 'Мехатроника', ['Мехатроника'])]])
+        loading, release = threading.Event(), threading.Event()
+
+        def loader():
+            entries = next(snapshots)
+            if entries[0][0] == 2:
+                loading.set()
+                release.wait(5)
+            return entries
+
+        index = AutocompleteIndex(loader)
+        self.assertEqual([r['id'] for r in index.search('мех')], [1])
+
+        with override_settings(AUTOCOMPLETE_REBUILD_SECONDS=0):
+            # Истёкший индекс отвечает сразу, перестройка идёт в фоне.
+            self.assertEqual([r['id'] for r in index.search('мех')], [1])
+        self.assertTrue(loading.wait(5))
+        self.assertIsNone(index.rebuild_in_background())
+        index.update(3, 'Мехмат', ['Мехмат'])
+        self.assertEqual([r['id'] for r in index.search('мех')], [1, 3])
+
+        release.set()
+        for _ in range(500):
+            if index.search('мехатр'):
+                break
+            time.sleep(0.01)
+        # Правка сигнала во время перестройки не потерялась.
+        self.assertEqual([r['id'] for r in index.search('мех')], [2, 3])
+
+
+class AutocompleteViewTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.reader = User.objects.create_user(username='r1', role='reader', password='123', first_name='Айбек',
+                                              last_name='Усенов', passport='AN123456', phone='+996555123456')
+        Author.objects.create(first_name='Лев', last_name='Толстой')
+        cls.book = Book.objects.create(title='Война и мир', quantity=2)
+
+    def setUp(self):
+        autocomplete.reset_all()
+        self.addCleanup(autocomplete.reset_all)
+        self.client.force_authenticate(self.librarian)
+
+    def get(self, type_, q):
+        response = self.client.get('/api/autocomplete/', {'type': type_, 'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_kinds(self):
+        self.assertEqual(self.get('books', 'мир'), [{'id': self.book.pk, 'label': 'Война и мир'}])
+        self.assertEqual(self.get('authors', 'толс')[0]['label'], 'Толстой Лев')
+        self.assertEqual(self.get('readers', 'AN12')[0]['id'], self.reader.pk)
+        self.assertEqual(self.get('readers', '99655')[0]['id'], self.reader.pk)
+
+        number = Inventory.objects.filter(book=self.book).first().inventory_number
+        self.assertTrue(self.get('inventory', number)[0]['label'].endswith('Война и мир'))
+
+    def test_signals_update_built_index(self):
+        self.get('books', 'в')
+        self.get('inventory', 'INV')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title='Воскресение', quantity=1)
+        self.assertEqual(self.get('books', 'воск')[0]['id'], book.pk)
+        number = Inventory.objects.get(book=book).inventory_number
+        self.assertEqual(len(self.get('inventory', number)), 1)
+
+        book.title = 'Анна Каренина'
+        book.save()
+        self.assertEqual(self.get('books', 'воск'), [])
+        self.assertEqual(len(self.get('books', 'анна')), 1)
+
+        self.book.delete()
+        self.assertEqual(self.get('books', 'войн'), [])
+
+    def test_readers_require_librarian(self):
+        self.client.force_authenticate(self.reader)
+
+        response = self.client.get('/api/autocomplete/', {'type': 'readers', 'q': 'ус'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/api/autocomplete/', {'type': 'books', 'q': 'во'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_benchmark_command(self):
+        stdout = StringIO()
+        call_command('benchmark_autocomplete', '--queries', '20', stdout=stdout)
+
+        self.assertIn('books: 1 записей', stdout.getvalue())
+        self.assertIn('readers: 1 записей', stdout.getvalue())
+        self.assertIn('во время перестройки', stdout.getvalue())
+
+    def test_benchmark_fails_over_target(self):
+        with self.assertRaisesMessage(CommandError, 'books в покое'):
+            call_command('benchmark_autocomplete', '--type', 'books', '--queries', '20', '--p99-ms', '0',
+                         stdout=StringIO())
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from librarian.benchmark import SCENARIOS
+from librarian.models import Book, Inventory, BookIssue, BookReturn
+
+
+class BenchmarkSuiteTest(TestCase):
+    def test_seed_and_benchmark(self):
+        call_command('seed_library', books=20, copies=103, issues=500, readers=30, stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 20)
+        self.assertEqual(Inventory.objects.count(), 103)
+        self.assertEqual(BookIssue.objects.count(), 500)
+        open_issues = BookIssue.objects.filter(is_open=True)
+        self.assertEqual(open_issues.count(), 5)
+        self.assertEqual(BookReturn.objects.count(), 495)
+        self.assertEqual(Inventory.objects.filter(status='borrowed').count(), 5)
+        self.assertFalse(BookIssue.objects.filter(is_open=False, bookreturn__isnull=True).exists())
+        for book in Book.objects.all():
+            self.assertEqual(book.available_count + book.borrowed_count, book.quantity)
+            self.assertEqual(book.borrowed_count, open_issues.filter(inventory__book=book).count())
+        # Последовательности сдвинуты за явно заданные id.
+        self.assertEqual(Book.objects.create(title='Новая', quantity=1).pk, 21)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', requests=2, warmup=1, output=output, stdout=StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['dataset']['books'], 21)
+        self.assertEqual(len(report['scenarios']), len(SCENARIOS))
+        for name, result in report['scenarios'].items():
+            self.assertEqual((result['requests'], result['errors']), (2, 0), name)
+            self.assertGreater(result['queries']['mean'], 0, name)
+        # Выданное сценарием выдачи возвращено сценарием возврата.
+        self.assertEqual(BookIssue.objects.filter(is_open=True).count(), 5)
+
+    def test_seed_requires_empty_database(self):
+        Book.objects.create(title='Книга', quantity=1)
+        with self.assertRaisesMessage(CommandError, 'База не пуста'):
+            call_command('seed_library', books=1, copies=1, issues=1, readers=1, stdout=StringIO())
+
+    def test_benchmark_rejects_bad_arguments(self):
+        with self.assertRaisesMessage(CommandError, '--requests и --concurrency'):
+            call_command('benchmark_api', requests=0, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, '--warmup не может быть отрицательным'):
+            call_command('benchmark_api', warmup=-1, stdout=StringIO())
@@ -12,13 +12,14 @@ class BookIssueSerializerTest(TestCase):
     def setUpTestData(cls):
         cls.reader = User.objects.create_user(username='reader1', role='reader', password='123')
         cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
-        cls.book = Book.objects.create(title='Test Book', count=1)
-        cls.inventory = Inventory.objects.create(book=cls.book, status='available')
+        cls.book = Book.objects.create(title='Test Book', quantity=1)
+        cls.inventory = Inventory.objects.get(book=cls.book)
 
     def test_create_book_issue_success(self):
         data = {
             'reader_id': self.reader.id,
-            'book_id': self.book.id
+            'book_id': self.book.id,
+            'due_date': timezone.now().date() + timedelta(days=30),
         }
         context = {'request': type('Request', (), {'user': self.librarian})()}
 
@@ -28,7 +29,7 @@ class BookIssueSerializerTest(TestCase):
         issue = serializer.save()
 
         self.assertEqual(issue.reader, self.reader)
-        self.assertEqual(issue.inventory.book, self.book)
+        self.assertEqual(issue.inventory, self.inventory)
         self.assertEqual(issue.issued_by, self.librarian)
         self.assertEqual(issue.inventory.status, 'borrowed')
         self.assertEqual(issue.due_date, timezone.now().date() + timedelta(days=30))
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from librarian.models import User, Author, Direction, Publisher, Book
+
+
+class BookListTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        direction = Direction.objects.create(name='Физика')
+        publisher = Publisher.objects.create(name='Наука')
+        authors = [Author.objects.create(first_name='Имя', last_name=f'Автор{i}') for i in range(3)]
+        cls.deleted_author = authors[2]
+        for i in range(30):
+            book = Book.objects.create(title=f'Книга {i}', quantity=1, direction=direction, publisher=publisher)
+            book.authors.set(authors)
+        cls.deleted_author.delete()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.librarian)
+
+    def test_default_list_keeps_nested_shape(self):
+        self.client.get('/api/books/')
+
+        # справочники из кэша: count + книги + предзагрузка авторов
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/books/')
+
+        row = response.data['results'][0]
+        self.assertEqual(row['publisher']['name'], 'Наука')
+        self.assertEqual({a['last_name'] for a in row['authors']}, {'Автор0', 'Автор1'})
+
+    def test_list_is_constant_queries(self):
+        # count + книги + предзагрузка авторов
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/books/', {'view': 'slim'})
+
+        self.assertEqual(response.data['count'], 30)
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'title', 'authors', 'direction', 'publisher', 'category',
+                                    'quantity', 'available_count'})
+        self.assertEqual(len(row['authors']), 2)
+        self.assertNotIn(self.deleted_author.pk, row['authors'])
+
+    def test_expand_uses_reference_cache(self):
+        self.client.get('/api/books/', {'expand': 'authors,direction'})
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/books/', {'expand': 'authors,direction'})
+
+        row = response.data['results'][0]
+        self.assertEqual(row['direction']['name'], 'Физика')
+        self.assertEqual({a['last_name'] for a in row['authors']}, {'Автор0', 'Автор1'})
+        self.assertIsInstance(row['publisher'], int)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/books/', {'fields': 'id,title,available_count'})
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'available_count'})
+
+    def test_retrieve_keeps_full_serializer(self):
+        book = Book.objects.first()
+        response = self.client.get(f'/api/books/{book.pk}/')
+
+        self.assertEqual(response.data['publisher']['name'], 'Наука')
+        self.assertEqual(len(response.data['authors']), 2)
+        self.assertNotIn('search_document', response.data)
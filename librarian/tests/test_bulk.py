@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from librarian.models import User, Book, Inventory, BookIssue, BookReturn
+
+
+class BulkIssueReturnTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}', role='reader', password='123') for i in range(30)
+        ]
+        cls.textbook = Book.objects.create(title='Алгебра 9', quantity=25)
+        cls.due_date = timezone.now().date() + timedelta(days=120)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def issue_class(self):
+        return self.client.post('/api/issues/bulk/', {
+            'due_date': self.due_date,
+            'items': [{'reader_id': reader.pk, 'book_id': self.textbook.pk} for reader in self.readers],
+        }, format='json')
+
+    def test_issue_to_whole_class_with_partial_failure(self):
+        # + 2 запроса статистики обращения (книги экземпляров, вставка приращений)
+        # и точка сохранения вокруг вставки выдач.
+        with self.assertNumQueries(13):
+            response = self.issue_class()
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['failed'], 5)
+        issued = [r for r in response.data['results'] if r['status'] == 'issued']
+        self.assertEqual(len(issued), 25)
+        self.assertEqual(len({r['inventory_number'] for r in issued}), 25)
+        self.assertEqual(response.data['results'][-1]['error'], "Нет доступных экземпляров этой книги.")
+
+        self.textbook.refresh_from_db()
+        self.assertEqual((self.textbook.available_count, self.textbook.borrowed_count), (0, 25))
+        self.assertEqual(BookIssue.objects.filter(inventory__book=self.textbook).count(), 25)
+
+    def test_issue_limits_and_inventory_numbers(self):
+        reader = self.readers[0]
+        books = [Book.objects.create(title=f'Книга {i}', quantity=1) for i in range(4)]
+        copy = Inventory.objects.get(book=books[0])
+
+        response = self.client.post('/api/issues/bulk/', {
+            'due_date': self.due_date,
+            'items': [
+                {'reader_id': reader.pk, 'inventory_number': copy.inventory_number},
+                {'reader_id': reader.pk, 'book_id': books[0].pk},
+                {'reader_id': reader.pk, 'book_id': books[1].pk},
+                {'reader_id': reader.pk, 'book_id': books[2].pk},
+                {'reader_id': reader.pk, 'book_id': books[3].pk},
+                {'reader_id': self.librarian.pk, 'book_id': books[3].pk},
+            ],
+        }, format='json')
+
+        self.assertEqual([r['status'] for r in response.data['results']],
+                         ['issued', 'error', 'issued', 'issued', 'error', 'error'])
+        self.assertEqual(response.data['results'][1]['error'], "У пользователя уже есть эта книга на руках.")
+        self.assertEqual(response.data['results'][4]['error'], "Нельзя иметь больше 3 книг одновременно.")
+
+    def test_issue_taken_concurrently_is_reported_per_item(self):
+        book = Book.objects.create(title='Геометрия', quantity=2)
+        raced, free = Inventory.objects.filter(book=book).order_by('pk')
+        # Параллельная выдача вставила строку уже после проверки статуса экземпляра.
+        BookIssue.objects.create(reader=self.readers[1], inventory=raced, due_date=self.due_date)
+
+        response = self.client.post('/api/issues/bulk/', {
+            'due_date': self.due_date,
+            'items': [
+                {'reader_id': self.readers[0].pk, 'inventory_number': raced.inventory_number},
+                {'reader_id': self.readers[2].pk, 'inventory_number': free.inventory_number},
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['results'][0], {'index': 0, 'status': 'error', 'error': "Экземпляр уже выдан."})
+        issued = BookIssue.objects.get(pk=response.data['results'][1]['issue_id'])
+        self.assertEqual((issued.reader, issued.inventory), (self.readers[2], free))
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.borrowed_count), (1, 1))
+
+    def test_bulk_return(self):
+        self.issue_class()
+        issues = list(BookIssue.objects.filter(inventory__book=self.textbook).select_related('inventory'))
+        BookIssue.objects.filter(pk=issues[0].pk).update(due_date=timezone.now().date() - timedelta(days=2))
+
+        response = self.client.post('/api/returns/bulk/', {'items': [
+            {'issue_id': issues[0].pk},
+            {'inventory_number': issues[1].inventory.inventory_number, 'condition': 'Порвана обложка'},
+            *[{'issue_id': issue.pk} for issue in issues[2:]],
+            {'issue_id': issues[0].pk},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(response.data['results'][0]['fine'], 2 * BookReturn.FINE_PER_DAY)
+        self.assertEqual(BookReturn.objects.get(issue=issues[1]).condition, 'Порвана обложка')
+
+        self.textbook.refresh_from_db()
+        self.assertEqual((self.textbook.available_count, self.textbook.borrowed_count), (25, 0))
+        self.assertFalse(Inventory.objects.filter(book=self.textbook, status='borrowed').exists())
+        self.assertFalse(BookIssue.objects.filter(inventory__book=self.textbook, is_open=True).exists())
+
+    def test_bulk_requires_librarian(self):
+        self.client.force_authenticate(self.readers[0])
+
+        self.assertEqual(self.issue_class().status_code, 403)
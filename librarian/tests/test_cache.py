@@ -0,0 +1,77 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from librarian.models import User, Author, Direction, Publisher, Book
+from librarian.serializers import BookSerializer
+
+
+class ReferenceCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.direction = Direction.objects.create(name='Физика')
+        cls.publisher = Publisher.objects.create(name='Наука')
+        cls.author = Author.objects.create(first_name='Лев', last_name='Ландау')
+        cls.book = Book.objects.create(title='Механика', quantity=1, direction=cls.direction, publisher=cls.publisher)
+        cls.book.authors.set([cls.author])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.librarian)
+
+    def test_nested_references_are_cached(self):
+        BookSerializer(self.book).data
+
+        # остаётся только запрос id авторов из промежуточной таблицы
+        with self.assertNumQueries(1):
+            data = BookSerializer(self.book).data
+        self.assertEqual(data['direction']['name'], 'Физика')
+        self.assertEqual(data['publisher']['name'], 'Наука')
+        self.assertEqual(data['authors'][0]['last_name'], 'Ландау')
+
+    def test_save_and_soft_delete_invalidate(self):
+        BookSerializer(self.book).data
+
+        self.direction.name = 'Астрофизика'
+        self.direction.save()
+        self.assertEqual(BookSerializer(self.book).data['direction']['name'], 'Астрофизика')
+
+        self.direction.delete()
+        self.assertTrue(BookSerializer(self.book).data['direction']['is_deleted'])
+        self.assertEqual(self.client.get(f'/api/directions/{self.direction.pk}/').status_code, 404)
+
+    def test_retrieve_served_from_cache(self):
+        self.client.get(f'/api/publishers/{self.publisher.pk}/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/publishers/{self.publisher.pk}/')
+        self.assertEqual(response.data['name'], 'Наука')
+
+    def test_list_revalidation(self):
+        response = self.client.get('/api/authors/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get('/api/authors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Author.objects.create(first_name='Евгений', last_name='Лифшиц')
+        response = self.client.get('/api/authors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_list_stamp_expires(self):
+        # Правку в другом воркере сигнал этого процесса не видит: без общего кэша
+        # ETag списка меняется, когда истекает срок отметки.
+        etag = self.client.get('/api/authors/')['ETag']
+        Author.objects.filter(pk=self.author.pk).update(last_name='Лифшиц')
+
+        later = time.time() + settings.REFERENCE_STAMP_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get('/api/authors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['last_name'], 'Лифшиц')
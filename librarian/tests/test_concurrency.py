@@ -0,0 +1,118 @@
+import threading
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from librarian.models import User, Book, BookIssue
+from librarian.serializers import BookIssueSerializer
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentIssueTest(TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        self.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        self.context = {'request': type('Request', (), {'user': self.librarian})()}
+
+    def run_concurrently(self, payloads):
+        barrier = threading.Barrier(len(payloads))
+        results = []
+        lock = threading.Lock()
+
+        def worker(data):
+            try:
+                serializer = BookIssueSerializer(data=data, context=self.context)
+                barrier.wait()
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                outcome = 'ok'
+            except ValidationError:
+                outcome = 'rejected'
+            finally:
+                connection.close()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=worker, args=(data,)) for data in payloads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_no_copy_is_issued_twice(self):
+        book = Book.objects.create(title='Popular', quantity=3)
+        readers = [
+            User.objects.create_user(username=f'reader{i}', role='reader', password='123')
+            for i in range(self.THREADS)
+        ]
+        due_date = timezone.now().date() + timedelta(days=14)
+
+        results = self.run_concurrently([
+            {'reader_id': reader.id, 'book_id': book.id, 'due_date': due_date} for reader in readers
+        ])
+
+        issues = BookIssue.objects.filter(inventory__book=book)
+        self.assertEqual(results.count('ok'), 3)
+        self.assertEqual(issues.count(), 3)
+        self.assertEqual(issues.values('inventory').distinct().count(), 3)
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.borrowed_count), (0, 3))
+
+    def test_reader_limit_holds_under_concurrency(self):
+        reader = User.objects.create_user(username='reader', role='reader', password='123')
+        books = [Book.objects.create(title=f'Book {i}', quantity=1) for i in range(self.THREADS)]
+        due_date = timezone.now().date() + timedelta(days=14)
+
+        results = self.run_concurrently([
+            {'reader_id': reader.id, 'book_id': book.id, 'due_date': due_date} for book in books
+        ])
+
+        self.assertEqual(results.count('ok'), BookIssueSerializer.MAX_ACTIVE_ISSUES)
+        self.assertEqual(BookIssue.objects.filter(reader=reader).count(), BookIssueSerializer.MAX_ACTIVE_ISSUES)
+
+    def test_issues_of_different_books_do_not_wait_for_each_other(self):
+        # Обе выдачи пишут статистику одного дня (итог библиотеки); вторая должна
+        # завершиться, пока транзакция первой ещё открыта.
+        books = [Book.objects.create(title=f'Book {i}', quantity=1) for i in range(2)]
+        readers = [User.objects.create_user(username=f'reader{i}', role='reader', password='123') for i in range(2)]
+        due_date = timezone.now().date() + timedelta(days=14)
+        first_issued, second_issued = threading.Event(), threading.Event()
+        overlapped = []
+
+        def issue(reader, book):
+            serializer = BookIssueSerializer(
+                data={'reader_id': reader.id, 'book_id': book.id, 'due_date': due_date}, context=self.context,
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        def first():
+            try:
+                with transaction.atomic():
+                    issue(readers[0], books[0])
+                    first_issued.set()
+                    overlapped.append(second_issued.wait(timeout=5))
+            finally:
+                connection.close()
+
+        def second():
+            try:
+                first_issued.wait(timeout=5)
+                issue(readers[1], books[1])
+                second_issued.set()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(overlapped, [True])
+        self.assertEqual(BookIssue.objects.count(), 2)
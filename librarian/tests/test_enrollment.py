@@ -0,0 +1,109 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from librarian import autocomplete
+from librarian.models import User
+from librarian.passwords import hash_passwords
+
+
+class ReaderEnrollmentTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        User.objects.create_user(username='old', role='reader', password='123', passport='AN000001')
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def readers(self, count, **extra):
+        return [{
+            'username': f'student{i}', 'password': f'secret{i}', 'last_name': 'Асанов', 'first_name': f'Студент{i}',
+            'passport': f'ID{100000 + i}', 'phone': f'+996700{100000 + i}', **extra,
+        } for i in range(count)]
+
+    def test_enroll_with_conflicts(self):
+        readers = self.readers(20)
+        readers[3]['passport'] = 'AN000001'
+        readers[7]['username'] = 'student1'
+        autocomplete.indexes['readers'].search('Асанов')
+
+        with self.assertNumQueries(6), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/enroll/', {'readers': readers}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['failed'], 2)
+        self.assertEqual(response.data['results'][3]['error'], "Читатель с таким паспортом уже зарегистрирован.")
+        self.assertEqual(response.data['results'][7]['error'], "Повторяется в загружаемом списке.")
+
+        user = User.objects.get(username='student5')
+        self.assertEqual(user.role, 'reader')
+        self.assertTrue(user.check_password('secret5'))
+        self.assertEqual(User.objects.filter(username__startswith='student').count(), 18)
+        self.assertEqual(len(autocomplete.indexes['readers'].search('Асанов', limit=50)), 18)
+
+    def test_password_required_without_invite(self):
+        readers = self.readers(2)
+        del readers[1]['password']
+
+        response = self.client.post('/api/users/enroll/', {'readers': readers}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username__startswith='student').exists())
+
+    def test_invite(self):
+        readers = self.readers(2)
+        for reader in readers:
+            del reader['password']
+
+        response = self.client.post('/api/users/enroll/', {'readers': readers, 'invite': True}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        invite = response.data['results'][0]
+        self.assertFalse(User.objects.get(username='student0').has_usable_password())
+
+        self.client.force_authenticate(None)
+        accept = {'uid': invite['uid'], 'token': invite['token'], 'password': 'новый-пароль'}
+        response = self.client.post('/api/invite/accept/', accept)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertTrue(User.objects.get(username='student0').check_password('новый-пароль'))
+        # Приглашение одноразовое: после смены пароля токен недействителен.
+        self.assertEqual(self.client.post('/api/invite/accept/', accept).status_code, 400)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'intake.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=['username', 'last_name', 'first_name', 'passport', 'phone'])
+                writer.writeheader()
+                writer.writerow({'username': 'ivanov', 'last_name': 'Иванов', 'first_name': 'Иван', 'passport': 'AN123456'})
+                writer.writerow({'username': 'petrov', 'last_name': 'Петров', 'first_name': 'Пётр', 'phone': '0555'})
+                writer.writerow({'username': 'old', 'last_name': 'Старый', 'first_name': 'Читатель'})
+            invites = os.path.join(directory, 'invites.csv')
+            stderr = StringIO()
+
+            call_command('enroll_readers', path, invite=invites, stdout=StringIO(), stderr=stderr)
+
+            with open(invites) as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertEqual([row['username'] for row in rows], ['ivanov'])
+        self.assertIn("Строка 3: phone", stderr.getvalue())
+        self.assertIn("Строка 4: Логин уже занят.", stderr.getvalue())
+        self.assertEqual(User.objects.get(username='ivanov').passport, 'AN123456')
+
+
+class PasswordPoolTest(SimpleTestCase):
+    @override_settings(ENROLLMENT_POOL_MIN_PASSWORDS=1)
+    def test_hash_in_process_pool(self):
+        hashes = hash_passwords(['a', 'b', 'c'], workers=2)
+
+        self.assertEqual(len(set(hashes)), 3)
+        self.assertTrue(all(check_password(password, encoded) for password, encoded in zip('abc', hashes)))
@@ -0,0 +1,183 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from librarian import cache, fines
+from librarian.models import User, Direction, Book, Inventory, BookIssue, FinePolicy, Holiday
+from librarian.overdue import sweep
+
+
+class FineRulesTest(TestCase):
+    due = date(2026, 3, 1)
+
+    def test_most_specific_policy_wins(self):
+        physics = Direction(pk=7)
+        rules = fines.FineRules([
+            FinePolicy(pk=1, name='Общее', rate_per_day=5),
+            FinePolicy(pk=2, name='Учебники', category='textbook', rate_per_day=10),
+            FinePolicy(pk=3, name='Физика', direction=physics, rate_per_day=20),
+            FinePolicy(pk=4, name='Учебники по физике', direction=physics, category='textbook', rate_per_day=30),
+        ], [])
+
+        on = self.due + timedelta(days=2)
+        self.assertEqual(rules.fine(self.due, on), 10)
+        self.assertEqual(rules.fine(self.due, on, 'textbook'), 20)
+        self.assertEqual(rules.fine(self.due, on, 'fiction', 7), 40)
+        self.assertEqual(rules.fine(self.due, on, 'textbook', 7), 60)
+
+    def test_grace_days_cap_and_holidays(self):
+        rules = fines.FineRules(
+            [FinePolicy(pk=1, name='Общее', rate_per_day=Decimal('2.50'), grace_days=2, max_fine=20)],
+            [date(2026, 3, 1), date(2026, 3, 3), date(2026, 3, 8)],
+        )
+
+        # Выходной в день срока не считается, 3 марта — считается.
+        self.assertEqual(rules.late_days(self.due, date(2026, 3, 5)), 3)
+        self.assertEqual(rules.fine(self.due, date(2026, 3, 3)), 0)
+        self.assertEqual(rules.fine(self.due, date(2026, 3, 5)), Decimal('2.50'))
+        self.assertEqual(rules.fine(self.due, date(2026, 4, 1)), 20)
+        self.assertEqual(rules.fine(self.due, self.due - timedelta(days=1)), 0)
+
+    def test_without_policies(self):
+        rules = fines.FineRules([], [])
+        self.assertEqual(rules.fine(self.due, self.due + timedelta(days=3)), 15)
+
+        rules = fines.FineRules([FinePolicy(pk=1, name='Учебники', category='textbook', rate_per_day=10)], [])
+        self.assertEqual(rules.fine(self.due, self.due + timedelta(days=3), 'fiction'), 0)
+
+
+class FineExpressionTest(APITestCase):
+    today = date(2026, 3, 20)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123',
+                                              first_name='Айбек', last_name='Усенов')
+        cls.physics = Direction.objects.create(name='Физика')
+        books = [
+            Book.objects.create(title='Механика', quantity=4, category='textbook', direction=cls.physics),
+            Book.objects.create(title='Оптика', quantity=4, category='fiction', direction=cls.physics),
+            Book.objects.create(title='Алгебра', quantity=4, category='textbook'),
+            Book.objects.create(title='Роман', quantity=5, category='fiction'),
+        ]
+        for book in books:
+            for inventory, days in zip(Inventory.objects.filter(book=book), (-1, 3, 8, 30)):
+                BookIssue.objects.create(reader=cls.reader, inventory=inventory, issued_by=cls.librarian,
+                                         due_date=cls.today - timedelta(days=days))
+
+    def setUp(self):
+        FinePolicy.objects.create(name='Учебники', category='textbook', rate_per_day=10, grace_days=1)
+        FinePolicy.objects.create(name='Физика', direction=self.physics, rate_per_day=20, max_fine=100)
+        FinePolicy.objects.create(name='Учебники по физике', direction=self.physics, category='textbook',
+                                  rate_per_day=Decimal('7.50'))
+        FinePolicy.objects.create(name='Старое', rate_per_day=100, is_active=False)
+        Holiday.objects.create(date=self.today - timedelta(days=5), name='Выходной')
+        Holiday.objects.create(date=self.today - timedelta(days=20))
+        # Правила кэшируются в процессе, а откат теста не отправляет сигналов.
+        self.addCleanup(cache.touch, FinePolicy)
+
+    def expected(self, rules, issues):
+        return {
+            issue.pk: rules.fine(issue.due_date, self.today, issue.inventory.book.category,
+                                 issue.inventory.book.direction_id)
+            for issue in issues
+        }
+
+    def test_sql_matches_python(self):
+        rules = fines.get_rules()
+        self.assertEqual(len(rules.policies), 4)
+        issues = BookIssue.objects.select_related('inventory__book').annotate(fine=rules.expression(self.today))
+
+        self.assertEqual({issue.pk: issue.fine for issue in issues}, self.expected(rules, issues))
+        self.assertEqual(sorted({issue.fine for issue in issues}), [
+            0, 15, 20, Decimal('22.50'), 35, Decimal('52.50'), 60, 100, 140, 210, 270,
+        ])
+
+    def test_sweep_accrues_policy_fines(self):
+        rules = fines.get_rules()
+        sweep(today=self.today)
+
+        issues = BookIssue.objects.select_related('inventory__book')
+        self.assertEqual(dict(issues.values_list('pk', 'accrued_fine')), self.expected(rules, issues))
+
+    def test_outstanding_fines_report_in_one_query(self):
+        fines.get_rules()
+        self.client.force_authenticate(self.librarian)
+        other = User.objects.create_user(username='reader2', role='reader', password='123',
+                                         first_name='Нурлан', last_name='Асанов')
+        inventory = Inventory.objects.filter(book__title='Роман', bookissue__isnull=True).first()
+        BookIssue.objects.create(reader=other, inventory=inventory, issued_by=self.librarian,
+                                 due_date=self.today - timedelta(days=2))
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/reports/outstanding-fines/', {'date': self.today})
+
+        rules = fines.get_rules()
+        total = sum(self.expected(rules, BookIssue.objects.filter(reader=self.reader, due_date__lt=self.today)).values())
+        self.assertEqual([(row['reader_name'], row['overdue_loans'], Decimal(row['outstanding_fine']))
+                          for row in response.data], [('Усенов Айбек', 12, total), ('Асанов Нурлан', 1, 10)])
+
+
+class FinePolicyApiTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123')
+        cls.book = Book.objects.create(title='Механика', quantity=2, category='textbook')
+
+    def setUp(self):
+        self.addCleanup(cache.touch, FinePolicy)
+
+    def issue(self, days_late):
+        inventory = Inventory.objects.filter(book=self.book, status='available').first()
+        Inventory.objects.filter(pk=inventory.pk).update(status='borrowed')
+        Book.adjust_counts(self.book.pk, available_count=-1, borrowed_count=1)
+        return BookIssue.objects.create(reader=self.reader, inventory=inventory, issued_by=self.librarian,
+                                        due_date=timezone.localdate() - timedelta(days=days_late))
+
+    def test_rules_reload_after_change(self):
+        rules = fines.get_rules()
+        with self.assertNumQueries(0):
+            self.assertIs(fines.get_rules(), rules)
+
+        self.client.force_authenticate(self.reader)
+        response = self.client.post('/api/fine-policies/', {'name': 'Учебники', 'rate_per_day': 10})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(self.librarian)
+        response = self.client.post('/api/fine-policies/', {'name': 'Учебники', 'category': 'textbook',
+                                                            'rate_per_day': 10, 'max_fine': 25}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(fines.get_rules().policy_for('textbook').name, 'Учебники')
+
+        response = self.client.post('/api/holidays/', {'date': '2026-03-08', 'name': 'Женский день'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(fines.get_rules().holidays, [date(2026, 3, 8)])
+
+    def test_sweep_rereads_rules(self):
+        issue = self.issue(3)
+        rules = fines.get_rules()
+        # Правка из другого процесса: отметка в кэше этого процесса не сдвинулась.
+        FinePolicy.objects.update(rate_per_day=7)
+        self.assertIs(fines.get_rules(), rules)
+
+        sweep()
+        issue.refresh_from_db()
+        self.assertEqual(issue.accrued_fine, 21)
+
+    def test_return_fine_uses_policy(self):
+        FinePolicy.objects.create(name='Учебники', category='textbook', rate_per_day=10, grace_days=2, max_fine=50)
+        issue = self.issue(4)
+        self.client.force_authenticate(self.librarian)
+
+        response = self.client.post('/api/returns/', {'issue_id': issue.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['fine'], '20.00')
+
+        issue = self.issue(30)
+        response = self.client.post('/api/returns/bulk/', {'items': [{'issue_id': issue.pk}]}, format='json')
+        self.assertEqual(response.data['results'][0]['fine'], Decimal(50))
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from librarian.catalogue_import import CatalogueImporter, clean_record
+from librarian.models import Author, Direction, Publisher, Book, Inventory
+
+CSV_HEADER = 'title,authors,publisher,direction,isbn,udc,bbk,category,description,quantity\n'
+
+
+def marc_record(fields):
+    """Собирает запись ISO 2709 (UTF-8) из [(тег, [(код, значение), ...]), ...]."""
+    directory, data = b'', b''
+    for tag, subfields in fields:
+        value = b'  ' + b''.join(b'\x1f' + code.encode() + text.encode() for code, text in subfields) + b'\x1e'
+        directory += f"{tag}{len(value):04d}{len(data):05d}".encode()
+        data += value
+    base = 24 + len(directory) + 1
+    length = base + len(data) + 1
+    leader = f"{length:05d}nam a22{base:05d} a 4500".encode()
+    return leader + directory + b'\x1e' + data + b'\x1d'
+
+
+class ImportCatalogueTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(content if isinstance(content, bytes) else content.encode())
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_catalogue', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_upserts_by_isbn(self):
+        existing = Book.objects.create(title='Алгебра', isbn='978-5-09-000001-1', quantity=2, category='textbook')
+        path = self.write('catalogue.csv', CSV_HEADER + (
+            'Алгебра 9 класс,"Макарычев Юрий Николаевич; Миндюк Нора Григорьевна",Просвещение,Математика,'
+            '9785090000011,,,,Новое издание,5\n'
+            'Геометрия,Атанасян Левон Сергеевич,просвещение,математика,978-5-09-000002-8,514,22.151,Учебник,,3\n'
+            'История,"Макарычев Юрий Николаевич",Дрофа,,,,,,,\n'
+            ',Без Названия,,,,,,,,1\n'
+        ))
+
+        out, err = self.run_import(path, '--batch-size', '2')
+
+        self.assertIn('Запись 4: Не указано название.', err)
+        existing.refresh_from_db()
+        self.assertEqual((existing.title, existing.quantity, existing.available_count), ('Алгебра 9 класс', 5, 5))
+        self.assertEqual(existing.category, 'textbook')
+        self.assertEqual(Inventory.objects.filter(book=existing).count(), 5)
+        self.assertIn('Миндюк', existing.search_document)
+
+        geometry = Book.objects.get(title='Геометрия')
+        self.assertEqual((geometry.category, geometry.udc, geometry.available_count), ('textbook', '514', 3))
+        self.assertEqual(geometry.publisher, existing.publisher)
+        self.assertEqual(Publisher.objects.count(), 2)
+        self.assertEqual(Direction.objects.count(), 1)
+        self.assertEqual(Author.objects.filter(last_name='Макарычев').count(), 1)
+        self.assertEqual(Book.objects.get(title='История').quantity, 1)
+
+        numbers = Inventory.objects.values_list('inventory_number', flat=True)
+        self.assertEqual(len(set(numbers)), 2 + 3 + 3 + 1)
+        self.assertFalse(os.path.exists(f"{path}.progress"))
+
+        # Повторный запуск ничего не дублирует (кроме книг без ISBN).
+        self.run_import(path)
+        self.assertEqual(Book.objects.filter(isbn__startswith='978').count(), 2)
+        self.assertEqual(Inventory.objects.filter(book=existing).count(), 5)
+
+    def test_queries_do_not_grow_with_batch(self):
+        def run(count, offset):
+            records = [clean_record({
+                'title': f'Книга {offset + i}', 'authors': f'Автор{offset + i} Имя', 'publisher': f'Изд {offset + i}',
+                'isbn': f'{offset + i:013d}', 'quantity': 3,
+            }) for i in range(count)]
+            importer = CatalogueImporter()
+            with CaptureQueriesContext(connection) as ctx:
+                importer.import_batch(records)
+            return len(ctx.captured_queries)
+
+        # SQLite делит bulk_create на пачки по лимиту параметров запроса.
+        self.assertLessEqual(run(100, 1000) - run(5, 0), 2)
+
+    def test_marc_import(self):
+        path = self.write('catalogue.mrc', b'\n'.join([
+            marc_record([
+                ('020', [('a', '978-5-17-000003-5 (в пер.)')]),
+                ('080', [('a', '821.161.1')]),
+                ('100', [('a', 'Пушкин, Александр Сергеевич.')]),
+                ('245', [('a', 'Евгений Онегин :'), ('b', 'роман в стихах /')]),
+                ('264', [('a', 'Москва :'), ('b', 'АСТ,')]),
+                ('650', [('a', 'Литература.')]),
+                ('876', [('p', '0001')]),
+                ('876', [('p', '0002')]),
+            ]),
+            marc_record([('245', [('a', 'Сборник задач.')])]),
+        ]))
+
+        out, _ = self.run_import(path, '--copies', '4')
+
+        book = Book.objects.get(isbn='978-5-17-000003-5')
+        self.assertEqual(book.title, 'Евгений Онегин: роман в стихах')
+        self.assertEqual((book.udc, book.quantity, book.publisher.name, book.direction.name),
+                         ('821.161.1', 2, 'АСТ', 'Литература'))
+        author = book.authors.get()
+        self.assertEqual((author.last_name, author.first_name, author.middle_name),
+                         ('Пушкин', 'Александр', 'Сергеевич'))
+        self.assertEqual(Book.objects.get(title='Сборник задач').quantity, 4)
+        self.assertIn('Книг создано: 2', out)
+
+    def test_resume_skips_committed_batches(self):
+        path = self.write('catalogue.csv', CSV_HEADER + ''.join(
+            f'Книга {i},,,,{i:013d},,,,,1\n' for i in range(5)
+        ))
+        with open(f"{path}.progress", 'w') as progress:
+            json.dump({'position': 3}, progress)
+
+        out, _ = self.run_import(path, '--resume')
+
+        self.assertIn('Продолжение с записи 4', out)
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), ['Книга 3', 'Книга 4'])
@@ -0,0 +1,94 @@
+import re
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from drfsite.instrumentation import RequestMetrics, registry
+from librarian.dashboard import SECTIONS
+from librarian.models import User, Book
+from librarian.tests.test_reports import create_circulation
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        for i in range(3):
+            Book.objects.create(title=f'Книга {i}', quantity=1)
+
+    def setUp(self):
+        registry.reset()
+        self.client.force_authenticate(self.librarian)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/books/')
+
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'ser;dur=[\d.]+')
+        self.assertNotIn('dup;', timing)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/books/')
+        self.client.get('/api/books/')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="book-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{view="book-list"} 2', body)
+        self.assertIn('db_queries_total{view="book-list"}', body)
+        # Сам /metrics в статистику не попадает.
+        self.assertNotIn('view="metrics"', body)
+
+    def test_metrics_requires_librarian_or_token(self):
+        reader = User.objects.create_user(username='reader1', role='reader', password='123')
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.client.force_authenticate(reader)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        self.client.force_authenticate(None)
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeated_queries_are_detected(self):
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics):
+            for book in Book.objects.all():
+                list(book.authors.all())
+
+        self.assertEqual(metrics.queries, 4)
+        duplicates = metrics.duplicates(3)
+        self.assertEqual(list(duplicates.values()), [3])
+
+
+class InstrumentationDisabledTest(APITestCase):
+    def test_no_overhead_when_disabled(self):
+        user = User.objects.create_user(username='lib1', role='librarian', password='123')
+        self.client.force_authenticate(user)
+
+        self.assertNotIn('Server-Timing', self.client.get('/api/books/'))
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, DASHBOARD_PARALLEL_SECTIONS=True)
+class ParallelDashboardInstrumentationTest(TransactionTestCase):
+    def test_section_queries_from_pool_threads_are_counted(self):
+        librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        create_circulation(librarian)
+        client = APIClient()
+        client.force_authenticate(librarian)
+
+        response = client.get('/reports/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertGreaterEqual(queries, len(SECTIONS))
@@ -0,0 +1,234 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from librarian.models import User, Book, Inventory, BookIssue
+from librarian.serializers import BookIssueSerializer, BookReturnSerializer
+
+
+class InventoryProvisioningTest(TestCase):
+    def create_book(self, quantity):
+        with CaptureQueriesContext(connection) as ctx:
+            book = Book.objects.create(title=f'Book x{quantity}', quantity=quantity)
+        return book, len(ctx.captured_queries)
+
+    def test_create_generates_numbered_copies(self):
+        book, _ = self.create_book(3)
+
+        numbers = list(Inventory.objects.filter(book=book).values_list('inventory_number', flat=True))
+        self.assertEqual(len(numbers), 3)
+        self.assertEqual(len(set(numbers)), 3)
+        self.assertTrue(all(n.startswith('INV-') for n in numbers))
+        self.assertFalse(Inventory.objects.filter(book=book).exclude(status='available').exists())
+
+    def test_round_trips_do_not_grow_with_copies(self):
+        # Точка сохранения save(), книга, резерв номеров (SELECT FOR UPDATE и UPDATE),
+        # экземпляры одним INSERT, освобождение точки сохранения.
+        for quantity in (1, 10):
+            with self.assertNumQueries(6):
+                Book.objects.create(title=f'Book x{quantity}', quantity=quantity)
+        # SQLite делит bulk_create на пачки по лимиту параметров запроса.
+        self.assertLessEqual(self.create_book(500)[1], 7)
+
+    def test_quantity_increase_uses_bulk_path(self):
+        book, _ = self.create_book(2)
+        counts = []
+        for quantity in (3, 203):
+            book.quantity = quantity
+            with CaptureQueriesContext(connection) as ctx:
+                book.save()
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(Inventory.objects.filter(book=book).count(), 203)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_single_inventory_save_continues_sequence(self):
+        book, _ = self.create_book(2)
+        inventory = Inventory.objects.create(book=book)
+
+        self.assertTrue(inventory.inventory_number.startswith('INV-'))
+        self.assertEqual(Inventory.objects.filter(inventory_number=inventory.inventory_number).count(), 1)
+        book.refresh_from_db()
+        self.assertEqual(book.available_count, 3)
+
+
+class BookCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123')
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+
+    def setUp(self):
+        self.context = {'request': type('Request', (), {'user': self.librarian})()}
+
+    def issue(self, book):
+        serializer = BookIssueSerializer(data={
+            'reader_id': self.reader.id,
+            'book_id': book.id,
+            'due_date': timezone.now().date() + timedelta(days=14),
+        }, context=self.context)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_counters_follow_issue_and_return(self):
+        book = Book.objects.create(title='Counted', quantity=3)
+        self.assertEqual((book.available_count, book.borrowed_count, book.deleted_count), (3, 0, 0))
+
+        issue = self.issue(book)
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.borrowed_count), (2, 1))
+
+        serializer = BookReturnSerializer(data={'issue_id': issue.id}, context=self.context)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.borrowed_count), (3, 0))
+
+    def test_return_closes_issue_once(self):
+        book = Book.objects.create(title='Counted', quantity=3)
+        issue = self.issue(book)
+        self.assertTrue(issue.is_open)
+
+        first = BookReturnSerializer(data={'issue_id': issue.id}, context=self.context)
+        second = BookReturnSerializer(data={'issue_id': issue.id}, context=self.context)
+        self.assertTrue(first.is_valid() and second.is_valid())
+        first.save()
+
+        with self.assertRaises(ValidationError):
+            second.save()
+        issue.refresh_from_db()
+        book.refresh_from_db()
+        self.assertFalse(issue.is_open)
+        self.assertEqual((book.available_count, book.borrowed_count), (3, 0))
+        self.assertFalse(BookReturnSerializer(data={'issue_id': issue.id}, context=self.context).is_valid())
+
+    def test_quantity_changes_update_counters(self):
+        book = Book.objects.create(title='Counted', quantity=3)
+        book.quantity = 5
+        book.save()
+        self.assertEqual(book.available_count, 5)
+
+        book.quantity = 1
+        book.save()
+        self.assertEqual((book.available_count, book.deleted_count), (1, 4))
+
+    def test_stale_instance_save_keeps_counters(self):
+        book = Book.objects.create(title='Counted', quantity=3)
+        self.issue(book)
+
+        book.title = 'Renamed'
+        book.save()
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.borrowed_count), (2, 1))
+
+    def test_recount_command(self):
+        book = Book.objects.create(title='Counted', quantity=3)
+        Book.objects.filter(pk=book.pk).update(available_count=10)
+
+        with self.assertRaises(CommandError):
+            call_command('recount_book_copies', '--check', stdout=StringIO())
+
+        call_command('recount_book_copies', stdout=StringIO())
+        book.refresh_from_db()
+        self.assertEqual(book.available_count, 3)
+        call_command('recount_book_copies', '--check', stdout=StringIO())
+
+
+class DeleteApiTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123')
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def issue(self, book):
+        return self.client.post('/api/issues/', {
+            'reader_id': self.reader.id, 'book_id': book.id, 'due_date': timezone.localdate() + timedelta(days=14),
+        }).data['id']
+
+    def test_book_with_open_loan_is_kept(self):
+        book = Book.objects.create(title='Механика', quantity=2)
+        issue_id = self.issue(book)
+
+        response = self.client.delete(f'/api/books/{book.pk}/')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.post('/api/returns/', {'issue_id': issue_id})
+        response = self.client.delete(f'/api/books/{book.pk}/')
+        self.assertEqual(response.status_code, 204)
+        book = Book.all_objects.get(pk=book.pk)
+        self.assertTrue(book.is_deleted)
+        self.assertEqual((book.available_count, book.borrowed_count, book.deleted_count), (0, 0, 2))
+
+    def test_copy_status_changes_only_through_counters(self):
+        book = Book.objects.create(title='Механика', quantity=2)
+        copy = Inventory.objects.filter(book=book).first()
+
+        response = self.client.patch(f'/api/inventories/{copy.pk}/', {'status': 'deleted'})
+        self.assertEqual(response.data['status'], 'available')
+
+        self.assertEqual(self.client.delete(f'/api/inventories/{copy.pk}/').status_code, 204)
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.deleted_count), (1, 1))
+
+        self.issue(book)
+        borrowed = Inventory.objects.get(book=book, status='borrowed')
+        self.assertEqual(self.client.delete(f'/api/inventories/{borrowed.pk}/').status_code, 400)
+
+    def test_deleted_return_reopens_issue(self):
+        book = Book.objects.create(title='Механика', quantity=1)
+        issue_id = self.issue(book)
+        return_id = self.client.post('/api/returns/', {'issue_id': issue_id}).data['id']
+
+        self.assertEqual(self.client.delete(f'/api/returns/{return_id}/').status_code, 204)
+        book.refresh_from_db()
+        self.assertTrue(BookIssue.objects.get(pk=issue_id).is_open)
+        self.assertEqual((book.available_count, book.borrowed_count), (0, 1))
+        self.assertTrue(Inventory.objects.filter(book=book, status='borrowed').exists())
+
+        # Возврат можно оформить снова; после повторной выдачи экземпляра отменить его уже нельзя.
+        return_id = self.client.post('/api/returns/', {'issue_id': issue_id}).data['id']
+        self.issue(book)
+        self.assertEqual(self.client.delete(f'/api/returns/{return_id}/').status_code, 400)
+        self.assertFalse(BookIssue.objects.get(pk=issue_id).is_open)
+
+
+class InventoryAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='123')
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123',
+                                              first_name='Айбек', last_name='Усенов')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_admin_keeps_counters(self):
+        book = Book.objects.create(title='Механика', quantity=3)
+        response = self.client.post('/api/admin/librarian/inventory/add/', {'book': book.pk})
+        self.assertEqual(response.status_code, 302)
+        book.refresh_from_db()
+        self.assertEqual(book.available_count, 4)
+
+        borrowed, *free = Inventory.objects.filter(book=book)
+        BookIssue.objects.create(reader=self.reader, inventory=borrowed, due_date=timezone.localdate())
+        Inventory.objects.filter(pk=borrowed.pk).update(status='borrowed')
+        Book.adjust_counts(book.pk, available_count=-1, borrowed_count=1)
+
+        self.client.post('/api/admin/librarian/inventory/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [borrowed.pk, *[copy.pk for copy in free]],
+        })
+        book.refresh_from_db()
+        self.assertEqual((book.available_count, book.borrowed_count, book.deleted_count), (0, 1, 3))
+        self.assertEqual(Inventory.objects.get(pk=borrowed.pk).status, 'borrowed')
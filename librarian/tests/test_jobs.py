@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from librarian import jobs
+from librarian.models import User, Book, Inventory, BookIssue, BookReturn, Reminder, BackgroundJob
+from librarian.overdue import sweep
+
+
+def failing_task():
+    raise RuntimeError("сбой")
+
+
+class OverdueSweepTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.reader = User.objects.create_user(username='reader1', role='reader', password='123')
+        cls.book = Book.objects.create(title='Механика', quantity=10)
+        cls.today = timezone.localdate()
+
+    def issue(self, days_to_due):
+        inventory = Inventory.objects.filter(book=self.book, bookissue__isnull=True).first()
+        return BookIssue.objects.create(reader=self.reader, inventory=inventory, issued_by=self.librarian,
+                                        due_date=self.today + timedelta(days=days_to_due))
+
+    def test_accrual_in_one_update_per_batch(self):
+        late = [self.issue(-days) for days in (1, 3, 3, 10)]
+        on_time = self.issue(10)
+        returned = self.issue(-5)
+        BookReturn.objects.create(issue=returned, received_by=self.librarian)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = sweep(batch_size=3)
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "librarian_bookissue"')]
+        # Две пачки просрочек и снятие начислений с продлённых выдач.
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(result['accrued'], 4)
+        fines = dict(BookIssue.objects.values_list('pk', 'accrued_fine'))
+        self.assertEqual([fines[issue.pk] for issue in late], [5, 15, 15, 50])
+        self.assertEqual(fines[on_time.pk], 0)
+        self.assertEqual(fines[returned.pk], 0)
+        self.assertEqual(BookIssue.objects.get(pk=late[0].pk).fine_accrued_on, self.today)
+
+    def test_reminders(self):
+        late = self.issue(-2)
+        soon = self.issue(1)
+        self.issue(10)
+
+        self.assertEqual(sweep()['reminders'], 2)
+        self.assertEqual(sweep()['reminders'], 0)
+        self.assertEqual(set(Reminder.objects.values_list('issue', 'kind')), {(late.pk, 'overdue'), (soon.pk, 'due_soon')})
+
+        BookReturn.objects.create(issue=late, received_by=self.librarian)
+        self.assertEqual(sweep()['dropped_reminders'], 1)
+
+    def test_extended_loan_is_cleared(self):
+        issue = self.issue(-4)
+        sweep()
+        BookIssue.objects.filter(pk=issue.pk).update(due_date=self.today + timedelta(days=7))
+
+        self.assertEqual(sweep()['cleared'], 1)
+        self.assertEqual(BookIssue.objects.get(pk=issue.pk).accrued_fine, 0)
+
+    def test_accrued_fine_in_api(self):
+        issue = self.issue(-3)
+        sweep()
+        self.client.force_authenticate(self.reader)
+
+        response = self.client.get(f'/api/issues/{issue.pk}/')
+
+        self.assertEqual(response.data['accrued_fine'], '15.00')
+        self.assertEqual(response.data['fine_accrued_on'], self.today.isoformat())
+
+
+@override_settings(BACKGROUND_JOBS={
+    'overdue_sweep': {'task': 'librarian.overdue.sweep', 'daily_at': '02:00'},
+    'broken': {'task': 'librarian.tests.test_jobs.failing_task'},
+})
+class JobRunnerTest(TestCase):
+    def local(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def test_daily_schedule(self):
+        now = self.local(2026, 3, 10, 1, 0)
+        self.assertEqual(jobs.run_due(now), [])
+        job = BackgroundJob.objects.get()
+        self.assertEqual((job.status, job.run_at), ('pending', self.local(2026, 3, 10, 2, 0)))
+
+        finished = jobs.run_due(self.local(2026, 3, 10, 2, 30))
+
+        self.assertEqual([(job.name, job.status) for job in finished], [('overdue_sweep', 'done')])
+        self.assertIn('accrued', finished[0].result)
+        self.assertEqual(
+            list(BackgroundJob.objects.filter(status='pending').values_list('name', 'run_at')),
+            [('overdue_sweep', self.local(2026, 3, 11, 2, 0))],
+        )
+
+    def test_enqueue_moves_pending_job_earlier(self):
+        now = timezone.now()
+        jobs.schedule_daily(now)
+        jobs.enqueue('overdue_sweep', now)
+
+        self.assertEqual(BackgroundJob.objects.get().run_at, now)
+        with self.assertRaises(ValueError):
+            jobs.enqueue('unknown')
+
+    def test_failed_and_stale_jobs(self):
+        jobs.enqueue('broken')
+        with self.assertLogs('librarian.jobs', 'ERROR'):
+            job = jobs.run_due()[0]
+        self.assertEqual(job.status, 'failed')
+        self.assertIn("RuntimeError: сбой", job.error)
+
+        jobs.enqueue('broken')
+        stale = jobs.claim(timezone.now())
+        BackgroundJob.objects.filter(pk=stale.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.requeue_stale(timezone.now()), 1)
+        self.assertEqual(BackgroundJob.objects.get(pk=stale.pk).status, 'pending')
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('run_jobs', '--once', '--now', 'overdue_sweep', stdout=stdout)
+
+        self.assertIn("overdue_sweep: {'date'", stdout.getvalue())
+        self.assertTrue(BackgroundJob.objects.filter(name='overdue_sweep', status='done').exists())
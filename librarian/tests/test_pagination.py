@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from librarian.models import User, Author, Book, Inventory, BookIssue
+
+
+class DefaultPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        author = Author.objects.create(first_name='Имя', last_name='Автор')
+        due_date = timezone.now().date() + timedelta(days=14)
+        for i in range(12):
+            book = Book.objects.create(title=f'Книга {i}', quantity=10)
+            book.authors.set([author])
+            reader = User.objects.create_user(username=f'reader{i}', role='reader', password='123')
+            for inventory in Inventory.objects.filter(book=book)[:5]:
+                BookIssue.objects.create(reader=reader, inventory=inventory, due_date=due_date,
+                                         issued_by=cls.librarian)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.librarian)
+
+    def test_reference_tables_use_limit_offset(self):
+        response = self.client.get('/api/books/', {'limit': 5})
+
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 5)
+
+        response = self.client.get('/api/books/', {'limit': 10000})
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_issues_use_cursor(self):
+        response = self.client.get('/api/issues/')
+
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 50)
+
+        ids = [row['id'] for row in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [row['id'] for row in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(set(ids)), 60)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_cursor_pages_through_equal_dates(self):
+        # У всех 60 выдач одна issue_date: порядок внутри неё задаёт id.
+        for ordering, reverse in (('issue_date', False), ('-issue_date', True)):
+            ids, url, params = [], '/api/issues/', {'ordering': ordering, 'page_size': 7}
+            while url:
+                response = self.client.get(url, params)
+                ids += [row['id'] for row in response.data['results']]
+                url, params = response.data['next'], None
+            self.assertEqual(ids, sorted(set(ids), reverse=reverse))
+            self.assertEqual(len(ids), 60)
+
+            previous = self.client.get(response.data['previous'])
+            self.assertEqual([row['id'] for row in previous.data['results']], ids[-11:-4])
+
+    def test_issue_page_queries_do_not_grow(self):
+        self.client.get('/api/issues/', {'page_size': 1})
+        with self.assertNumQueries(2):
+            self.client.get('/api/issues/', {'page_size': 1})
+        with self.assertNumQueries(2):
+            self.client.get('/api/issues/', {'page_size': 40})
+
+    def test_page_size_param_is_capped_not_rejected(self):
+        response = self.client.get('/api/inventories/', {'page_size': 100000})
+
+        self.assertEqual(len(response.data['results']), 120)
+        self.assertIsNone(response.data['next'])
@@ -0,0 +1,359 @@
+import csv
+import io
+import time
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
+
+from asgiref.sync import async_to_sync
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from librarian.authentication import LibraryRefreshToken
+from librarian.dashboard import SECTIONS, compute_sections
+from librarian.export import CSVRenderer, export_response
+from librarian.models import User, Direction, Publisher, Book, Inventory, BookIssue, BookReturn
+from librarian.serializers import DirectionSerializer
+from librarian.views import ReportAPIView
+
+
+class BookAvailabilityReportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.direction = Direction.objects.create(name='Математика')
+        cls.publisher = Publisher.objects.create(name='Просвещение')
+        for i in range(5):
+            Book.objects.create(title=f'Книга {i}', quantity=3, direction=cls.direction,
+                                publisher=cls.publisher, category='textbook')
+        Book.objects.create(title='Роман', quantity=2, category='fiction')
+
+        book = Book.objects.get(title='Книга 0')
+        Inventory.objects.filter(pk=Inventory.objects.filter(book=book).first().pk).update(status='borrowed')
+        Book.adjust_counts(book.pk, available_count=-1, borrowed_count=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def test_counts_per_status(self):
+        response = self.client.get('/reports/book-availability/')
+
+        self.assertEqual(response.status_code, 200)
+        row = next(r for r in response.data if r['book_title'] == 'Книга 0')
+        self.assertEqual(row['total_copies'], 3)
+        self.assertEqual(row['available_copies'], 2)
+        self.assertEqual(row['issued_copies'], 1)
+        self.assertEqual(row['deleted_copies'], 0)
+
+    def test_query_count_is_constant(self):
+        for i in range(20):
+            Book.objects.create(title=f'Доп {i}', quantity=2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/reports/book-availability/')
+        self.assertEqual(len(response.data), 26)
+
+    async def test_async_handler(self):
+        access = LibraryRefreshToken.for_user(self.librarian).access_token
+        headers = {'authorization': f'Bearer {access}'}
+
+        response = await self.async_client.get('/reports/book-availability/', {'limit': 2}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['count'], len(response.json()['results'])), (6, 2))
+
+        response = await self.async_client.get('/reports/top-books/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get('/reports/dashboard/', headers=headers)
+        self.assertEqual(response.json()['availability']['books'], 6)
+
+    def test_filter_and_paginate(self):
+        response = self.client.get('/reports/book-availability/', {'category': 'textbook', 'limit': 2})
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get('/reports/book-availability/', {'direction': self.direction.pk})
+        self.assertEqual(len(response.data), 5)
+
+
+class IssuedBooksReportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}', role='reader', password='123')
+            for i in range(3)
+        ]
+        book = Book.objects.create(title='Учебник', quantity=30)
+        due_date = timezone.now().date() + timedelta(days=14)
+        for i, inventory in enumerate(Inventory.objects.filter(book=book)[:9]):
+            issue = BookIssue.objects.create(
+                reader=cls.readers[i % 3], inventory=inventory, due_date=due_date, issued_by=cls.librarian
+            )
+            if i % 3 == 0:
+                BookReturn.objects.create(issue=issue, received_by=cls.librarian)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/reports/issued-books/')
+
+        self.assertEqual(len(response.data), 9)
+        self.assertEqual(sum(row['status'] == 'Возвращена' for row in response.data), 3)
+
+    def test_filters(self):
+        response = self.client.get('/reports/issued-books/', {'status': 'open'})
+        self.assertEqual(len(response.data), 6)
+
+        response = self.client.get('/reports/issued-books/', {'reader': self.readers[0].pk, 'status': 'returned'})
+        self.assertEqual(len(response.data), 3)
+
+        next_day = BookIssue.objects.first().issue_date + timedelta(days=1)
+        response = self.client.get('/reports/issued-books/', {'date_from': next_day})
+        self.assertEqual(len(response.data), 0)
+
+    def test_cursor_pagination(self):
+        response = self.client.get('/reports/issued-books/', {'page_size': 4})
+        ids = [row['issue_id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [row['issue_id'] for row in response.data['results']]
+
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(len(set(ids)), 9)
+
+    def test_csv_export(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/reports/issued-books/', {'format': 'csv', 'status': 'open', 'page_size': 2})
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="issued_books_', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content.removeprefix('\ufeff'))))
+        self.assertEqual(rows[0], ['issue_id', 'issue_date', 'title', 'reader', 'issued_by', 'due_date', 'status'])
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(row[6] == 'На руках' for row in rows[1:]))
+
+    def test_asgi_export_streams_asynchronously(self):
+        rows = ({'issue_id': i, 'title': f'Книга {i}'} for i in range(3))
+        response = export_response(CSVRenderer(), 'issued_books', ['issue_id', 'title'], rows, asynchronous=True)
+
+        async def read():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(async_to_sync(read)().decode(), '\ufeffissue_id,title\r\n0,Книга 0\r\n1,Книга 1\r\n2,Книга 2\r\n')
+
+
+class OverdueBooksReportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        reader = User.objects.create_user(username='reader1', role='reader', password='123',
+                                          first_name='Айбек', last_name='Усенов')
+        book = Book.objects.create(title='Учебник', quantity=10)
+        today = timezone.now().date()
+        copies = list(Inventory.objects.filter(book=book))
+        for days_late, inventory in zip((10, 3, 1, -5), copies):
+            BookIssue.objects.create(reader=reader, inventory=inventory,
+                                     due_date=today - timedelta(days=days_late), issued_by=cls.librarian)
+        returned = BookIssue.objects.create(reader=reader, inventory=copies[4],
+                                            due_date=today - timedelta(days=20), issued_by=cls.librarian)
+        BookReturn.objects.create(issue=returned, received_by=cls.librarian)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def test_only_unreturned_overdue_issues(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/reports/overdue-books/')
+
+        self.assertEqual([row['days_overdue'] for row in response.data], [10, 3, 1])
+        self.assertEqual(response.data[0]['fine'], 10 * BookReturn.FINE_PER_DAY)
+        self.assertEqual(response.data[0]['book_title'], 'Учебник')
+
+    def test_pagination(self):
+        response = self.client.get('/reports/overdue-books/', {'limit': 2, 'offset': 2})
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['days_overdue'] for row in response.data['results']], [1])
+
+    def test_xlsx_export(self):
+        response = self.client.get('/reports/overdue-books/', {'format': 'xlsx'})
+
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('[Content_Types].xml', archive.namelist())
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        rows = [[''.join(cell.itertext()) for cell in row] for row in sheet.iterfind('.//s:row', ns)]
+
+        self.assertEqual(rows[0][:3], ['reader', 'inventory_number', 'book_title'])
+        self.assertEqual([row[5] for row in rows[1:]], ['10', '3', '1'])
+        self.assertEqual(rows[1][0], 'Усенов А.')
+
+
+class ReaderActivityReportTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        book = Book.objects.create(title='Учебник', quantity=20)
+        copies = iter(Inventory.objects.filter(book=book))
+        due_date = timezone.now().date() + timedelta(days=14)
+        for i, (issues, fines) in enumerate([(1, [0]), (3, [10, 15]), (2, [40])]):
+            reader = User.objects.create_user(username=f'reader{i}', role='reader', password='123',
+                                              first_name='Имя', last_name=f'Фамилия{i}')
+            for n in range(issues):
+                issue = BookIssue.objects.create(reader=reader, inventory=next(copies),
+                                                 due_date=due_date, issued_by=cls.librarian)
+                if n < len(fines):
+                    BookReturn.objects.create(issue=issue, fine=fines[n], received_by=cls.librarian)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def test_counts_and_fines_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/reports/reader-activity/')
+
+        rows = {row['reader_name']: row for row in response.data}
+        self.assertEqual(rows['Фамилия1 Имя']['books_borrowed'], 3)
+        self.assertEqual(rows['Фамилия1 Имя']['total_fines'], 25.0)
+        self.assertEqual(rows['Фамилия0 Имя']['total_fines'], 0.0)
+
+    def test_ordering_and_top(self):
+        response = self.client.get('/reports/reader-activity/', {'ordering': 'activity', 'top': 2})
+        self.assertEqual([row['reader_name'] for row in response.data], ['Фамилия1 Имя', 'Фамилия2 Имя'])
+
+        response = self.client.get('/reports/reader-activity/', {'ordering': 'fines', 'top': 1})
+        self.assertEqual(response.data[0]['total_fines'], 40.0)
+
+    def test_date_window(self):
+        next_day = BookIssue.objects.first().issue_date + timedelta(days=1)
+        response = self.client.get('/reports/reader-activity/', {'date_from': next_day})
+
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(row['books_borrowed'] == 0 for row in response.data))
+
+        response = self.client.get('/reports/reader-activity/', {'date_from': next_day, 'date_to': '2000-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_errors_are_json(self):
+        response = self.client.get('/reports/reader-activity/', {'format': 'csv', 'ordering': 'unknown'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('ordering', response.json())
+
+
+def create_circulation(librarian):
+    """Две книги; у читателя две выдачи, одна просрочена, другая возвращена со штрафом."""
+    reader = User.objects.create_user(username='reader1', role='reader', password='123',
+                                      first_name='Айбек', last_name='Усенов')
+    Book.objects.create(title='Роман', quantity=2, category='fiction')
+    book = Book.objects.create(title='Учебник', quantity=3, category='textbook')
+    first, second = Inventory.objects.filter(book=book)[:2]
+    today = timezone.localdate()
+    BookIssue.objects.create(reader=reader, inventory=first, due_date=today - timedelta(days=4), issued_by=librarian)
+    Inventory.objects.filter(pk=first.pk).update(status='borrowed')
+    Book.adjust_counts(book.pk, available_count=-1, borrowed_count=1)
+    returned = BookIssue.objects.create(reader=reader, inventory=second, due_date=today, issued_by=librarian)
+    BookReturn.objects.create(issue=returned, fine=15, received_by=librarian)
+    return reader, book
+
+
+class DirectionReportView(ReportAPIView):
+    queryset = Direction.objects.order_by('name')
+    serializer_class = DirectionSerializer
+    pagination_class = None
+
+
+class ReportAPIViewTest(APITestCase):
+    def test_default_rows_use_serializer(self):
+        Direction.objects.create(name='Физика')
+        Direction.objects.create(name='Математика')
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, User.objects.create_user(username='lib1', role='librarian', password='123'))
+
+        response = async_to_sync(DirectionReportView.as_view())(request)
+
+        self.assertEqual([row['name'] for row in response.data], ['Математика', 'Физика'])
+
+
+class DashboardTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.reader, cls.book = create_circulation(cls.librarian)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def test_sections(self):
+        # + имена читателей и названия книг для топов отдельными запросами.
+        with self.assertNumQueries(len(SECTIONS) + 2):
+            response = self.client.get('/reports/dashboard/', {'top': 1})
+
+        self.assertEqual(response.status_code, 200)
+        availability = response.data['availability']
+        self.assertEqual((availability['books'], availability['available'], availability['borrowed']), (2, 4, 1))
+        self.assertEqual([row['category'] for row in availability['by_category']], ['fiction', 'textbook'])
+        overdue = response.data['overdue']
+        self.assertEqual((overdue['loans'], overdue['readers'], overdue['max_days_overdue']), (1, 1, 4))
+        self.assertEqual(overdue['accrued_fines'], 4 * BookReturn.FINE_PER_DAY)
+        activity = response.data['activity']
+        self.assertEqual((activity['issues'], activity['active_readers'], activity['returns']), (2, 1, 1))
+        self.assertEqual(activity['fines'], 15)
+        self.assertEqual(activity['top_readers'], [
+            {'reader_id': self.reader.pk, 'reader_name': 'Усенов Айбек', 'books_borrowed': 2},
+        ])
+        self.assertEqual(activity['top_books'], [{'book_id': self.book.pk, 'title': 'Учебник', 'issues': 2}])
+
+    def test_period(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        response = self.client.get('/reports/dashboard/', {'date_from': tomorrow, 'date_to': tomorrow})
+        self.assertEqual((response.data['activity']['issues'], response.data['activity']['returns']), (0, 0))
+
+        response = self.client.get('/reports/dashboard/', {'date_from': tomorrow, 'date_to': '2000-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ParallelDashboardTest(TransactionTestCase):
+    def test_parallel_sections_match_sequential(self):
+        librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        create_circulation(librarian)
+        today = timezone.localdate()
+        params = {'today': today, 'date_from': today - timedelta(days=29), 'date_to': today, 'top': 5}
+
+        parallel = compute_sections(params)
+
+        self.assertEqual(parallel, {name: section(params) for name, section in SECTIONS.items()})
+        self.assertEqual(parallel['overdue']['loans'], 1)
+
+    @skipUnless(connection.vendor == 'postgresql', "число соединений видно в pg_stat_activity")
+    def test_section_connections_are_closed(self):
+        today = timezone.localdate()
+        params = {'today': today, 'date_from': today - timedelta(days=29), 'date_to': today, 'top': 5}
+
+        def open_connections():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")
+                return cursor.fetchone()[0]
+
+        before = open_connections()
+        # Постоянные соединения: их не закрыл бы и close_old_connections.
+        with mock.patch.dict(connections.settings['default'], CONN_MAX_AGE=None):
+            compute_sections(params)
+            compute_sections(params)
+
+        # Серверный процесс завершается не сразу после закрытия соединения клиентом.
+        for _ in range(50):
+            if open_connections() == before:
+                break
+            time.sleep(0.1)
+        self.assertEqual(open_connections(), before)
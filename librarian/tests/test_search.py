@@ -0,0 +1,62 @@
+from unittest import skipUnless
+
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from librarian.models import User, Author, Book
+
+
+class BookSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.landau = Author.objects.create(first_name='Лев', last_name='Ландау')
+        lifshitz = Author.objects.create(first_name='Евгений', last_name='Лифшиц')
+
+        cls.mechanics = Book.objects.create(title='Механика', quantity=1, isbn='978-5-9221-0819-5',
+                                            description='Первый том курса теоретической физики')
+        cls.mechanics.authors.set([cls.landau, lifshitz])
+        cls.field_theory = Book.objects.create(title='Теория поля', quantity=1,
+                                               description='Второй том, механика сплошных сред не входит')
+        cls.field_theory.authors.set([cls.landau])
+        Book.objects.create(title='Война и мир', quantity=1, description='Роман-эпопея')
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def search(self, query):
+        response = self.client.get('/api/books/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.data['results']]
+
+    def test_document_tracks_authors(self):
+        self.mechanics.refresh_from_db()
+        self.assertIn('Лифшиц', self.mechanics.search_document)
+
+        self.landau.last_name = 'Landau'
+        self.landau.save()
+        self.mechanics.refresh_from_db()
+        self.assertIn('Landau', self.mechanics.search_document)
+
+        self.mechanics.authors.remove(self.landau)
+        self.mechanics.refresh_from_db()
+        self.assertNotIn('Landau', self.mechanics.search_document)
+
+    def test_search_by_author_title_and_isbn(self):
+        self.assertEqual(self.search('Лифшиц'), ['Механика'])
+        self.assertEqual(set(self.search('Ландау')), {'Механика', 'Теория поля'})
+        self.assertEqual(self.search('978-5-9221-0819-5'), ['Механика'])
+        self.assertEqual(self.search('Толстой'), [])
+
+    def test_title_match_ranks_first(self):
+        self.assertEqual(self.search('Механика')[0], 'Механика')
+
+    def test_search_param_has_no_duplicates(self):
+        response = self.client.get('/api/books/', {'search': 'Ландау'})
+
+        self.assertEqual(response.data['count'], 2)
+
+    @skipUnless(connection.vendor == 'postgresql', "стемминг и триграммы есть только в PostgreSQL")
+    def test_postgres_stemming_and_typos(self):
+        self.assertIn('Механика', self.search('механики'))
+        self.assertEqual(self.search('Лифшитц'), ['Механика'])
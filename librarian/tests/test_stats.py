@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from librarian import stats
+from librarian.models import User, Direction, Book, Inventory, BookIssue, BookReturn, CirculationStats
+
+
+def snapshot():
+    """Итоги по (разрез, ключ, день): приращения одного дня суммируются."""
+    return sorted(
+        CirculationStats.objects.values('scope', 'key', 'date').annotate(
+            *(Sum(column) for column in stats.COLUMNS)
+        ).exclude(issues__sum=0, returns__sum=0, overdue__sum=0, fines__sum=0).values_list(
+            'scope', 'key', 'date', *(f'{column}__sum' for column in stats.COLUMNS)
+        )
+    )
+
+
+class CirculationStatsTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.readers = [User.objects.create_user(username=f'reader{i}', role='reader', password='123') for i in range(3)]
+        cls.direction = Direction.objects.create(name='Физика')
+        cls.book = Book.objects.create(title='Механика', quantity=5, direction=cls.direction)
+        cls.other = Book.objects.create(title='Роман', quantity=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+        self.today = timezone.localdate()
+
+    def issue(self, reader, book, due_date=None):
+        inventory = Inventory.objects.filter(book=book, status='available').exclude(
+            bookissue__is_open=True, bookissue__is_deleted=False
+        ).first()
+        return BookIssue.objects.create(reader=reader, inventory=inventory, issued_by=self.librarian,
+                                        due_date=due_date or self.today + timedelta(days=14))
+
+    def row(self, scope, key):
+        return SimpleNamespace(**CirculationStats.objects.filter(scope=scope, key=key, date=self.today).aggregate(
+            **{column: Sum(column) for column in stats.COLUMNS}
+        ))
+
+    def test_signals_match_rebuild(self):
+        self.issue(self.readers[0], self.book)
+        late = self.issue(self.readers[1], self.book, due_date=self.today - timedelta(days=3))
+        self.issue(self.readers[1], self.other)
+        book_return = BookReturn.objects.create(issue=late, received_by=self.librarian)
+
+        total = self.row('total', 0)
+        self.assertEqual((total.issues, total.returns, total.overdue), (3, 1, 1))
+        self.assertGreater(book_return.fine, 0)
+        self.assertEqual(total.fines, book_return.fine)
+        self.assertEqual(self.row('direction', self.direction.pk).issues, 2)
+        self.assertEqual(self.row('direction', 0).issues, 1)
+        self.assertEqual(self.row('reader', self.readers[1].pk).issues, 2)
+        self.assertEqual(self.row('book', self.book.pk).returns, 1)
+
+        incremental = snapshot()
+        self.assertEqual(stats.rebuild(), len(incremental))
+        self.assertEqual(snapshot(), incremental)
+
+    def test_soft_delete_is_subtracted_once(self):
+        issue = self.issue(self.readers[0], self.book)
+        book_return = BookReturn.objects.create(issue=issue, received_by=self.librarian)
+
+        book_return.delete()
+        book_return.save()
+        issue.delete()
+
+        self.assertEqual(snapshot(), [])
+
+    def test_bulk_issue_and_return(self):
+        response = self.client.post('/api/issues/bulk/', {
+            'due_date': self.today + timedelta(days=30),
+            'items': [{'reader_id': reader.pk, 'book_id': self.book.pk} for reader in self.readers],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        issue_ids = [result['issue_id'] for result in response.data['results']]
+        self.client.post('/api/returns/bulk/', {'items': [{'issue_id': pk} for pk in issue_ids[:2]]}, format='json')
+
+        book = self.row('book', self.book.pk)
+        self.assertEqual((book.issues, book.returns), (3, 2))
+        incremental = snapshot()
+        stats.rebuild()
+        self.assertEqual(snapshot(), incremental)
+
+    def test_fold_merges_deltas(self):
+        self.issue(self.readers[0], self.book)
+        self.issue(self.readers[1], self.book).delete()
+        self.issue(self.readers[2], self.other)
+        before = snapshot()
+        self.assertEqual(CirculationStats.objects.filter(scope='total').count(), 4)
+
+        call_command('refresh_stats', '--fold', '--from', str(self.today), stdout=StringIO())
+
+        self.assertEqual(snapshot(), before)
+        self.assertEqual(CirculationStats.objects.get(scope='total').issues, 2)
+        # Выдача и её удаление в сумме дают ноль — строки читателя не остаётся.
+        self.assertFalse(CirculationStats.objects.filter(scope='reader', key=self.readers[1].pk).exists())
+        self.assertEqual(CirculationStats.objects.count(), len(before))
+
+    def test_rebuild_period_keeps_other_days(self):
+        self.issue(self.readers[0], self.book)
+        CirculationStats.objects.create(scope='total', date=date(2020, 1, 1), issues=7)
+
+        call_command('refresh_stats', '--from', str(self.today), stdout=StringIO())
+
+        self.assertEqual(CirculationStats.objects.get(scope='total', date=date(2020, 1, 1)).issues, 7)
+        self.assertEqual(self.row('total', 0).issues, 1)
+
+
+class CirculationReportsTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='lib1', role='librarian', password='123')
+        cls.direction = Direction.objects.create(name='Химия')
+        cls.books = [Book.objects.create(title=f'Книга {i}', quantity=1, direction=cls.direction if i else None)
+                     for i in range(3)]
+        rows = []
+        # Понедельник 2 сентября 2024 и две следующие недели.
+        for offset, book, issues in [(0, 0, 2), (1, 1, 3), (7, 1, 1), (8, 2, 4), (30, 2, 5)]:
+            day = date(2024, 9, 2) + timedelta(days=offset)
+            book = cls.books[book]
+            direction_key = book.direction_id or 0
+            for scope, key in [('total', 0), ('book', book.pk), ('direction', direction_key)]:
+                rows.append(CirculationStats(scope=scope, key=key, date=day, issues=issues, returns=1,
+                                             fines=Decimal('5.00')))
+        CirculationStats.objects.bulk_create(rows)
+
+    def setUp(self):
+        self.client.force_authenticate(self.librarian)
+
+    def test_weekly_trend(self):
+        response = self.client.get('/reports/circulation-trend/', {
+            'date_from': '2024-09-01', 'date_to': '2024-09-30', 'period': 'week',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(str(row['period']), row['issues']) for row in response.data],
+                         [('2024-09-02', 5), ('2024-09-09', 5)])
+
+    def test_monthly_trend_for_direction(self):
+        response = self.client.get('/reports/circulation-trend/', {
+            'date_from': '2024-09-01', 'date_to': '2024-10-31', 'period': 'month', 'direction': self.direction.pk,
+        })
+
+        self.assertEqual([(str(row['period']), row['issues'], row['returns']) for row in response.data],
+                         [('2024-09-01', 8, 3), ('2024-10-01', 5, 1)])
+
+    def test_trend_rejects_book_and_direction(self):
+        response = self.client.get('/reports/circulation-trend/', {'book': 1, 'direction': 1})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_top_books(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/reports/top-books/', {'date_from': '2024-09-01', 'date_to': '2024-09-30'})
+
+        self.assertEqual([(row['title'], row['issues']) for row in response.data],
+                         [('Книга 1', 4), ('Книга 2', 4), ('Книга 0', 2)])
+
+        response = self.client.get('/reports/top-books/', {
+            'date_from': '2024-09-01', 'date_to': '2024-10-31', 'direction': self.direction.pk, 'top': 1,
+        })
+        self.assertEqual([row['title'] for row in response.data], ['Книга 2'])
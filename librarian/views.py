@@ -2,22 +2,50 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, permissions, generics, status, filters
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from .permissions import IsLibrarian, IsReader, IsOwnerOrLibrarian
+from .authentication import LibraryRefreshToken
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.core.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.db import models
+from django.db.models import (
+    Count, DateField, DecimalField, F, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, Trunc
 
 
 
 
-from .models import User, Author, Direction, Publisher, Book, Inventory, BookIssue, BookReturn
+from .models import (
+    User, Author, Direction, Publisher, Book, Inventory, BookIssue, BookReturn, CirculationStats, FinePolicy, Holiday,
+)
+from . import autocomplete, fines, stats
+from .dashboard import acompute_sections
+from .cache import get_reference_data, list_validators
+from .export import EXPORT_RENDERERS, CSVRenderer, XLSXRenderer, export_response
+from .expressions import DaysBetween
+from .filters import BookSearchFilter, IssueReportFilter
+from .search import search_books
+from .pagination import IssueReportPagination, KeysetPagination, ReportPagination
 from .serializers import (
-    UserSerializer, RegisterSerializer,
+    UserSerializer, RegisterSerializer, ReaderEnrollmentSerializer, InviteAcceptSerializer,
     AuthorSerializer, DirectionSerializer,
-    PublisherSerializer, BookSerializer,
-    InventorySerializer, BookIssueSerializer, BookReturnSerializer
+    PublisherSerializer, FinePolicySerializer, HolidaySerializer, BookSerializer, BookListSerializer,
+    InventorySerializer, BookIssueSerializer, BookReturnSerializer,
+    ReaderActivityParamsSerializer, AutocompleteParamsSerializer, DashboardParamsSerializer,
+    CirculationTrendParamsSerializer, TopBooksParamsSerializer, OutstandingFinesParamsSerializer, CirculationTrendRowSerializer, TopBooksReportRowSerializer,
+    BulkIssueSerializer, BulkReturnSerializer, IssuedBooksReportRowSerializer, OverdueBooksReportRowSerializer,
+    BookAvailabilityReportRowSerializer, ReaderActivityReportRowSerializer, OutstandingFinesReportRowSerializer,
 )
 
 
@@ -31,7 +59,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = LibraryRefreshToken.for_user(user)
         return Response({
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -39,7 +67,21 @@ class RegisterView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class BatchCreateMixin:
+    """Пакетные действия: сериализатор обрабатывает каждую строку отдельно и возвращает список
+    результатов. Есть строки со status 'error' — ответ 207, иначе 201."""
+
+    def create_batch(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        failed = sum(result['status'] == 'error' for result in results)
+        response_status = status.HTTP_207_MULTI_STATUS if failed else status.HTTP_201_CREATED
+        return Response({'results': results, 'failed': failed}, status=response_status)
+
+
+class UserViewSet(BatchCreateMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
@@ -50,8 +92,52 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         return [IsLibrarian()]
 
+    @action(detail=False, methods=['post'], serializer_class=ReaderEnrollmentSerializer)
+    def enroll(self, request):
+        return self.create_batch(request)
+
+
+class InviteAcceptView(generics.GenericAPIView):
+    serializer_class = InviteAcceptSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
+
+        refresh = LibraryRefreshToken.for_user(user)
+        return Response({
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+            "user": UserSerializer(user).data
+        })
+
+
+class CachedReferenceMixin:
+    """Справочники: retrieve читается из кэша, list отдаёт ETag/Last-Modified для ревалидации."""
+
+    def retrieve(self, request, *args, **kwargs):
+        model = self.queryset.model
+        pk = str(kwargs[self.lookup_field])
+        data = get_reference_data(model, self.get_serializer_class(), [int(pk)]).get(int(pk)) if pk.isdigit() else None
+        if data is None or data.get('is_deleted'):
+            return super().retrieve(request, *args, **kwargs)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = list_validators(self.queryset.model, request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
 
-class AuthorViewSet(viewsets.ModelViewSet):
+
+class AuthorViewSet(CachedReferenceMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -64,7 +150,7 @@ class AuthorViewSet(viewsets.ModelViewSet):
         return [IsLibrarian()]
 
 
-class DirectionViewSet(viewsets.ModelViewSet):
+class DirectionViewSet(CachedReferenceMixin, viewsets.ModelViewSet):
     queryset = Direction.objects.all()
     serializer_class = DirectionSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -77,7 +163,7 @@ class DirectionViewSet(viewsets.ModelViewSet):
         return [IsLibrarian()]
 
 
-class PublisherViewSet(viewsets.ModelViewSet):
+class PublisherViewSet(CachedReferenceMixin, viewsets.ModelViewSet):
     queryset = Publisher.objects.all()
     serializer_class = PublisherSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -91,31 +177,81 @@ class PublisherViewSet(viewsets.ModelViewSet):
 
 
 
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.all()
-    serializer_class = BookSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['publisher', 'direction']
-    search_fields = ['title', 'authors__last_name']
-    ordering_fields = ['title', 'quantity']
+class FinePolicyViewSet(viewsets.ModelViewSet):
+    queryset = FinePolicy.objects.select_related('direction').order_by('id')
+    serializer_class = FinePolicySerializer
+
+    def get_permissions(self):
+        if self.request.method in SAFE_METHODS:
+            return [IsAuthenticated()]
+        return [IsLibrarian()]
+
+
+class HolidayViewSet(viewsets.ModelViewSet):
+    queryset = Holiday.objects.order_by('date')
+    serializer_class = HolidaySerializer
 
     def get_permissions(self):
         if self.request.method in SAFE_METHODS:
             return [IsAuthenticated()]
         return [IsLibrarian()]
 
-    def destroy(self, request, *args, **kwargs):
-        book = self.get_object()
-        if Inventory.objects.filter(book=book, status='issued').exists():
-            raise ValidationError("Нельзя удалить книгу, которая выдана.")
-        book.is_active = False
-        book.save()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
+class ModelDeleteMixin:
+    """Удаление через Model.delete: запрет модели (ValidationError Django) — ответ 400, а не 500."""
+
+    def perform_destroy(self, instance):
+        try:
+            instance.delete()
+        except DjangoValidationError as error:
+            raise ValidationError(error.messages)
 
-class InventoryViewSet(viewsets.ModelViewSet):
-    queryset = Inventory.objects.all()
+
+class BookViewSet(ModelDeleteMixin, viewsets.ModelViewSet):
+    # Справочники в ответе читаются из кэша по *_id, поэтому select_related не нужен;
+    # авторы предзагружаются одним запросом на страницу.
+    queryset = Book.objects.prefetch_related(Prefetch('authors', queryset=Author.objects.all()))
+    serializer_class = BookSerializer
+    filter_backends = [DjangoFilterBackend, BookSearchFilter, filters.OrderingFilter]
+    filterset_fields = {
+        'publisher': ['exact'],
+        'direction': ['exact'],
+        'available_count': ['exact', 'gte', 'lte'],
+        'borrowed_count': ['exact', 'gte', 'lte'],
+    }
+    ordering_fields = ['title', 'quantity', 'available_count', 'borrowed_count']
+
+    def get_serializer_class(self):
+        # Облегчённый список — по запросу клиента (?view=slim, ?fields=, ?expand=), по умолчанию
+        # список отдаётся в прежнем виде, с вложенными объектами.
+        params = self.request.query_params
+        slim = params.get('view') == 'slim' or 'fields' in params or 'expand' in params
+        if self.action in ('list', 'search') and slim:
+            return BookListSerializer
+        return BookSerializer
+
+    @action(detail=False)
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        books = self.filter_queryset(self.get_queryset())
+        books = search_books(books, query) if query else books.none()
+
+        page = self.paginate_queryset(books)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_permissions(self):
+        if self.request.method in SAFE_METHODS:
+            return [IsAuthenticated()]
+        return [IsLibrarian()]
+
+
+class InventoryViewSet(ModelDeleteMixin, viewsets.ModelViewSet):
+    queryset = Inventory.objects.select_related('book').prefetch_related(
+        Prefetch('book__authors', queryset=Author.objects.all())
+    )
     serializer_class = InventorySerializer
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['book', 'status']
     search_fields = ['inventory_number', 'book__title']
@@ -127,16 +263,19 @@ class InventoryViewSet(viewsets.ModelViewSet):
         return [IsLibrarian()]
 
 
-class BookIssueViewSet(viewsets.ModelViewSet):
-    queryset = BookIssue.objects.select_related('reader', 'inventory', 'issued_by')
+class BookIssueViewSet(BatchCreateMixin, viewsets.ModelViewSet):
+    queryset = BookIssue.objects.select_related('reader', 'inventory__book', 'issued_by').prefetch_related(
+        Prefetch('inventory__book__authors', queryset=Author.objects.all())
+    )
     serializer_class = BookIssueSerializer
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['reader', 'issued_by']
     search_fields = ['reader__last_name', 'inventory__inventory_number']
     ordering_fields = ['issue_date', 'due_date']
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk']:
             return [IsLibrarian()]
         elif self.action == 'retrieve':
             return [IsOwnerOrLibrarian()]
@@ -145,17 +284,24 @@ class BookIssueViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(issued_by=self.request.user)
 
+    @action(detail=False, methods=['post'], serializer_class=BulkIssueSerializer)
+    def bulk(self, request):
+        return self.create_batch(request)
+
 
-class BookReturnViewSet(viewsets.ModelViewSet):
-    queryset = BookReturn.objects.select_related('issue', 'issue__inventory', 'received_by')
+class BookReturnViewSet(ModelDeleteMixin, BatchCreateMixin, viewsets.ModelViewSet):
+    queryset = BookReturn.objects.select_related('issue__reader', 'issue__inventory__book', 'received_by').prefetch_related(
+        Prefetch('issue__inventory__book__authors', queryset=Author.objects.all())
+    )
     serializer_class = BookReturnSerializer
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['received_by']
     search_fields = ['issue__reader__last_name', 'issue__inventory__inventory_number']
     ordering_fields = ['return_date']
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk']:
             return [IsLibrarian()]
         elif self.action == 'retrieve':
             return [IsOwnerOrLibrarian()]
@@ -164,103 +310,383 @@ class BookReturnViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(received_by=self.request.user)
 
+    @action(detail=False, methods=['post'], serializer_class=BulkReturnSerializer)
+    def bulk(self, request):
+        return self.create_batch(request)
+
 
 class CurrentUserView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response(UserSerializer(request.user).data)
+        # request.user собран из токена, остальные поля — одним запросом.
+        return Response(UserSerializer(User.objects.get(pk=request.user.pk)).data)
 
 
-class IssuedBooksReportView(APIView):
+class AutocompleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        issues = BookIssue.objects.select_related('reader', 'inventory__book', 'issued_by')
-
-        report_data = []
+        params = AutocompleteParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        if params['type'] == 'readers' and not IsLibrarian().has_permission(request, self):
+            self.permission_denied(request)
+
+        return Response(autocomplete.indexes[params['type']].search(params['q'], params['limit']))
+
+
+class AsyncViewMixin:
+    """Асинхронное представление DRF (в DRF 3.15 их нет): аутентификация, права и согласование
+    формата выполняются как обычно, в потоке, а обработчик метода — корутина, которая читает
+    данные через async ORM и не держит поток воркера на всё время запроса."""
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+async def _batched(items, size):
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ReportAPIView(AsyncViewMixin, generics.GenericAPIView):
+    """Отчёт: JSON (с необязательной пагинацией) или потоковая выгрузка ?format=csv|xlsx."""
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, XLSXRenderer]
+    export_name = 'report'
+
+    def get_rows(self, items):
+        # По умолчанию строка — объект queryset'а в представлении serializer_class;
+        # отчёты с агрегатами переопределяют метод и собирают строки сами.
+        serializer = self.get_serializer()
+        for item in items:
+            yield serializer.to_representation(item)
+
+    async def aget_rows(self, items):
+        # get_rows получает пачки уже прочитанных строк и к БД не обращается.
+        rows = []
+        async for batch in _batched(items, 2000):
+            rows.extend(self.get_rows(batch))
+        return rows
+
+    async def apaginate_queryset(self, queryset):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if hasattr(paginator, 'apaginate_queryset'):
+            return await paginator.apaginate_queryset(queryset, self.request, view=self)
+        # Курсорная пагинация DRF только синхронная.
+        return await sync_to_async(self.paginate_queryset)(queryset)
+
+    async def get(self, request):
+        # Проверка параметров и фильтров может читать БД (справочники, правила штрафов).
+        queryset = await sync_to_async(lambda: self.filter_queryset(self.get_queryset()))()
+
+        renderer = request.accepted_renderer
+        if renderer.format in EXPORT_RENDERERS:
+            # Выгрузка целиком, без пагинации: iterator() читает серверным курсором,
+            # строки пишутся в ответ по мере чтения.
+            columns = list(self.get_serializer().fields)
+            rows = self.get_rows(queryset.iterator(chunk_size=2000))
+            asynchronous = isinstance(request._request, ASGIRequest)
+            return export_response(renderer, self.export_name, columns, rows, asynchronous=asynchronous)
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(list(self.get_rows(page)))
+        return Response(await self.aget_rows(queryset.aiterator(chunk_size=2000)))
+
+    def handle_exception(self, exc):
+        # Ошибки (например, неверные параметры) отдаём JSON'ом, а не пустой таблицей.
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if renderer is not None and renderer.format in EXPORT_RENDERERS:
+            self.request.accepted_renderer = JSONRenderer()
+            self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+
+class IssuedBooksReportView(ReportAPIView):
+    serializer_class = IssuedBooksReportRowSerializer
+    pagination_class = IssueReportPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = IssueReportFilter
+    export_name = 'issued_books'
+
+    def get_queryset(self):
+        return BookIssue.objects.select_related('reader', 'inventory__book', 'issued_by').order_by('-issue_date', '-id')
+
+    def get_rows(self, issues):
         for issue in issues:
-            returned = BookReturn.objects.filter(issue=issue).exists()
-            status = "Возвращена" if returned else "На руках"
-            report_data.append({
+            yield {
                 "issue_id": issue.id,
                 "issue_date": issue.issue_date,
                 "title": issue.inventory.book.title,
                 "reader": issue.reader.get_full_name(),
                 "issued_by": issue.issued_by.get_full_name() if issue.issued_by else "-",
                 "due_date": issue.due_date,
-                "status": status,
-            })
-
-        return Response(report_data)
-
-class OverdueBooksReportView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request):
-        today = timezone.now().date()
-        overdue_issues = BookIssue.objects.filter(
-            due_date__lt=today,
-            inventory__status='issued'
-        ).select_related('reader', 'inventory')
-
-        data = []
-        for issue in overdue_issues:
-            data.append({
+                "status": "На руках" if issue.is_open else "Возвращена",
+            }
+
+class OverdueBooksReportView(ReportAPIView):
+    serializer_class = OverdueBooksReportRowSerializer
+    pagination_class = ReportPagination
+    filter_backends = []
+    export_name = 'overdue_books'
+
+    def get_queryset(self):
+        today = timezone.localdate()
+        return BookIssue.objects.filter(
+            due_date__lt=today, is_open=True,
+        ).select_related('reader', 'inventory__book').annotate(
+            days_overdue=DaysBetween(Value(today, output_field=DateField()), F('due_date')),
+            fine=fines.get_rules().expression(today),
+        ).order_by('due_date', 'id')
+
+    def get_rows(self, issues):
+        for issue in issues:
+            yield {
                 'reader': str(issue.reader),
                 'inventory_number': issue.inventory.inventory_number,
                 'book_title': issue.inventory.book.title,
                 'issue_date': issue.issue_date,
                 'due_date': issue.due_date,
-                'days_overdue': (today - issue.due_date).days,
-            })
-
-        return Response(data)
-
-
-class BookAvailabilityReportView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request):
-        books = Book.objects.filter(is_deleted=False)
-
-        report = []
+                'days_overdue': issue.days_overdue,
+                'fine': issue.fine,
+            }
+
+
+class OutstandingFinesReportView(ReportAPIView):
+    """Штрафы по открытым просроченным выдачам на дату ?date= (по умолчанию сегодня), по читателям.
+    Один сгруппированный запрос: штраф считает выражение правил FinePolicy, а не Python по выдачам."""
+    serializer_class = OutstandingFinesReportRowSerializer
+    pagination_class = ReportPagination
+    filter_backends = []
+    export_name = 'outstanding_fines'
+
+    def get_queryset(self):
+        params = OutstandingFinesParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        on_date = params.validated_data['date']
+        return BookIssue.objects.filter(is_open=True, due_date__lt=on_date).values(
+            'reader_id', 'reader__last_name', 'reader__first_name',
+        ).annotate(
+            overdue_loans=Count('pk'),
+            outstanding_fine=Sum(fines.get_rules().expression(on_date)),
+        ).order_by('-outstanding_fine', 'reader_id')
+
+    def get_rows(self, readers):
+        for row in readers:
+            yield {
+                'reader_id': row['reader_id'],
+                'reader_name': f"{row['reader__last_name']} {row['reader__first_name']}",
+                'overdue_loans': row['overdue_loans'],
+                'outstanding_fine': row['outstanding_fine'],
+            }
+
+
+class BookAvailabilityReportView(ReportAPIView):
+    serializer_class = BookAvailabilityReportRowSerializer
+    pagination_class = ReportPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['direction', 'publisher', 'category']
+    export_name = 'book_availability'
+
+    def get_queryset(self):
+        return Book.objects.annotate(
+            total_copies=F('available_count') + F('borrowed_count') + F('deleted_count'),
+            available_copies=F('available_count'),
+            issued_copies=F('borrowed_count'),
+            deleted_copies=F('deleted_count'),
+        ).values(
+            'id', 'title', 'total_copies', 'available_copies', 'issued_copies', 'deleted_copies'
+        ).order_by('title', 'id')
+
+    def get_rows(self, books):
         for book in books:
-            total_copies = Inventory.objects.filter(book=book).count()
-            available_copies = Inventory.objects.filter(book=book, status='available').count()
-            issued_copies = Inventory.objects.filter(book=book, status='borrowed').count()
-            deleted_copies = Inventory.objects.filter(book=book, status='deleted').count()
-
-            report.append({
-                'book_title': book.title,
-                'total_copies': total_copies,
-                'available_copies': available_copies,
-                'issued_copies': issued_copies,
-                'deleted_copies': deleted_copies,
-            })
-
-        return Response(report)
-
-class ReaderActivityReportView(APIView):
+            yield {
+                'book_id': book['id'],
+                'book_title': book['title'],
+                'total_copies': book['total_copies'],
+                'available_copies': book['available_copies'],
+                'issued_copies': book['issued_copies'],
+                'deleted_copies': book['deleted_copies'],
+            }
+
+class ReaderActivityReportView(ReportAPIView):
+    serializer_class = ReaderActivityReportRowSerializer
+    pagination_class = ReportPagination
+    filter_backends = []
+    export_name = 'reader_activity'
+
+    ORDERINGS = {
+        'name': ('last_name', 'first_name', 'id'),
+        'activity': ('-books_borrowed', 'last_name', 'id'),
+        'fines': ('-total_fines', 'last_name', 'id'),
+    }
+
+    def get_queryset(self):
+        params = ReaderActivityParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        # Итоги из дневной статистики читателя: строка на читателя и день вместо join'а
+        # выдач и возвратов. Выдачи считаются по дате выдачи, штрафы — по дате возврата.
+        reader_stats = CirculationStats.objects.filter(scope='reader', key=OuterRef('pk'))
+        if params.get('date_from'):
+            reader_stats = reader_stats.filter(date__gte=params['date_from'])
+        if params.get('date_to'):
+            reader_stats = reader_stats.filter(date__lte=params['date_to'])
+
+        def total(column, output_field):
+            return Coalesce(
+                Subquery(reader_stats.values('key').annotate(total=Sum(column)).values('total')),
+                Value(0, output_field=output_field),
+            )
+
+        readers = User.objects.filter(role='reader', is_active=True).annotate(
+            books_borrowed=total('issues', IntegerField()),
+            total_fines=total('fines', DecimalField(max_digits=12, decimal_places=2)),
+        ).values('id', 'last_name', 'first_name', 'books_borrowed', 'total_fines').order_by(
+            *self.ORDERINGS[params['ordering']]
+        )
+
+        if params.get('top'):
+            readers = readers[:params['top']]
+        return readers
+
+    def get_rows(self, readers):
+        for reader in readers:
+            yield {
+                'reader_id': reader['id'],
+                'reader_name': f"{reader['last_name']} {reader['first_name']}",
+                'books_borrowed': reader['books_borrowed'],
+                'total_fines': float(reader['total_fines']),
+            }
+
+
+class CirculationTrendView(ReportAPIView):
+    """Выдачи, возвраты, просроченные возвраты и штрафы по дням, неделям или месяцам —
+    по библиотеке, направлению (?direction=) или книге (?book=)."""
+    serializer_class = CirculationTrendRowSerializer
+    pagination_class = None
+    filter_backends = []
+    export_name = 'circulation_trend'
+
+    def get_queryset(self):
+        params = CirculationTrendParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        scope, key = 'total', 0
+        if 'direction' in params:
+            scope, key = 'direction', params['direction']
+        elif 'book' in params:
+            scope, key = 'book', params['book']
+        return stats.period_rows(scope, params['date_from'], params['date_to']).filter(key=key).annotate(
+            period=Trunc('date', params['period'], output_field=DateField()),
+        ).values('period').annotate(
+            total_issues=Sum('issues'),
+            total_returns=Sum('returns'),
+            total_overdue=Sum('overdue'),
+            total_fines=Sum('fines'),
+        ).order_by('period')
+
+    def get_rows(self, periods):
+        for row in periods:
+            yield {
+                'period': row['period'],
+                'issues': row['total_issues'],
+                'returns': row['total_returns'],
+                'overdue': row['total_overdue'],
+                'fines': row['total_fines'],
+            }
+
+
+class TopBooksReportView(ReportAPIView):
+    serializer_class = TopBooksReportRowSerializer
+    pagination_class = None
+    filter_backends = []
+    export_name = 'top_books'
+
+    def get_queryset(self):
+        params = TopBooksParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        return stats.top_books(params['date_from'], params['date_to'], params['top'], params.get('direction'))
+
+    async def aget_rows(self, items):
+        # Названия книг дочитываются отдельным запросом по строкам топа (stats.with_names).
+        books = [row async for row in items]
+        return await sync_to_async(lambda: list(self.get_rows(books)))()
+
+    def get_rows(self, books):
+        for row in stats.with_names(books, Book, 'book_id', ['title']):
+            yield {
+                'book_id': row['book_id'],
+                'title': row['title'],
+                'issues': row['total_issues'],
+                'returns': row['total_returns'],
+            }
+
+
+class DashboardView(AsyncViewMixin, APIView):
+    """Сводка: наличие фонда, просрочки и активность за период (по умолчанию 30 дней).
+    Разделы независимы и считаются параллельно, см. dashboard.acompute_sections."""
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        readers = User.objects.filter(role='reader', is_active = True)
+    async def get(self, request):
+        params = DashboardParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = {**params.validated_data, 'today': timezone.localdate()}
 
-        report = []
-        for reader in readers:
-            books_borrowed = BookIssue.objects.filter(reader=reader).count()
-            total_fines = BookReturn.objects.filter(issue__reader=reader).aggregate(
-                total_fine=models.Sum('fine')
-            )['total_fine'] or 0
-
-            report.append({
-                'reader_name': f"{reader.last_name} {reader.first_name}",
-                'books_borrowed': books_borrowed,
-                'total_fines': float(total_fines),
-            })
-
-        return Response(report)
+        sections = await acompute_sections(params)
+        return Response({
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            'availability': {**sections['availability'], 'by_category': sections['availability_by_category']},
+            'overdue': sections['overdue'],
+            'activity': {
+                **sections['activity'],
+                **sections['returns'],
+                'top_readers': [
+                    {
+                        'reader_id': row['reader_id'],
+                        'reader_name': f"{row['last_name']} {row['first_name']}",
+                        'books_borrowed': row['books_borrowed'],
+                    }
+                    for row in sections['top_readers']
+                ],
+                'top_books': sections['top_books'],
+            },
+        })
 
 # class ReaderAPIList(generics.ListCreateAPIView):
 #     queryset = Reader.objects.all()